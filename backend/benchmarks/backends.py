@@ -0,0 +1,79 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+SIZES = [64, 128, 256]
+
+
+def measure(backend, inputs: list[np.ndarray], repeats: int) -> tuple[np.ndarray, dict]:
+    estimation = backend.predict(inputs)
+    latencies = []
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        backend.predict(inputs)
+        latencies.append(time.perf_counter() - started_at)
+
+    return estimation, {
+        "p50": float(np.percentile(latencies, 50) * 1_000),
+        "p95": float(np.percentile(latencies, 95) * 1_000),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check parity and compare latency of the torch and ONNX backends."
+    )
+    parser.add_argument("--onnx", default=None, help="Exported model, or export anew")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    from src.ai.backends.onnx import OnnxBackend
+    from src.ai.backends.pytorch import TorchBackend
+
+    torch_backend = TorchBackend()
+    onnx_path = args.onnx
+    if onnx_path is None:
+        onnx_path = os.path.join(tempfile.mkdtemp(), "biomass.onnx")
+        torch_backend.export_onnx(onnx_path)
+    onnx_backend = OnnxBackend(
+        onnx_path, intra_op_threads=args.threads, inter_op_threads=args.threads
+    )
+
+    rng = np.random.default_rng(0)
+    report = []
+    for size in args.sizes:
+        inputs = [
+            rng.random((1, channels, size, size), dtype=np.float32)
+            for channels in (2, 2, 4, 6, 2)
+        ]
+        torch_estimation, torch_latency = measure(torch_backend, inputs, args.repeats)
+        onnx_estimation, onnx_latency = measure(onnx_backend, inputs, args.repeats)
+
+        error = np.abs(onnx_estimation - torch_estimation)
+        report.append(
+            {
+                "size": size,
+                "latency_ms": {"torch": torch_latency, "onnx": onnx_latency},
+                "max_abs_error": float(error.max()),
+                "parity": bool(
+                    np.allclose(onnx_estimation, torch_estimation, rtol=1e-3, atol=1e-4)
+                ),
+            }
+        )
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
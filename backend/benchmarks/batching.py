@@ -0,0 +1,100 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.synthetic import (
+    configure_environment,
+    get_inputs,
+    save_random_models,
+    use_random_models,
+)
+
+# AOI sizes of concurrent runtime requests, each predicted whole.
+SIZES = [96, 128, 141, 160, 200, 256]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure concurrent whole-image estimations of different sizes "
+        "queued through the inference scheduler (previous behaviour) and predicted "
+        "directly on the estimation threads."
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--requests", type=int, default=24)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    configure_environment(model_cache_dir=os.path.join(directory, "cache"))
+    save_random_models(directory)
+    use_random_models(directory)
+
+    import torch
+
+    from src.ai import biomass
+    from src.ai.preprocessing import preprocess
+    from src.ai.registry import MODELS
+
+    MODELS.get("biomass")
+    # The workers share the cores, as the estimation workers do when serving.
+    torch.set_num_threads(max((os.cpu_count() or 1) // args.workers, 1))
+
+    rng = np.random.default_rng(0)
+    requests = [
+        get_inputs(args.sizes[index % len(args.sizes)], rng)
+        for index in range(args.requests)
+    ]
+
+    def estimate_through_scheduler(inputs: list[np.ndarray]) -> np.ndarray:
+        return biomass.submit(preprocess(*inputs)).result().squeeze(0)
+
+    def measure(estimate) -> dict[str, float]:
+        def run(inputs: list[np.ndarray]) -> float:
+            started_at = time.perf_counter()
+            estimate(inputs)
+            return time.perf_counter() - started_at
+
+        for inputs in requests[: args.workers]:
+            run(inputs)
+
+        started_at = time.perf_counter()
+        with ThreadPoolExecutor(args.workers) as executor:
+            latencies = list(executor.map(run, requests))
+        elapsed = time.perf_counter() - started_at
+
+        return {
+            "p50_ms": float(np.percentile(latencies, 50) * 1_000),
+            "p95_ms": float(np.percentile(latencies, 95) * 1_000),
+            "throughput_rps": len(requests) / elapsed,
+        }
+
+    scheduler_metrics_before = biomass.scheduler.metrics()
+    report = {
+        "workers": args.workers,
+        "requests": args.requests,
+        "scheduler": measure(estimate_through_scheduler),
+    }
+    scheduler_metrics = biomass.scheduler.metrics()
+    report["scheduler"]["batches"] = (
+        scheduler_metrics["batches"] - scheduler_metrics_before["batches"]
+    )
+    report["direct"] = measure(lambda inputs: biomass.estimate_biomass(*inputs))
+    report["direct"]["batches"] = (
+        biomass.scheduler.metrics()["batches"] - scheduler_metrics["batches"]
+    )
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import argparse
+import json
+import tempfile
+
+import numpy as np
+
+from benchmarks.preliminary import get_latency
+from benchmarks.synthetic import (
+    ORIGIN_LONLAT,
+    PIXEL_SIZE,
+    configure_environment,
+    save_preliminary_estimations,
+)
+
+
+def get_feature_collection(centres: list[tuple[float, float]], radius: float):
+    import shapely.geometry
+
+    from src.models import FeatureCollection
+
+    resolution = PIXEL_SIZE / 111_320
+    discs = [
+        shapely.geometry.Point(
+            ORIGIN_LONLAT[0] + col * resolution, ORIGIN_LONLAT[1] - row * resolution
+        ).buffer(radius * resolution)
+        for row, col in centres
+    ]
+    return FeatureCollection.model_validate(
+        {
+            "type": "FeatureCollection",
+            "features": [
+                {"type": "Feature", "geometry": shapely.geometry.mapping(disc)}
+                for disc in discs
+            ],
+        }
+    )
+
+
+def get_values(statistics: list[dict]) -> dict[str, float]:
+    # Area and total biomass.
+    return {"area_ha": statistics[0]["value"], "biomass_mg": statistics[4]["value"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare estimating two distant parcels in one window over their "
+        "bbox (previous behaviour) with one window per cluster of polygons."
+    )
+    parser.add_argument("--tiles", type=int, default=4)
+    parser.add_argument("--tile-size", type=int, default=512)
+    parser.add_argument("--radius", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    _, list_path = save_preliminary_estimations(
+        directory, args.tiles, args.tile_size, np.random.default_rng(0)
+    )
+    configure_environment(
+        preliminary_estimation_list_path=list_path,
+        estimation_area_limit=str(10**12),
+        estimation_window_area_limit=str(10**12),
+    )
+
+    import shapely.geometry
+
+    from src.models import FeatureCollection
+    from src.services.biomass import BiomassPreliminaryEstimationService
+    from src.settings import SETTINGS
+
+    service = BiomassPreliminaryEstimationService()
+
+    # Discs at opposite corners of the raster set.
+    size = args.tiles * args.tile_size
+    margin = args.radius + 50
+    feature_collection = get_feature_collection(
+        [(margin, margin), (size - margin, size - margin)], args.radius
+    )
+    multipolygon = feature_collection.get_multipolygon()
+
+    def get_window_estimation():
+        return service._get_cluster_estimation(multipolygon, None)
+
+    window_estimation = get_window_estimation()
+    estimation = service.get_estimation(feature_collection)
+    assert len(service.get_clusters(multipolygon)) == 2
+
+    # Per-feature statistics add up to the statistics of all features.
+    assert estimation.feature_statistics is not None
+    feature_values = [
+        get_values(statistics)
+        for statistics in estimation.feature_statistics
+        if statistics is not None
+    ]
+    values = get_values(estimation.statistics or [])
+    for name, value in values.items():
+        assert np.isclose(sum(item[name] for item in feature_values), value)
+
+    # A thin ring has the area of a parcel but a window spanning its whole bbox. It
+    # is rejected at full resolution and estimated on a coarser grid.
+    resolution = PIXEL_SIZE / 111_320
+    centre = shapely.geometry.Point(
+        ORIGIN_LONLAT[0] + size / 2 * resolution,
+        ORIGIN_LONLAT[1] - size / 2 * resolution,
+    )
+    ring = centre.buffer(495 * resolution).difference(centre.buffer(492.5 * resolution))
+    ring_feature_collection = FeatureCollection.model_validate(
+        {
+            "type": "FeatureCollection",
+            "features": [
+                {"type": "Feature", "geometry": shapely.geometry.mapping(ring)}
+            ],
+        }
+    )
+    SETTINGS.estimation_window_area_limit = 10_000_000
+    try:
+        service.get_estimation(ring_feature_collection)
+        ring_rejected = False
+    except ValueError:
+        ring_rejected = True
+    assert ring_rejected
+    ring_pixels = service.get_estimation(ring_feature_collection, 256 * 256).data.size
+    SETTINGS.estimation_window_area_limit = 10**12
+
+    bbox_area, _ = service.geod.geometry_area_perimeter(
+        shapely.geometry.box(*multipolygon.bounds)
+    )
+    polygon_area, _ = service.geod.geometry_area_perimeter(multipolygon)
+    window_values = get_values(window_estimation.statistics or [])
+
+    report = {
+        "bbox_area_ha": abs(bbox_area) / 10_000,
+        "polygon_area_ha": abs(polygon_area) / 10_000,
+        "window_pixels": int(window_estimation.data.size),
+        "cluster_pixels": int(
+            sum(item.data.size for item in service.get_estimations(feature_collection))
+        ),
+        "statistics": {"window": window_values, "clusters": values},
+        "ring_rejected": ring_rejected,
+        "ring_lod_pixels": int(ring_pixels),
+        "features": feature_values,
+        "window_latency_ms": get_latency(get_window_estimation, args.repeats),
+        "cluster_latency_ms": get_latency(
+            lambda: service.get_estimation(feature_collection), args.repeats
+        ),
+        "statistics_latency_ms": get_latency(
+            lambda: service.get_feature_statistics(feature_collection), args.repeats
+        ),
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import argparse
+import json
+import time
+
+import numpy as np
+import rasterio.transform
+import rasterio.warp
+from affine import Affine
+from rasterio.enums import Resampling
+
+from benchmarks.synthetic import (
+    ORIGIN_UTM,
+    PIXEL_SIZE,
+    UTM_CRS,
+    configure_environment,
+    get_bounds,
+)
+
+configure_environment()
+
+import shapely.geometry
+
+from src.services.imagery import get_pixel_coordinates, get_pixel_window
+
+
+def get_warped_coordinates(
+    transform: Affine, height: int, width: int, factor: int = 3, margin: int = 2
+) -> np.ndarray:
+    # Coordinates as sampled by the GDAL warper, which like Earth Engine evaluates
+    # each pixel of the requested grid at its centre. The x and y coordinates of a
+    # finer grid around the target are linear ramps, which bilinear resampling
+    # reproduces exactly wherever GDAL samples them, so any offset or axis mix-up
+    # in the local grid shows up as an error of a fraction of a pixel.
+    source_transform = (
+        transform * Affine.translation(-margin, -margin) * Affine.scale(1 / factor)
+    )
+    source_height = (height + 2 * margin) * factor
+    source_width = (width + 2 * margin) * factor
+    rows, cols = np.indices((source_height, source_width))
+    x, y = rasterio.transform.xy(source_transform, rows.ravel(), cols.ravel())
+    source = np.stack([x, y]).reshape(2, source_height, source_width)
+
+    coords = np.zeros((2, height, width))
+    rasterio.warp.reproject(
+        source,
+        coords,
+        src_transform=source_transform,
+        src_crs=UTM_CRS,
+        dst_transform=transform,
+        dst_crs=UTM_CRS,
+        resampling=Resampling.bilinear,
+    )
+    return coords
+
+
+def get_gee_coordinates(bbox: shapely.geometry.Polygon) -> tuple[Affine, np.ndarray]:
+    # `ee.Image.pixelCoordinates` of the latest Sentinel-1 scene, downloaded on the
+    # same grid the provider uses for the Sentinel-1 bands.
+    import ee
+    from ee._helpers import ServiceAccountCredentials
+    from numpy.lib.recfunctions import structured_to_unstructured
+
+    from src.services.imagery import GEEImageryProvider
+    from src.settings import SETTINGS
+
+    ee.Initialize(
+        credentials=ServiceAccountCredentials(
+            SETTINGS.gee_service_account, SETTINGS.gee_private_key_path
+        )
+    )
+    provider = GEEImageryProvider()
+    scene_id = provider.get_scene_ids(bbox)["sen1"]
+    crs, transform = provider.get_projection(scene_id, "sen1")
+    bounds = rasterio.warp.transform_bounds("EPSG:4326", crs, *bbox.bounds)
+    window = get_pixel_window(bounds, transform)
+    window_transform = transform * Affine.translation(window.col_off, window.row_off)
+
+    image = ee.image.Image.pixelCoordinates(
+        provider._get_image(scene_id, "sen1").projection()
+    )
+    pixels = ee.data.computePixels(
+        {
+            "expression": image,
+            "fileFormat": "NUMPY_NDARRAY",
+            "grid": {
+                "dimensions": {"width": window.width, "height": window.height},
+                "affineTransform": {
+                    "scaleX": window_transform.a,
+                    "shearX": window_transform.b,
+                    "translateX": window_transform.c,
+                    "shearY": window_transform.d,
+                    "scaleY": window_transform.e,
+                    "translateY": window_transform.f,
+                },
+                "crsCode" if crs.startswith("EPSG:") else "crsWkt": crs,
+            },
+        }
+    )
+    provider.gee_executor.shutdown()
+    return window_transform, structured_to_unstructured(pixels).transpose(2, 0, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check that locally computed pixel coordinates match the pixel "
+        "centres sampled by the GDAL warper (or by Earth Engine with --gee) and "
+        "measure how long they take to compute."
+    )
+    parser.add_argument("--size", type=int, default=141)
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument(
+        "--gee",
+        action="store_true",
+        help="Compare against `ee.Image.pixelCoordinates` on a live Sentinel-1 "
+        "scene instead of a synthetic grid. Needs GEE credentials.",
+    )
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    if args.gee:
+        bbox = shapely.geometry.box(*get_bounds(args.size))
+        transform, expected = get_gee_coordinates(bbox)
+    else:
+        # A window whose origin is not on the metre grid, like the windows read
+        # from Sentinel-1 scenes.
+        transform = Affine(
+            PIXEL_SIZE, 0, ORIGIN_UTM[0] + 3.3, 0, -PIXEL_SIZE, ORIGIN_UTM[1] - 1.7
+        )
+        expected = get_warped_coordinates(transform, args.size, args.size)
+
+    height, width = expected.shape[1:]
+    latencies = []
+    for _ in range(args.repeats):
+        started_at = time.perf_counter()
+        coords = get_pixel_coordinates(transform, height, width)
+        latencies.append(time.perf_counter() - started_at)
+
+    error = np.abs(coords - expected)
+    report = {
+        "reference": "gee" if args.gee else "gdal",
+        "shape": list(coords.shape),
+        "max_abs_error": float(error.max()),
+        "matches": bool(np.allclose(coords, expected, rtol=0, atol=1e-6)),
+        "p50_ms": float(np.percentile(latencies, 50) * 1_000),
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    print(output)
+
+    if not report["matches"]:
+        raise SystemExit("Local pixel coordinates do not match the reference grid")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import argparse
+import io
+import json
+import time
+
+import numpy as np
+from numpy.lib.recfunctions import structured_to_unstructured
+
+from benchmarks.synthetic import configure_environment
+
+configure_environment()
+
+from src.services.imagery import BANDS
+
+# A 200 ha square AOI is about 141 x 141 pixels at 10 m.
+SIZE = 141
+
+COLLECTIONS = {
+    "coords": (["x", "y"], 1, np.float64),
+    "sen1": (BANDS["sen1"], 1, np.float64),
+    "sen2_10m": (BANDS["sen2_10m"], 1, np.uint16),
+    "sen2_20m": (BANDS["sen2_20m"], 2, np.uint16),
+    "sen2_60m": (BANDS["sen2_60m"], 6, np.uint16),
+}
+
+
+def get_pixels(
+    bands: list[str], size: int, dtype: type, rng: np.random.Generator
+) -> np.ndarray:
+    # Structured array with one field per band, as returned for NUMPY_NDARRAY.
+    pixels = np.empty((size, size), dtype=[(band, dtype) for band in bands])
+    for band in bands:
+        if np.issubdtype(dtype, np.integer):
+            pixels[band] = rng.integers(0, 10_000, (size, size))
+        else:
+            pixels[band] = rng.uniform(-25, 0, (size, size))
+
+    return pixels
+
+
+def decode_json(payloads: list[bytes]) -> np.ndarray:
+    # Previous path, one `getArray(band).getInfo()` JSON response per band.
+    return np.stack([json.loads(payload) for payload in payloads], axis=-1)
+
+
+def decode_npy(payload: bytes) -> np.ndarray:
+    return structured_to_unstructured(np.load(io.BytesIO(payload)))
+
+
+def measure(function, repeats: int) -> float:
+    latencies = []
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - started_at)
+
+    return float(np.percentile(latencies, 50) * 1_000)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare decoding per-band JSON arrays and multi-band NPY "
+        "payloads for a 200 ha AOI."
+    )
+    parser.add_argument("--size", type=int, default=SIZE)
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    report = []
+    for collection_id, (bands, factor, dtype) in COLLECTIONS.items():
+        pixels = get_pixels(bands, -(-args.size // factor), dtype, rng)
+
+        json_payloads = [json.dumps(pixels[band].tolist()).encode() for band in bands]
+        buffer = io.BytesIO()
+        np.save(buffer, pixels)
+        npy_payload = buffer.getvalue()
+
+        expected = structured_to_unstructured(pixels)
+        assert np.array_equal(decode_json(json_payloads), expected)
+        assert np.array_equal(decode_npy(npy_payload), expected)
+
+        report.append(
+            {
+                "collection_id": collection_id,
+                "requests": {"json": len(bands), "npy": 1},
+                "bytes": {
+                    "json": sum(len(payload) for payload in json_payloads),
+                    "npy": len(npy_payload),
+                },
+                "decode_ms": {
+                    "json": measure(lambda: decode_json(json_payloads), args.repeats),
+                    "npy": measure(lambda: decode_npy(npy_payload), args.repeats),
+                },
+            }
+        )
+
+    report.append(
+        {
+            "collection_id": "total",
+            **{
+                key: {
+                    name: sum(entry[key][name] for entry in report)
+                    for name in ("json", "npy")
+                }
+                for key in ("requests", "bytes", "decode_ms")
+            },
+        }
+    )
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import argparse
+import json
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from affine import Affine
+from cachetools import LRUCache, TTLCache
+
+from benchmarks.synthetic import (
+    ORIGIN_UTM,
+    UTM_CRS,
+    configure_environment,
+    get_bounds,
+)
+
+configure_environment()
+
+import ee.ee_exception
+import shapely.geometry
+
+from src.services.caching import DiskLRUCache
+from src.services.imagery import BANDS, GEEImageryProvider
+
+RESOLUTIONS = {"sen1": 10, "sen2_10m": 10, "sen2_20m": 20, "sen2_60m": 60}
+
+
+class FakeEarthEngineProvider(GEEImageryProvider):
+    # Replaces every scene lookup, projection lookup and pixel download with a
+    # sleep of `latency` seconds (plus jitter) that fails with probability
+    # `failure_rate`. Images are plain collection IDs instead of Earth Engine
+    # objects, so no credentials or network are needed.
+    def __init__(
+        self,
+        latency: float,
+        jitter: float,
+        failure_rate: float,
+        concurrency: int,
+        tile_size: int,
+        cache_directory: str,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.gee_executor = ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="gee"
+        )
+
+        self.scenes = TTLCache(maxsize=16, ttl=60)
+        self.scenes_lock = threading.Lock()
+        self.projections = LRUCache(maxsize=16)
+        self.projections_lock = threading.Lock()
+        self.tile_size = tile_size
+        self.tiles = DiskLRUCache(cache_directory, 2**30)
+
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+
+    def _simulate_request(self):
+        time.sleep(self.latency + random.uniform(0, self.jitter))
+
+        with self.lock:
+            self.calls += 1
+            if random.random() < self.failure_rate:
+                self.failures += 1
+                raise ee.ee_exception.EEException("Too many concurrent aggregations.")
+
+    def _get_latest_scenes(self, dataset, region, limit):
+        self._simulate_request()
+        return [(dataset, shapely.geometry.box(-180, -90, 180, 90))]
+
+    def _get_image(self, scene_id, collection_id):
+        return collection_id
+
+    def _get_projection(self, scene_id, collection_id):
+        self._simulate_request()
+        # Scenes start a few kilometres north-west of the synthetic AOIs.
+        resolution = RESOLUTIONS[collection_id]
+        return UTM_CRS, Affine(
+            resolution, 0, ORIGIN_UTM[0] - 5_000, 0, -resolution, ORIGIN_UTM[1] + 5_000
+        )
+
+    def _get_pixels(self, image, grid):
+        self._simulate_request()
+        dimensions = grid["dimensions"]
+        return np.zeros(
+            (dimensions["height"], dimensions["width"], len(BANDS[image])),
+            dtype=np.float64,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure Earth Engine data acquisition against a fake with "
+        "simulated latency and failures, cold and with a warm tile cache."
+    )
+    parser.add_argument("--size", type=int, default=128)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--failure-rate", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--tile-size", type=int, default=128)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    bbox = shapely.geometry.box(*get_bounds(args.size))
+    report = []
+    for concurrency in args.concurrency:
+        latencies = {"cold": [], "warm": []}
+        calls = {"cold": 0, "warm": 0}
+        failures = 0
+        for _ in range(args.repeats):
+            provider = FakeEarthEngineProvider(
+                args.latency,
+                args.jitter,
+                args.failure_rate,
+                concurrency,
+                args.tile_size,
+                tempfile.mkdtemp(),
+            )
+            for state in ("cold", "warm"):
+                calls_before = provider.calls
+                started_at = time.perf_counter()
+                provider.load(bbox)
+                latencies[state].append(time.perf_counter() - started_at)
+                calls[state] += provider.calls - calls_before
+
+            failures += provider.failures
+            provider.gee_executor.shutdown()
+
+        report.append(
+            {
+                "concurrency": concurrency,
+                **{
+                    state: {
+                        "p50_ms": float(np.percentile(latencies[state], 50) * 1_000),
+                        "p95_ms": float(np.percentile(latencies[state], 95) * 1_000),
+                        "round_trips": float(
+                            np.median(latencies[state]) / args.latency
+                        ),
+                        "calls": calls[state] / args.repeats,
+                    }
+                    for state in ("cold", "warm")
+                },
+                "failures": failures,
+                "tile_cache": provider.tiles.metrics(),
+            }
+        )
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
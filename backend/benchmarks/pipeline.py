@@ -0,0 +1,224 @@
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from typing import Callable
+
+import numpy as np
+
+from benchmarks.synthetic import (
+    configure_environment,
+    get_bounds,
+    get_inputs,
+    save_local_imagery,
+    save_random_models,
+    use_random_models,
+)
+
+SIZES = [64, 141, 256, 512]
+
+
+def get_latency(function: Callable, repeats: int) -> dict[str, float]:
+    function()
+    latencies = []
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - started_at)
+
+    return {
+        "p50": float(np.percentile(latencies, 50) * 1_000),
+        "p95": float(np.percentile(latencies, 95) * 1_000),
+    }
+
+
+def get_peak_rss() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+
+
+def get_service(size: int, imagery_directory: str):
+    import rasterio.profiles
+    import rasterio.transform
+
+    from src.models import BiomassEstimationGeoTIFF
+    from src.services.biomass import (
+        BiomassEstimationService,
+        BiomassRuntimeEstimationService,
+    )
+    from src.services.imagery import LocalImageryProvider
+
+    minx, miny, maxx, maxy = get_bounds(size)
+    margin = maxx - minx
+    profile = rasterio.profiles.DefaultGTiffProfile(
+        count=1,
+        dtype="float32",
+        nodata=np.nan,
+        crs="EPSG:4326",
+        height=size * 3,
+        width=size * 3,
+        transform=rasterio.transform.from_bounds(
+            minx - margin,
+            miny - margin,
+            maxx + margin,
+            maxy + margin,
+            3 * size,
+            3 * size,
+        ),
+    )
+
+    # Runs the runtime service end to end, with GEE replaced by local synthetic
+    # scenes and the preliminary rasters by a profile around the AOI.
+    class SyntheticEstimationService(BiomassRuntimeEstimationService):
+        def __init__(self):
+            BiomassEstimationService.__init__(
+                self, [BiomassEstimationGeoTIFF(data="synthetic", profile=profile)]
+            )
+            self.imagery_provider = LocalImageryProvider(imagery_directory)
+            # Enabled separately, so that end-to-end runs measure the pipeline.
+            self.results = None
+
+    return SyntheticEstimationService()
+
+
+def get_feature_collection(size: int):
+    import shapely.geometry
+
+    from src.models import FeatureCollection
+
+    minx, miny, maxx, maxy = get_bounds(size)
+    polygon = shapely.geometry.Point((minx + maxx) / 2, (miny + maxy) / 2).buffer(
+        (maxx - minx) / 2
+    )
+    return FeatureCollection.model_validate(
+        {
+            "type": "FeatureCollection",
+            "features": [
+                {"type": "Feature", "geometry": shapely.geometry.mapping(polygon)}
+            ],
+        }
+    )
+
+
+def run(size: int, repeats: int, models_directory: str) -> dict:
+    # Runs in a fresh process per size so that peak RSS is attributable to it.
+    use_random_models(models_directory)
+
+    import rasterio.features
+    import rasterio.transform
+    import shapely.geometry
+    import torch
+
+    from src.ai.backends.pytorch import TorchBackend
+    from src.ai.biomass import estimate_biomass
+    from src.ai.preprocessing import preprocess
+    from src.ai.registry import MODELS
+
+    backend = MODELS.get("biomass")
+    rss_after_load = get_peak_rss()
+
+    rng = np.random.default_rng(size)
+    inputs = get_inputs(size, rng)
+    feature_collection = get_feature_collection(size)
+    multipolygon = feature_collection.get_multipolygon()
+    imagery_directory = os.path.join(models_directory, "imagery", str(size))
+    save_local_imagery(imagery_directory, size, rng)
+    service = get_service(size, imagery_directory)
+
+    bbox = shapely.geometry.box(*get_bounds(size))
+    stages = {"load": get_latency(lambda: service.imagery_provider.load(bbox), repeats)}
+
+    preprocessed = preprocess(*inputs)
+    stages["preprocess"] = get_latency(lambda: preprocess(*inputs), repeats)
+
+    # DSen2 and VinaCarbon are timed on the whole AOI, without the tiling and
+    # batching that `estimate_biomass` adds on top.
+    if isinstance(backend, TorchBackend):
+        tensors = [torch.from_numpy(array) for array in preprocessed]
+        with torch.no_grad():
+            refined = backend.pipeline.refine(*tensors)
+            stages["dsen2"] = get_latency(
+                lambda: backend.pipeline.refine(*tensors), repeats
+            )
+            stages["vinacarbon"] = get_latency(
+                lambda: backend.pipeline.model(*refined), repeats
+            )
+    else:
+        stages["inference"] = get_latency(
+            lambda: backend.predict(preprocessed), repeats
+        )
+
+    raw_estimation = estimate_biomass(*inputs)[0]
+    transform = rasterio.transform.from_bounds(*get_bounds(size), size, size)
+
+    def mask():
+        mask = rasterio.features.geometry_mask(
+            multipolygon.geoms, out_shape=(size, size), transform=transform, invert=True
+        )
+        return np.where(mask, raw_estimation, np.nan)
+
+    stages["masking"] = get_latency(mask, repeats)
+
+    estimation = service.get_estimation(feature_collection)
+    stages["geotiff"] = get_latency(lambda: estimation.stream(), repeats)
+
+    end_to_end = get_latency(
+        lambda: service.get_estimation(feature_collection).stream(), repeats
+    )
+
+    from src.services.caching import VersionedCache
+
+    service.results = VersionedCache(
+        2**30, 60, getsizeof=lambda estimation: estimation.data.nbytes
+    )
+    service.get_estimation(feature_collection)
+    cached = get_latency(
+        lambda: service.get_estimation(feature_collection).stream(), repeats
+    )
+
+    return {
+        "size": size,
+        "latency_ms": end_to_end,
+        "cached_latency_ms": cached,
+        "stages_ms": stages,
+        "peak_rss_mb": get_peak_rss(),
+        "model_rss_mb": rss_after_load,
+        "output_bytes": estimation.stream().getbuffer().nbytes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the biomass estimation pipeline offline, on synthetic "
+        "inputs and randomly initialised models."
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    configure_environment(
+        model_cache_dir=os.path.join(directory, "cache"),
+        estimation_area_limit=str(10**12),
+        estimation_window_area_limit=str(10**12),
+    )
+    save_random_models(directory)
+
+    context = multiprocessing.get_context("spawn")
+    report = []
+    for size in args.sizes:
+        with context.Pool(1) as pool:
+            report.append(pool.apply(run, (size, args.repeats, directory)))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
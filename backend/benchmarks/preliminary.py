@@ -0,0 +1,174 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import (
+    ORIGIN_LONLAT,
+    PIXEL_SIZE,
+    configure_environment,
+    save_preliminary_estimations,
+)
+
+# AOIs of `SIZE` x `SIZE` pixels inside one tile, straddling two tiles and at the
+# corner of four tiles, as offsets (in pixels) from the first tile boundary.
+SIZE = 141
+CASES = {"inside": (-300, -300), "straddling": (-300, -70), "corner": (-70, -70)}
+
+
+def get_feature_collection(row: int, col: int, size: int):
+    import shapely.geometry
+
+    from src.models import FeatureCollection
+
+    resolution = PIXEL_SIZE / 111_320
+    minx = ORIGIN_LONLAT[0] + col * resolution
+    maxy = ORIGIN_LONLAT[1] - row * resolution
+    polygon = shapely.geometry.box(
+        minx, maxy - size * resolution, minx + size * resolution, maxy
+    )
+    return FeatureCollection.model_validate(
+        {
+            "type": "FeatureCollection",
+            "features": [
+                {"type": "Feature", "geometry": shapely.geometry.mapping(polygon)}
+            ],
+        }
+    )
+
+
+def get_latency(function, repeats: int) -> dict[str, float]:
+    latencies = []
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - started_at)
+
+    return {
+        "p50": float(np.percentile(latencies, 50) * 1_000),
+        "p95": float(np.percentile(latencies, 95) * 1_000),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure preliminary estimations read from a tiled raster set, "
+        "for AOIs inside one tile and across tile boundaries, and for the whole set "
+        "in level-of-detail mode."
+    )
+    parser.add_argument("--tiles", type=int, default=2)
+    parser.add_argument("--tile-size", type=int, default=1_024)
+    parser.add_argument("--size", type=int, default=SIZE)
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--max-pixels", type=int, default=256 * 256)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    whole_path, list_path = save_preliminary_estimations(
+        directory, args.tiles, args.tile_size, np.random.default_rng(0)
+    )
+    whole_list_path = os.path.join(directory, "whole.txt")
+    with open(whole_list_path, "w") as file:
+        file.write(whole_path)
+
+    configure_environment(
+        preliminary_estimation_list_path=list_path,
+        estimation_area_limit=str(10**12),
+        estimation_window_area_limit=str(10**12),
+    )
+
+    from src.services.biomass import BiomassPreliminaryEstimationService
+    from src.settings import SETTINGS
+
+    service = BiomassPreliminaryEstimationService()
+    SETTINGS.preliminary_estimation_list_path = whole_list_path
+    whole_service = BiomassPreliminaryEstimationService()
+
+    report = []
+    for case, (row, col) in CASES.items():
+        feature_collection = get_feature_collection(
+            args.tile_size + row, args.tile_size + col, args.size
+        )
+        started_at = time.perf_counter()
+        estimation = service.get_estimation(feature_collection)
+        cold_latency = time.perf_counter() - started_at
+        expected = whole_service.get_estimation(feature_collection)
+        assert np.array_equal(estimation.data, expected.data, equal_nan=True)
+
+        report.append(
+            {
+                "case": case,
+                "tiles_read": len(
+                    service.get_covering_preliminary_estimations(
+                        estimation.bounding_box
+                    )
+                ),
+                "cold_latency_ms": cold_latency * 1_000,
+                "latency_ms": get_latency(
+                    lambda: service.get_estimation(feature_collection), args.repeats
+                ),
+                "whole_latency_ms": get_latency(
+                    lambda: whole_service.get_estimation(feature_collection),
+                    args.repeats,
+                ),
+            }
+        )
+
+    # The whole raster set, at full resolution and within the pixel budget. Totals
+    # must agree since statistics are weighted by the coarser pixel area.
+    feature_collection = get_feature_collection(0, 0, args.tiles * args.tile_size - 1)
+    statistics = {
+        mode: {
+            f"{item['name']} ({item['unit']})": item["value"]
+            for item in service.get_estimation(
+                feature_collection, max_pixels
+            ).statistics
+        }
+        for mode, max_pixels in (("full", None), ("lod", args.max_pixels))
+    }
+    lod_estimation = service.get_estimation(feature_collection, args.max_pixels)
+
+    # The synthetic rasters have no nodata, so the area covered by the pixels is
+    # the geodesic area of the polygon.
+    polygon_area, _ = service.geod.geometry_area_perimeter(
+        feature_collection.get_multipolygon()
+    )
+    polygon_area = abs(polygon_area) / 10_000
+    area_errors = {
+        mode: abs(values["Diện tích (ha)"] - polygon_area) / polygon_area
+        for mode, values in statistics.items()
+    }
+    assert all(error < 0.01 for error in area_errors.values())
+
+    report.append(
+        {
+            "case": "level_of_detail",
+            "shape": list(lod_estimation.data.shape),
+            "polygon_area_ha": polygon_area,
+            "area_relative_errors": area_errors,
+            "statistics": statistics,
+            "latency_ms": get_latency(
+                lambda: service.get_estimation(feature_collection, args.max_pixels),
+                args.repeats,
+            ),
+            "full_latency_ms": get_latency(
+                lambda: service.get_estimation(feature_collection), args.repeats
+            ),
+        }
+    )
+
+    report.append({"datasets": service.datasets.metrics()})
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
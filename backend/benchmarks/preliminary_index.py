@@ -0,0 +1,141 @@
+import argparse
+import json
+import math
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import ORIGIN_LONLAT, configure_environment
+
+configure_environment()
+
+import rasterio.profiles
+import rasterio.transform
+import shapely.geometry
+
+from src.models import BiomassEstimationGeoTIFF
+from src.services.biomass import BiomassPreliminaryEstimationService
+
+# National tile sets are split into square tiles of about 0.1 degree.
+TILE_SIZE = 0.1
+TILE_PIXELS = 1_000
+COUNTS = [10, 100, 1_000, 10_000]
+
+
+class SyntheticPreliminaryEstimationService(BiomassPreliminaryEstimationService):
+    def __init__(self, count: int):
+        # A square grid of `count` tiles, profiles only.
+        columns = math.ceil(math.sqrt(count))
+        estimations: list[BiomassEstimationGeoTIFF] = []
+        for i in range(count):
+            minx = ORIGIN_LONLAT[0] + (i % columns) * TILE_SIZE
+            miny = ORIGIN_LONLAT[1] + (i // columns) * TILE_SIZE
+            profile = rasterio.profiles.DefaultGTiffProfile(
+                count=1,
+                dtype="float32",
+                crs="EPSG:4326",
+                height=TILE_PIXELS,
+                width=TILE_PIXELS,
+                transform=rasterio.transform.from_bounds(
+                    minx,
+                    miny,
+                    minx + TILE_SIZE,
+                    miny + TILE_SIZE,
+                    TILE_PIXELS,
+                    TILE_PIXELS,
+                ),
+            )
+            estimations.append(
+                BiomassEstimationGeoTIFF(data=f"tile-{i}.tif", profile=profile)
+            )
+
+        self.columns = columns
+        started_at = time.perf_counter()
+        self.set_preliminary_estimations(estimations)
+        self.build_time = time.perf_counter() - started_at
+
+
+def get_linear_estimation(
+    service: BiomassPreliminaryEstimationService, bbox: shapely.geometry.Polygon
+) -> BiomassEstimationGeoTIFF | None:
+    # Previous lookup, a scan over every footprint.
+    for estimation in service.preliminary_estimations:
+        if estimation.bounding_box.contains(bbox):
+            return estimation
+
+    return None
+
+
+def get_queries(
+    service: SyntheticPreliminaryEstimationService, count: int, rng: np.random.Generator
+) -> list[shapely.geometry.Polygon]:
+    # 200 ha AOIs (about 0.013 degree wide) anywhere on the grid, some of them
+    # straddling tile boundaries.
+    rows = math.ceil(len(service.preliminary_estimations) / service.columns)
+    size = 0.013
+    queries = []
+    for _ in range(count):
+        minx = ORIGIN_LONLAT[0] + rng.uniform(0, service.columns * TILE_SIZE - size)
+        miny = ORIGIN_LONLAT[1] + rng.uniform(0, rows * TILE_SIZE - size)
+        queries.append(shapely.geometry.box(minx, miny, minx + size, miny + size))
+
+    return queries
+
+
+def measure(function, queries: list[shapely.geometry.Polygon]) -> dict[str, float]:
+    latencies = []
+    for query in queries:
+        started_at = time.perf_counter()
+        function(query)
+        latencies.append(time.perf_counter() - started_at)
+
+    return {
+        "p50_us": float(np.percentile(latencies, 50) * 1_000_000),
+        "p95_us": float(np.percentile(latencies, 95) * 1_000_000),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare preliminary raster lookup through the spatial index "
+        "with a linear scan as the number of tiles grows."
+    )
+    parser.add_argument("--counts", type=int, nargs="+", default=COUNTS)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    report = []
+    for count in args.counts:
+        service = SyntheticPreliminaryEstimationService(count)
+        queries = get_queries(service, args.queries, rng)
+
+        for query in queries:
+            assert service.get_preliminary_estimation(query) is get_linear_estimation(
+                service, query
+            )
+
+        report.append(
+            {
+                "count": count,
+                "build_ms": service.build_time * 1_000,
+                "linear": measure(
+                    lambda query: get_linear_estimation(service, query), queries
+                ),
+                "index": measure(service.get_preliminary_estimation, queries),
+                "index_intersecting": measure(
+                    service.get_intersecting_preliminary_estimations, queries
+                ),
+            }
+        )
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import argparse
+import json
+import time
+
+import numpy as np
+import torch
+from torchvision.transforms import v2 as transforms
+
+from benchmarks.synthetic import configure_environment, get_inputs
+
+configure_environment()
+
+from src.ai.preprocessing import SCALE_FACTOR, preprocess
+from src.settings import SETTINGS
+
+SIZES = [64, 141, 256, 512]
+
+
+def get_legacy_transform(collection_id: str, height: int, width: int):
+    # The per-collection torchvision pipelines that `preprocess` replaced.
+    resize = transforms.Resize(
+        size=(height, width),
+        interpolation=transforms.InterpolationMode.BILINEAR,
+    )
+    if collection_id == "coords":
+        return transforms.Compose(
+            [
+                torch.from_numpy,
+                transforms.ToDtype(torch.float32),
+                resize,
+                lambda img: img / 10_000,
+            ]
+        )
+    elif collection_id == "sen1":
+        return transforms.Compose(
+            [transforms.ToImage(), transforms.ToDtype(torch.float32, scale=True)]
+        )
+    else:
+        return transforms.Compose(
+            [
+                transforms.ToImage(),
+                transforms.ToDtype(torch.float32),
+                resize,
+                lambda img: img / SCALE_FACTOR,
+            ]
+        )
+
+
+def legacy_preprocess(*groups: np.ndarray) -> list[np.ndarray]:
+    height, width, _ = groups[1].shape
+    return [
+        get_legacy_transform(collection_id, height, width)(group).unsqueeze(0).numpy()
+        for collection_id, group in zip(
+            ["coords", "sen1", "sen2_10m", "sen2_20m", "sen2_60m"], groups
+        )
+    ]
+
+
+def measure(function, inputs: list[np.ndarray], repeats: int):
+    outputs = function(*inputs)
+    latencies = []
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        function(*inputs)
+        latencies.append(time.perf_counter() - started_at)
+
+    return outputs, float(np.median(latencies) * 1_000)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the preprocessing engine, as run with the torch and "
+        "the ONNX backends, with the torchvision pipelines."
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    report = []
+    for size in args.sizes:
+        inputs = get_inputs(size, rng)
+        legacy_outputs, legacy_latency = measure(
+            legacy_preprocess, inputs, args.repeats
+        )
+        # Large grids are only resized by torch when it serves the models.
+        latencies = {"legacy": legacy_latency}
+        errors = {}
+        for backend in ["torch", "onnx"]:
+            SETTINGS.inference_backend = backend
+            outputs, latencies[backend] = measure(preprocess, inputs, args.repeats)
+            errors[backend] = max(
+                float(np.abs(output - legacy_output).max())
+                for output, legacy_output in zip(outputs, legacy_outputs)
+            )
+
+        report.append(
+            {
+                "size": size,
+                "latency_ms": latencies,
+                "speedup": {
+                    backend: legacy_latency / latencies[backend] for backend in errors
+                },
+                "max_abs_error": errors,
+            }
+        )
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
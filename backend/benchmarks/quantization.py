@@ -0,0 +1,102 @@
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import resource
+import time
+
+import numpy as np
+
+PRECISIONS = ["fp32", "int8"]
+
+
+def run_precision(
+    precision: str, samples_path: str, calibration_path: str, repeats: int
+):
+    os.environ["INFERENCE_BACKEND"] = "torch"
+    os.environ["INFERENCE_PRECISION"] = precision
+    os.environ["INFERENCE_BATCHING"] = "false"
+    os.environ["QUANTIZATION_CALIBRATION_PATH"] = calibration_path
+
+    import torch
+    from src.ai import biomass
+    from src.ai.registry import MODELS
+
+    inference_model = MODELS.get("biomass").pipeline.model
+    buffer = io.BytesIO()
+    if isinstance(inference_model, torch.jit.ScriptModule):
+        torch.jit.save(inference_model, buffer)
+    else:
+        torch.save(inference_model.state_dict(), buffer)
+
+    samples = np.load(samples_path)
+    latencies: list[float] = []
+    estimations: list[np.ndarray] = []
+    for i in range(len(samples["sen1"])):
+        inputs = [
+            samples[collection_id][i]
+            for collection_id in ("coords", "sen1", "sen2_10m", "sen2_20m", "sen2_60m")
+        ]
+        for _ in range(repeats):
+            started_at = time.perf_counter()
+            estimation = biomass.estimate_biomass(*inputs)
+            latencies.append(time.perf_counter() - started_at)
+
+        estimations.append(estimation[0])
+
+    return {
+        "latency_ms": {
+            "p50": float(np.percentile(latencies, 50) * 1_000),
+            "p95": float(np.percentile(latencies, 95) * 1_000),
+        },
+        "model_size_mb": buffer.getbuffer().nbytes / 2**20,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10,
+        "estimations": estimations,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare fp32 and INT8 biomass inference on sample Sentinel tiles."
+    )
+    parser.add_argument("--samples", required=True, help="Evaluation samples (.npz)")
+    parser.add_argument("--calibration", required=True, help="Calibration set (.npz)")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    # Each precision runs in a fresh process so peak RSS is not shared between them.
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for precision in PRECISIONS:
+        with context.Pool(1) as pool:
+            results[precision] = pool.apply(
+                run_precision,
+                (precision, args.samples, args.calibration, args.repeats),
+            )
+
+    reference = np.concatenate(
+        [estimation.ravel() for estimation in results["fp32"]["estimations"]]
+    )
+    report = {}
+    for precision, result in results.items():
+        estimation = np.concatenate(
+            [estimation.ravel() for estimation in result.pop("estimations")]
+        )
+        error = estimation - reference
+        report[precision] = {
+            **result,
+            "agbd_rmse": float(np.sqrt(np.mean(error**2))),
+            "agbd_bias": float(np.mean(error)),
+        }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
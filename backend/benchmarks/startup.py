@@ -0,0 +1,80 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import configure_environment, save_preliminary_estimations
+
+GRIDS = [2, 8, 16]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure how long loading the preliminary raster profiles takes "
+        "as the raster count grows: sequential header reads (previous startup), "
+        "concurrent header reads and the manifest."
+    )
+    parser.add_argument("--grids", type=int, nargs="+", default=GRIDS)
+    parser.add_argument("--tile-size", type=int, default=64)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    configure_environment(
+        preliminary_estimation_list_path=os.path.join(directory, "unused.txt")
+    )
+
+    import rasterio
+
+    from src.services.manifest import (
+        get_preliminary_estimation_urls,
+        load_manifest,
+        read_preliminary_estimations,
+        save_manifest,
+    )
+
+    report = []
+    for grid in args.grids:
+        grid_directory = os.path.join(directory, str(grid))
+        _, list_path = save_preliminary_estimations(
+            grid_directory, grid, args.tile_size, np.random.default_rng(0)
+        )
+        urls = get_preliminary_estimation_urls(list_path)
+        manifest_path = os.path.join(grid_directory, "manifest.json")
+
+        started_at = time.perf_counter()
+        for url in urls:
+            with rasterio.open(url) as src:
+                src.profile
+        sequential = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        estimations = read_preliminary_estimations(urls)
+        concurrent = time.perf_counter() - started_at
+
+        save_manifest(manifest_path, estimations)
+        started_at = time.perf_counter()
+        assert load_manifest(manifest_path, urls) is not None
+        manifest = time.perf_counter() - started_at
+
+        report.append(
+            {
+                "rasters": len(urls),
+                "sequential_ms": sequential * 1_000,
+                "concurrent_ms": concurrent * 1_000,
+                "manifest_ms": manifest * 1_000,
+            }
+        )
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
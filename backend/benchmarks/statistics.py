@@ -0,0 +1,121 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.synthetic import ORIGIN_UTM, PIXEL_SIZE, UTM_CRS, configure_environment
+
+
+def get_previous_statistics(data: np.ndarray) -> dict[str, float]:
+    # Statistics as computed before the block-wise engine, one fancy-indexed copy
+    # of the valid pixels per value.
+    raw_estimation = np.abs(data)
+    valid = ~np.isnan(raw_estimation)
+    return {
+        "count": float(np.count_nonzero(valid)),
+        "min": float(raw_estimation[valid].min()),
+        "max": float(raw_estimation[valid].max()),
+        "mean": float(raw_estimation[valid].mean()),
+        "sum": float((raw_estimation / 100)[valid].sum() * 100),
+    }
+
+
+def profile(function) -> tuple[float, float]:
+    # Latency in ms and peak traced allocation in MB.
+    tracemalloc.start()
+    started_at = time.perf_counter()
+    function()
+    latency = time.perf_counter() - started_at
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return latency * 1_000, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the block-wise statistics engine with the previous "
+        "full-array statistics, on an in-memory estimation and on a tiled GeoTIFF "
+        "read block by block."
+    )
+    parser.add_argument("--size", type=int, default=4_096)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    configure_environment()
+
+    import rasterio
+    import rasterio.transform
+
+    from src.services.statistics import get_array_statistics, get_raster_statistics
+
+    rng = np.random.default_rng(0)
+    data = rng.gamma(4, 30, (args.size, args.size)).astype(np.float32)
+    data[rng.random(data.shape) < 0.3] = np.nan
+
+    path = os.path.join(tempfile.mkdtemp(), "estimation.tif")
+    with rasterio.open(
+        path,
+        "w",
+        driver="GTiff",
+        height=args.size,
+        width=args.size,
+        count=1,
+        dtype="float32",
+        nodata=np.nan,
+        crs=UTM_CRS,
+        transform=rasterio.transform.from_origin(*ORIGIN_UTM, PIXEL_SIZE, PIXEL_SIZE),
+        tiled=True,
+        blockxsize=512,
+        blockysize=512,
+    ) as dst:
+        dst.write(data, 1)
+
+    previous = get_previous_statistics(data)
+    statistics = get_array_statistics(data)
+    with rasterio.open(path) as src:
+        raster_statistics = get_raster_statistics(src)
+
+    valid = data[~np.isnan(data)].astype(np.float64)
+    for result in (statistics, raster_statistics):
+        assert result.count == previous["count"]
+        assert result.min == previous["min"] and result.max == previous["max"]
+        assert np.isclose(result.mean, valid.mean())
+        assert np.isclose(result.sum, valid.sum())
+        assert np.isclose(result.variance, valid.var())
+
+    percentiles = {
+        q: {"engine": statistics.percentile(q), "exact": float(np.percentile(valid, q))}
+        for q in (10, 50, 90)
+    }
+    for value in percentiles.values():
+        assert abs(value["engine"] - value["exact"]) <= statistics.bin_width
+
+    def read_raster_statistics():
+        with rasterio.open(path) as src:
+            get_raster_statistics(src)
+
+    report = {}
+    for name, function in (
+        ("previous", lambda: get_previous_statistics(data)),
+        ("array", lambda: get_array_statistics(data)),
+        ("raster", read_raster_statistics),
+    ):
+        latency, peak = profile(function)
+        report[name] = {"latency_ms": latency, "peak_mb": peak}
+
+    report["input_mb"] = data.nbytes / 2**20
+    report["percentiles"] = percentiles
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import argparse
+import json
+import tempfile
+
+import numpy as np
+
+from benchmarks.preliminary import get_latency
+from benchmarks.synthetic import (
+    ORIGIN_LONLAT,
+    PIXEL_SIZE,
+    configure_environment,
+    save_preliminary_estimations,
+)
+
+# Discs of `radius` pixels inside one tile and on the corner of four tiles, as the
+# offset (in pixels) of their centre from the first tile corner. The default
+# radius leaves whole 512 px COG blocks inside the discs.
+CASES = {"inside": (-1_024, -1_024), "corner": (0, 0)}
+
+
+def get_feature_collection(row: float, col: float, radius: float):
+    import shapely.geometry
+
+    from src.models import FeatureCollection
+
+    resolution = PIXEL_SIZE / 111_320
+    disc = shapely.geometry.Point(
+        ORIGIN_LONLAT[0] + col * resolution, ORIGIN_LONLAT[1] - row * resolution
+    ).buffer(radius * resolution)
+    return FeatureCollection.model_validate(
+        {
+            "type": "FeatureCollection",
+            "features": [
+                {"type": "Feature", "geometry": shapely.geometry.mapping(disc)}
+            ],
+        }
+    )
+
+
+def get_relative_differences(
+    statistics: list[dict], expected: list[dict]
+) -> dict[str, float]:
+    # Area and totals, the grids differ so pixels along the boundary may not.
+    return {
+        item["unit"]: abs(item["value"] - reference["value"]) / reference["value"]
+        for item, reference in zip(statistics[:6], expected[:6])
+        if item["unit"] in ("ha", "Mg") and reference["value"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the statistics-only preliminary endpoint with the full "
+        "endpoint (estimation and GeoTIFF encoding), with and without reused block "
+        "summaries."
+    )
+    parser.add_argument("--tiles", type=int, default=2)
+    parser.add_argument("--tile-size", type=int, default=2_048)
+    parser.add_argument("--radius", type=int, default=800)
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--max-pixels", type=int, default=256 * 256)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    _, list_path = save_preliminary_estimations(
+        directory, args.tiles, args.tile_size, np.random.default_rng(0)
+    )
+    configure_environment(
+        preliminary_estimation_list_path=list_path,
+        estimation_area_limit=str(10**12),
+        estimation_window_area_limit=str(10**12),
+    )
+
+    from src.api.biomass import stream_estimation
+    from src.services.biomass import BiomassPreliminaryEstimationService
+
+    service = BiomassPreliminaryEstimationService()
+
+    def get_full_statistics(feature_collection, max_pixels=None):
+        estimation = service.get_estimation(feature_collection, max_pixels)
+        stream_estimation(estimation)
+        return estimation.statistics
+
+    def get_cold_statistics(feature_collection, max_pixels=None):
+        with service.block_statistics_lock:
+            service.block_statistics.clear()
+        return service.get_statistics(feature_collection, max_pixels)
+
+    cases = {
+        case: (
+            get_feature_collection(
+                args.tile_size + row, args.tile_size + col, args.radius
+            ),
+            None,
+        )
+        for case, (row, col) in CASES.items()
+    }
+    half = args.tiles * args.tile_size / 2
+    cases["level_of_detail"] = (
+        get_feature_collection(half, half, half - 1),
+        args.max_pixels,
+    )
+
+    report = []
+    for case, (feature_collection, max_pixels) in cases.items():
+        expected = get_full_statistics(feature_collection, max_pixels)
+        statistics = service.get_statistics(feature_collection, max_pixels)
+        report.append(
+            {
+                "case": case,
+                "relative_differences": get_relative_differences(statistics, expected),
+                "full_latency_ms": get_latency(
+                    lambda: get_full_statistics(feature_collection, max_pixels),
+                    args.repeats,
+                ),
+                "cold_latency_ms": get_latency(
+                    lambda: get_cold_statistics(feature_collection, max_pixels),
+                    args.repeats,
+                ),
+                "latency_ms": get_latency(
+                    lambda: service.get_statistics(feature_collection, max_pixels),
+                    args.repeats,
+                ),
+            }
+        )
+
+    report.append({"block_statistics": service.block_statistics_metrics()})
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
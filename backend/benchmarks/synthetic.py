@@ -0,0 +1,213 @@
+import math
+import os
+
+import numpy as np
+
+# Settings without defaults. Offline benchmarks never reach Azure, GEE or the
+# preliminary rasters, so placeholders are enough to import the application.
+REQUIRED_SETTINGS = [
+    "SEARCH_ENDPOINT",
+    "SEARCH_KEY",
+    "SEARCH_INDEX_NAME",
+    "COSMOS_ENDPOINT",
+    "COSMOS_KEY",
+    "COSMOS_DATABASE_NAME",
+    "BLOB_STORAGE_CONNECTION_STRING",
+    "BLOB_CONTAINER_NAME",
+    "FOUNDRY_PROJECT_ENDPOINT",
+    "FOUNDRY_AGENT_NAME",
+    "ENTRA_ID_CLIENT_ID",
+    "ENTRA_ID_CLIENT_SECRET",
+    "ENTRA_ID_TENANT_ID",
+    "GEE_SERVICE_ACCOUNT",
+    "GEE_PRIVATE_KEY_PATH",
+    "PRELIMINARY_ESTIMATION_LIST_PATH",
+    "NEXTAUTH_SECRET",
+    "JWT_ALGORITHM",
+]
+
+# Top-left corner of the synthetic AOIs, in lon/lat and in UTM zone 48N.
+ORIGIN_LONLAT = (105.8, 21.0)
+ORIGIN_UTM = (583_000.0, 2_322_000.0)
+UTM_CRS = "EPSG:32648"
+PIXEL_SIZE = 10.0
+
+
+def configure_environment(**settings: str) -> None:
+    for name in REQUIRED_SETTINGS:
+        os.environ.setdefault(name, "offline")
+
+    for name, value in settings.items():
+        os.environ[name.upper()] = value
+
+
+def save_random_models(directory: str, seed: int = 0) -> None:
+    # Randomly initialised stand-ins with the layout of the real checkpoints: DSen2
+    # as a TorchScript stem, residual blocks and projection, VinaCarbon as a
+    # training checkpoint holding its state dict.
+    import torch
+    import torch.nn as nn
+
+    from src.ai.models.vinacarbon import VinaCarbon
+
+    class ResidualBlock(nn.Module):
+        def __init__(self, channels: int):
+            super(ResidualBlock, self).__init__()
+            self.layers = nn.Sequential(
+                nn.Conv2d(channels, channels, 3, padding=1),
+                nn.ReLU(inplace=True),
+                nn.Conv2d(channels, channels, 3, padding=1),
+            )
+
+        def forward(self, x):
+            return x + 0.1 * self.layers(x)
+
+    def get_dsen2(in_channels: int, out_channels: int, blocks: int = 6):
+        return nn.Sequential(
+            nn.Conv2d(in_channels, 128, 3, padding=1),
+            nn.ReLU(inplace=True),
+            *[ResidualBlock(128) for _ in range(blocks)],
+            nn.Conv2d(128, out_channels, 3, padding=1),
+        ).eval()
+
+    torch.manual_seed(seed)
+    os.makedirs(directory, exist_ok=True)
+    torch.jit.save(
+        torch.jit.script(get_dsen2(10, 6)), os.path.join(directory, "L2A20M.pt")
+    )
+    torch.jit.save(
+        torch.jit.script(get_dsen2(12, 2)), os.path.join(directory, "L2A60M.pt")
+    )
+    torch.save(
+        {"model": VinaCarbon().state_dict()}, os.path.join(directory, "vinacarbon.pth")
+    )
+
+
+def use_random_models(directory: str) -> None:
+    # Points the torch backend at the models written by `save_random_models`. Must
+    # run in every process before the models are first loaded.
+    from src.ai.backends import pytorch
+
+    pytorch.DSEN2_20M_PATH = os.path.join(directory, "L2A20M.pt")
+    pytorch.DSEN2_60M_PATH = os.path.join(directory, "L2A60M.pt")
+    pytorch.VINACARBON_PATH = os.path.join(directory, "vinacarbon.pth")
+
+
+def get_inputs(size: int, rng: np.random.Generator) -> list[np.ndarray]:
+    # Raw arrays as returned by the runtime service for a `size` x `size` AOI.
+    x = ORIGIN_UTM[0] + (np.arange(size) + 0.5) * PIXEL_SIZE
+    y = ORIGIN_UTM[1] - (np.arange(size) + 0.5) * PIXEL_SIZE
+    coords = np.stack(np.meshgrid(x, y), axis=0)
+
+    return [
+        coords,
+        rng.uniform(-25, 0, (size, size, 2)),
+        rng.integers(0, 10_000, (size, size, 4)),
+        rng.integers(0, 10_000, (-(-size // 2), -(-size // 2), 6)),
+        rng.integers(0, 10_000, (-(-size // 6), -(-size // 6), 2)),
+    ]
+
+
+def get_bounds(size: int) -> tuple[float, float, float, float]:
+    # Lon/lat bounds of a `size` x `size` AOI of 10 m pixels.
+    lon, lat = ORIGIN_LONLAT
+    height = size * PIXEL_SIZE / 111_320
+    width = height / math.cos(math.radians(lat))
+    return lon, lat - height, lon + width, lat
+
+
+def save_local_imagery(directory: str, size: int, rng: np.random.Generator) -> None:
+    # One Cloud-Optimized GeoTIFF per band group, in the layout read by
+    # `LocalImageryProvider`, covering the AOI of `get_bounds(size)` with margin.
+    import rasterio
+    import rasterio.transform
+    import rasterio.warp
+
+    from src.services.imagery import BANDS
+
+    minx, miny, maxx, maxy = rasterio.warp.transform_bounds(
+        "EPSG:4326", UTM_CRS, *get_bounds(size)
+    )
+    margin = size * PIXEL_SIZE
+    left = math.floor((minx - margin) / 60) * 60
+    top = math.ceil((maxy + margin) / 60) * 60
+    extent = math.ceil((max(maxx - minx, maxy - miny) + 2 * margin) / 60) * 60
+
+    for collection_id, bands in BANDS.items():
+        resolution = {"sen2_20m": 20, "sen2_60m": 60}.get(collection_id, 10)
+        length = extent // resolution
+        if collection_id == "sen1":
+            data = rng.uniform(-25, 0, (len(bands), length, length)).astype(np.float32)
+        else:
+            data = rng.integers(0, 10_000, (len(bands), length, length), np.uint16)
+
+        os.makedirs(os.path.join(directory, collection_id), exist_ok=True)
+        with rasterio.open(
+            os.path.join(directory, collection_id, "scene.tif"),
+            "w",
+            driver="COG",
+            height=length,
+            width=length,
+            count=len(bands),
+            dtype=data.dtype,
+            crs=UTM_CRS,
+            transform=rasterio.transform.from_origin(left, top, resolution, resolution),
+        ) as dst:
+            dst.write(data)
+            dst.descriptions = tuple(bands)
+
+
+def save_preliminary_estimations(
+    directory: str, tiles: int, tile_size: int, rng: np.random.Generator
+) -> tuple[str, str]:
+    # A national-style preliminary raster in lon/lat, starting at the AOI origin,
+    # written whole and split into `tiles` x `tiles` Cloud-Optimized GeoTIFFs.
+    # Returns the path of the whole raster and of the list of tiles.
+    import rasterio
+    import rasterio.transform
+    import rasterio.windows
+
+    resolution = PIXEL_SIZE / 111_320
+    length = tiles * tile_size
+    data = rng.uniform(0, 300, (length, length)).astype(np.float32)
+    transform = rasterio.transform.from_origin(
+        ORIGIN_LONLAT[0], ORIGIN_LONLAT[1], resolution, resolution
+    )
+    profile = {
+        "driver": "COG",
+        "count": 1,
+        "dtype": "float32",
+        "nodata": np.nan,
+        "crs": "EPSG:4326",
+    }
+
+    os.makedirs(directory, exist_ok=True)
+    whole_path = os.path.join(directory, "whole.tif")
+    with rasterio.open(
+        whole_path, "w", height=length, width=length, transform=transform, **profile
+    ) as dst:
+        dst.write(data, 1)
+
+    paths = []
+    for row in range(tiles):
+        for col in range(tiles):
+            window = rasterio.windows.Window(
+                col * tile_size, row * tile_size, tile_size, tile_size
+            )
+            path = os.path.join(directory, f"tile-{row}-{col}.tif")
+            with rasterio.open(
+                path,
+                "w",
+                height=tile_size,
+                width=tile_size,
+                transform=rasterio.windows.transform(window, transform),
+                **profile,
+            ) as dst:
+                dst.write(data[window.toslices()], 1)
+            paths.append(path)
+
+    list_path = os.path.join(directory, "tiles.txt")
+    with open(list_path, "w") as file:
+        file.write("\n".join(paths))
+
+    return whole_path, list_path
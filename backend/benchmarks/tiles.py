@@ -0,0 +1,116 @@
+import argparse
+import io
+import json
+import math
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import (
+    ORIGIN_LONLAT,
+    configure_environment,
+    save_preliminary_estimations,
+)
+
+
+def get_tile_index(lon: float, lat: float, z: int) -> tuple[int, int]:
+    n = 2**z
+    x = int((lon + 180) / 360 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return x, y
+
+
+def measure(function, tiles: list[tuple[int, int, int]]) -> dict[str, float]:
+    latencies = []
+    for tile in tiles:
+        started_at = time.perf_counter()
+        function(*tile)
+        latencies.append(time.perf_counter() - started_at)
+
+    return {
+        "p50_ms": float(np.percentile(latencies, 50) * 1_000),
+        "p95_ms": float(np.percentile(latencies, 95) * 1_000),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure rendering Web Mercator tiles of tiled preliminary "
+        "rasters while panning: cold, from the memory cache and from the disk "
+        "cache after a restart."
+    )
+    parser.add_argument("--tiles", type=int, default=2)
+    parser.add_argument("--tile-size", type=int, default=1_024)
+    parser.add_argument("--zoom", type=int, default=14)
+    parser.add_argument("--span", type=int, default=4)
+    parser.add_argument("--format", choices=["png", "tif"], default="png")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    whole_path, list_path = save_preliminary_estimations(
+        directory, args.tiles, args.tile_size, np.random.default_rng(0)
+    )
+    configure_environment(
+        preliminary_estimation_list_path=list_path,
+        preliminary_manifest_path=os.path.join(directory, "manifest.json"),
+        tile_cache_dir=os.path.join(directory, "cache"),
+    )
+
+    import rasterio
+    import rasterio.transform
+    import rasterio.warp
+
+    from src.services import BiomassPreliminaryEstimationService, BiomassTileService
+    from src.services.tiles import TILE_SIZE, get_tile_bounds
+
+    preliminary_service = BiomassPreliminaryEstimationService()
+    service = BiomassTileService(preliminary_service)
+
+    # A `span` x `span` block of tiles inside the raster set, panned row by row.
+    x, y = get_tile_index(ORIGIN_LONLAT[0], ORIGIN_LONLAT[1], args.zoom)
+    tiles = [
+        (args.zoom, x + 1 + col, y + 1 + row)
+        for row in range(args.span)
+        for col in range(args.span)
+    ]
+
+    # Float tiles must hold the value of the raster pixel under each tile pixel.
+    z, tile_x, tile_y = tiles[0]
+    with rasterio.open(io.BytesIO(service.get_tile(z, tile_x, tile_y, "tif"))) as src:
+        tile = src.read(1)
+    bounds = get_tile_bounds(z, tile_x, tile_y)
+    transform = rasterio.transform.from_bounds(*bounds, TILE_SIZE, TILE_SIZE)
+    rows, cols = np.indices(tile.shape)
+    xs, ys = rasterio.transform.xy(transform, rows.ravel(), cols.ravel())
+    lons, lats = rasterio.warp.transform("EPSG:3857", "EPSG:4326", xs, ys)
+    with rasterio.open(whole_path) as src:
+        expected = np.array([value[0] for value in src.sample(zip(lons, lats))])
+    matches = float(np.mean(np.isclose(tile.ravel(), expected)))
+
+    cold = measure(lambda *tile: service.get_tile(*tile, args.format), tiles)
+    memory = measure(lambda *tile: service.get_tile(*tile, args.format), tiles)
+    restarted_service = BiomassTileService(preliminary_service)
+    disk = measure(lambda *tile: restarted_service.get_tile(*tile, args.format), tiles)
+
+    report = {
+        "tiles": len(tiles),
+        "format": args.format,
+        "matching_pixels": matches,
+        "cold": cold,
+        "memory": memory,
+        "disk": disk,
+        "cache": service.metrics(),
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import hashlib
+import os
+from abc import ABC, abstractmethod
+from typing import Any, get_args
+
+import numpy as np
+from src.ai.registry import MODELS
+from src.models import CollectionID
+from src.settings import SETTINGS
+
+INPUT_NAMES: list[CollectionID] = list(get_args(CollectionID))
+
+
+class InferenceBackend(ABC):
+    # Backends run DSen2 + VinaCarbon on preprocessed inputs, one (N, C, H, W)
+    # float32 array per collection ID, and return the (N, 2, H, W) prediction.
+    @abstractmethod
+    def predict(self, inputs: list[np.ndarray]) -> np.ndarray:
+        pass
+
+
+def get_inference_threads() -> int:
+    # Unless configured, the cores are split evenly between the uvicorn workers so
+    # their intra-op thread pools do not oversubscribe the machine.
+    if SETTINGS.inference_threads > 0:
+        return SETTINGS.inference_threads
+
+    workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+    return max((os.cpu_count() or 1) // max(workers, 1), 1)
+
+
+def load_backend() -> InferenceBackend:
+    # Backends are imported lazily so that serving through ONNX Runtime does not
+    # import torch for inference.
+    if SETTINGS.inference_backend == "onnx":
+        from src.ai.backends.onnx import OnnxBackend
+
+        return OnnxBackend(
+            SETTINGS.onnx_model_path,
+            intra_op_threads=SETTINGS.onnx_intra_op_threads or get_inference_threads(),
+            inter_op_threads=SETTINGS.onnx_inter_op_threads,
+        )
+
+    from src.ai.backends.pytorch import TorchBackend
+
+    return TorchBackend()
+
+
+def load_torch_model(name: str) -> Any:
+    from src.ai.backends import pytorch
+
+    if name == "vinacarbon":
+        return pytorch.load_vinacarbon()
+
+    return pytorch.load_dsen2(
+        pytorch.DSEN2_20M_PATH if name == "dsen2_20m" else pytorch.DSEN2_60M_PATH
+    )
+
+
+# The PyTorch models are registered with the backends package rather than the
+# backend module, so they can be warmed up by name before (or without) torch
+# being imported.
+for name in ("dsen2_20m", "dsen2_60m", "vinacarbon"):
+    MODELS.register(name, lambda name=name: load_torch_model(name))
+
+
+def get_model_version() -> str:
+    # Changes whenever a checkpoint of the active backend is replaced, or the
+    # backend or precision serving it is switched.
+    if SETTINGS.inference_backend == "onnx":
+        paths = [SETTINGS.onnx_model_path]
+    else:
+        from src.ai.backends import pytorch
+
+        paths = [
+            pytorch.DSEN2_20M_PATH,
+            pytorch.DSEN2_60M_PATH,
+            pytorch.VINACARBON_PATH,
+        ]
+
+    key = f"{SETTINGS.inference_backend}:{SETTINGS.inference_precision}"
+    for path in paths:
+        stat = os.stat(path)
+        key += f":{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
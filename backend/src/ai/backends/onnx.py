@@ -0,0 +1,25 @@
+import numpy as np
+import onnxruntime as ort
+
+from src.ai.backends import INPUT_NAMES, InferenceBackend
+
+
+class OnnxBackend(InferenceBackend):
+    def __init__(self, path: str, intra_op_threads: int = 0, inter_op_threads: int = 0):
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        self.session = ort.InferenceSession(
+            path, options, providers=["CPUExecutionProvider"]
+        )
+
+    def predict(self, inputs: list[np.ndarray]) -> np.ndarray:
+        feeds = {
+            name: np.ascontiguousarray(array, dtype=np.float32)
+            for name, array in zip(INPUT_NAMES, inputs)
+        }
+        (estimation,) = self.session.run(["agbd"], feeds)
+        return estimation
@@ -0,0 +1,164 @@
+import argparse
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from src.ai.backends import INPUT_NAMES, InferenceBackend, get_inference_threads
+from src.ai.models.vinacarbon import InferenceVinaCarbon, VinaCarbon
+from src.ai.optimization import optimize_vinacarbon, quantize_vinacarbon
+from src.ai.preprocessing import preprocess
+from src.ai.registry import MODELS
+from src.settings import LOGGER, SETTINGS
+
+DSEN2_20M_PATH = "src/ai/models/L2A20M.pt"
+DSEN2_60M_PATH = "src/ai/models/L2A60M.pt"
+VINACARBON_PATH = "src/ai/models/vinacarbon.pth"
+
+DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+
+
+class BiomassPipeline(nn.Module):
+    def __init__(self, dsen2_20m: nn.Module, dsen2_60m: nn.Module, model: nn.Module):
+        super(BiomassPipeline, self).__init__()
+        self.dsen2_20m = dsen2_20m
+        self.dsen2_60m = dsen2_60m
+        self.model = model
+
+    def refine(self, coords, sen1, sen2_10m, sen2_20m, sen2_60m):
+        sen2_20m = sen2_20m + self.dsen2_20m(torch.cat([sen2_10m, sen2_20m], dim=1))
+
+        sen2_60m = sen2_60m + self.dsen2_60m(
+            torch.cat([sen2_10m, sen2_20m, sen2_60m], dim=1)
+        )
+
+        return coords, sen1, sen2_10m, sen2_20m, sen2_60m
+
+    def forward(self, coords, sen1, sen2_10m, sen2_20m, sen2_60m):
+        inputs = self.refine(coords, sen1, sen2_10m, sen2_20m, sen2_60m)
+        estimation = self.model(*inputs)
+        if isinstance(estimation, tuple):
+            _, _, estimation = estimation
+
+        return estimation
+
+
+def load_dsen2(path: str) -> torch.jit.ScriptModule:
+    dsen2 = torch.jit.load(path, map_location=DEVICE)
+    dsen2.eval()
+    return dsen2
+
+
+def load_vinacarbon() -> VinaCarbon:
+    # Memory-mapped weights are assigned to the module without a copy, so every
+    # worker serving from the same checkpoint shares one physical copy of them.
+    checkpoint = torch.load(
+        VINACARBON_PATH,
+        weights_only=False,
+        map_location=DEVICE,
+        mmap=SETTINGS.model_mmap and DEVICE == "cpu",
+    )
+    with torch.device("meta"):
+        model = VinaCarbon()
+    model.load_state_dict(checkpoint["model"], assign=True)
+    model.eval()
+    return model
+
+
+class TorchBackend(InferenceBackend):
+    def __init__(self):
+        self.device = DEVICE
+        torch.set_num_threads(get_inference_threads())
+
+        dsen2_20m = MODELS.get("dsen2_20m")
+        dsen2_60m = MODELS.get("dsen2_60m")
+        self.pipeline = BiomassPipeline(
+            dsen2_20m, dsen2_60m, self.load_inference_model(dsen2_20m, dsen2_60m)
+        )
+
+    @property
+    def model(self) -> VinaCarbon:
+        return MODELS.get("vinacarbon")
+
+    def load_inference_model(
+        self, dsen2_20m: nn.Module, dsen2_60m: nn.Module
+    ) -> nn.Module:
+        if SETTINGS.inference_precision == "int8":
+            if self.device != "cpu" or SETTINGS.quantization_calibration_path is None:
+                LOGGER.warning(
+                    "INT8 inference requires a CPU device and a calibration set, using fp32"
+                )
+            else:
+                pipeline = BiomassPipeline(dsen2_20m, dsen2_60m, self.model)
+                calibration_inputs = self.load_calibration_inputs(
+                    pipeline, SETTINGS.quantization_calibration_path
+                )
+                return quantize_vinacarbon(self.model, calibration_inputs)
+
+        if SETTINGS.inference_optimize:
+            return optimize_vinacarbon(lambda: self.model, VINACARBON_PATH, self.device)
+
+        return self.model
+
+    def load_calibration_inputs(
+        self, pipeline: BiomassPipeline, path: str
+    ) -> list[list[torch.Tensor]]:
+        # The calibration file is an `.npz` holding one array per collection ID, each
+        # stacking raw samples (as passed to `estimate_biomass`) on the first axis.
+        samples = np.load(path)
+        calibration_inputs: list[list[torch.Tensor]] = []
+        for i in range(len(samples["sen1"])):
+            inputs = preprocess(*[samples[name][i] for name in INPUT_NAMES])
+            tensors = [torch.from_numpy(array).to(self.device) for array in inputs]
+            with torch.no_grad():
+                calibration_inputs.append(list(pipeline.refine(*tensors)))
+
+        return calibration_inputs
+
+    def predict(self, inputs: list[np.ndarray]) -> np.ndarray:
+        tensors = [torch.from_numpy(array).to(self.device) for array in inputs]
+        with torch.no_grad():
+            estimation = self.pipeline(*tensors)
+
+        return estimation.cpu().numpy()
+
+    def export_onnx(self, path: str, opset_version: int = 17) -> None:
+        # The fp32 graph is exported with BatchNorm folded, so DSen2 and VinaCarbon
+        # end up as a single fused ONNX graph. The pipeline is scripted rather than
+        # traced because DSen2 is already a TorchScript module.
+        pipeline = torch.jit.script(
+            BiomassPipeline(
+                self.pipeline.dsen2_20m,
+                self.pipeline.dsen2_60m,
+                InferenceVinaCarbon(self.model),
+            ).eval()
+        )
+        example_inputs = tuple(
+            torch.rand((1, channels, 64, 64), device=self.device)
+            for channels in (2, 2, 4, 6, 2)
+        )
+        dynamic_axes = {
+            name: {0: "batch", 2: "height", 3: "width"}
+            for name in [*INPUT_NAMES, "agbd"]
+        }
+
+        torch.onnx.export(
+            pipeline,
+            example_inputs,
+            path,
+            input_names=INPUT_NAMES,
+            output_names=["agbd"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset_version,
+            dynamo=False,
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Export DSen2 + VinaCarbon as a single ONNX graph."
+    )
+    parser.add_argument("path", nargs="?", default=SETTINGS.onnx_model_path)
+    args = parser.parse_args()
+
+    TorchBackend().export_onnx(args.path)
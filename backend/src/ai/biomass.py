@@ -1,25 +1,14 @@
-import numpy as np
-import torch
-from torchvision.transforms import v2 as transforms
+from concurrent.futures import Future
 
-from src.ai.models.vinacarbon import VinaCarbon
-from src.models import CollectionID
+import numpy as np
 
-device = "cuda" if torch.cuda.is_available() else "cpu"
-dsen2_20m = torch.jit.load("src/ai/models/L2A20M.pt", map_location=device)
-dsen2_60m = torch.jit.load("src/ai/models/L2A60M.pt", map_location=device)
+from src.ai.backends import load_backend
+from src.ai.preprocessing import preprocess
+from src.ai.registry import MODELS
+from src.ai.scheduler import InferenceScheduler
+from src.settings import SETTINGS
 
-checkpoint = torch.load(
-    "src/ai/models/vinacarbon.pth",
-    weights_only=False,
-    map_location=device,
-)
-model = VinaCarbon().to(device)
-model.load_state_dict(checkpoint["model"])
-
-dsen2_20m.eval()
-dsen2_60m.eval()
-model.eval()
+MODELS.register("biomass", load_backend)
 
 
 def estimate_biomass(
@@ -30,95 +19,134 @@ def estimate_biomass(
     sen2_60m_np: np.ndarray,
 ) -> np.ndarray:
     height, width, _ = sen1_np.shape
-    coords = transform_data("coords", coords_np, height, width)
-    sen1 = transform_data("sen1", sen1_np, height, width)
-    sen2_10m = transform_data("sen2_10m", sen2_10m_np, height, width)
-    sen2_20m = transform_data("sen2_20m", sen2_20m_np, height, width)
-    sen2_60m = transform_data("sen2_60m", sen2_60m_np, height, width)
-    with torch.no_grad():
-        sen2_20m = sen2_20m + dsen2_20m(torch.cat([sen2_10m, sen2_20m], dim=1))
-
-        sen2_60m = sen2_60m + dsen2_60m(
-            torch.cat([sen2_10m, sen2_20m, sen2_60m], dim=1)
-        )
-
-        _, _, estimation = model(coords, sen1, sen2_10m, sen2_20m, sen2_60m)
-        estimation = estimation.squeeze(0).cpu().numpy()
-
-        return estimation
-
-
-def transform_data(
-    collection_id: CollectionID, data: np.ndarray, height: int, width: int
-) -> torch.Tensor:
-    transform = get_transform(collection_id, height, width)
-    tensor = transform(data)
-    tensor = tensor.unsqueeze(0).to(device)
-    return tensor
-
-
-SCALE_FACTOR = 2_000
-
-
-def get_transform(
-    collection_id: CollectionID, height: int, width: int
-) -> transforms.Compose:
-    if collection_id == "coords":
-        return transforms.Compose(
-            [
-                torch.from_numpy,
-                transforms.ToDtype(torch.float32),
-                transforms.Resize(
-                    size=(height, width),
-                    interpolation=transforms.InterpolationMode.BILINEAR,
-                ),
-                lambda img: img / 10_000,
-            ]
-        )
-    elif collection_id == "sen1":
-        return transforms.Compose(
-            [
-                transforms.ToImage(),
-                transforms.ToDtype(torch.float32, scale=True),
-                # transforms.Resize(
-                #     size=(height, width),
-                #     interpolation=transforms.InterpolationMode.BILINEAR,
-                # ),
-            ]
-        )
-    elif collection_id == "sen2_10m":
-        return transforms.Compose(
-            [
-                transforms.ToImage(),
-                transforms.ToDtype(torch.float32),
-                transforms.Resize(
-                    size=(height, width),
-                    interpolation=transforms.InterpolationMode.BILINEAR,
-                ),
-                lambda img: img / SCALE_FACTOR,
-            ]
-        )
-    elif collection_id == "sen2_20m":
-        return transforms.Compose(
-            [
-                transforms.ToImage(),
-                transforms.ToDtype(torch.float32),
-                transforms.Resize(
-                    size=(height, width),
-                    interpolation=transforms.InterpolationMode.BILINEAR,
-                ),
-                lambda img: img / SCALE_FACTOR,
-            ]
-        )
-    elif collection_id == "sen2_60m":
-        return transforms.Compose(
-            [
-                transforms.ToImage(),
-                transforms.ToDtype(torch.float32),
-                transforms.Resize(
-                    size=(height, width),
-                    interpolation=transforms.InterpolationMode.BILINEAR,
-                ),
-                lambda img: img / SCALE_FACTOR,
+    inputs = preprocess(coords_np, sen1_np, sen2_10m_np, sen2_20m_np, sen2_60m_np)
+
+    # Images that fit in one tile and its halo are predicted whole, directly on
+    # the calling thread. AOIs rarely share a shape, so they would wait for a
+    # batch only to run alone on the scheduler thread. Only the tiles of larger
+    # images, which do share a shape, are batched.
+    whole_size = SETTINGS.inference_tile_size + 2 * SETTINGS.inference_tile_halo
+    if height <= whole_size and width <= whole_size:
+        estimation = predict(inputs)
+    else:
+        estimation = predict_tiled(inputs, height, width)
+
+    estimation = estimation.squeeze(0)
+
+    return estimation
+
+
+def predict(inputs: list[np.ndarray]) -> np.ndarray:
+    return MODELS.get("biomass").predict(inputs)
+
+
+scheduler = InferenceScheduler(
+    predict,
+    max_batch_size=SETTINGS.inference_max_batch_size,
+    max_wait_ms=SETTINGS.inference_max_batch_wait_ms,
+    max_queue_size=SETTINGS.inference_max_queue_size,
+)
+
+
+def submit(inputs: list[np.ndarray]) -> Future[np.ndarray]:
+    if SETTINGS.inference_batching:
+        return scheduler.submit(inputs)
+
+    future: Future[np.ndarray] = Future()
+    future.set_result(predict(inputs))
+    return future
+
+
+def predict_tiled(inputs: list[np.ndarray], height: int, width: int) -> np.ndarray:
+    # Every tile is predicted with `halo` pixels of extra context on each side, so
+    # as long as the halo covers the receptive field of DSen2 + VinaCarbon, the
+    # cropped tiles are identical to whole-image inference. Neighbouring tiles
+    # overlap by `overlap` pixels and are feathered together to hide any residue.
+    tile_size = SETTINGS.inference_tile_size
+    halo = SETTINGS.inference_tile_halo
+    overlap = SETTINGS.inference_tile_overlap
+
+    windows: list[tuple[slice, slice, slice, slice]] = []
+    for top, bottom in get_tiles(height, tile_size, overlap, halo):
+        for left, right in get_tiles(width, tile_size, overlap, halo):
+            windows.append(
+                (
+                    slice(top, bottom),
+                    slice(left, right),
+                    slice(*get_halo_window(top, bottom, height, halo)),
+                    slice(*get_halo_window(left, right, width, halo)),
+                )
+            )
+
+    estimation: np.ndarray | None = None
+    weights = np.zeros((1, 1, height, width), dtype=np.float32)
+
+    # Tiles are submitted in waves of one batch, each collected before the next
+    # is submitted, so large images do not fill the inference queue and a full
+    # queue is hit before a wave is computed rather than after.
+    wave_size = max(SETTINGS.inference_max_batch_size, 1)
+    for wave_start in range(0, len(windows), wave_size):
+        wave = windows[wave_start : wave_start + wave_size]
+        futures = [
+            submit([array[:, :, halo_rows, halo_cols] for array in inputs])
+            for _, _, halo_rows, halo_cols in wave
+        ]
+
+        for (rows, cols, halo_rows, halo_cols), future in zip(wave, futures):
+            tile_estimation = future.result()[
+                :,
+                :,
+                rows.start - halo_rows.start : rows.stop - halo_rows.start,
+                cols.start - halo_cols.start : cols.stop - halo_cols.start,
             ]
-        )
+
+            if estimation is None:
+                estimation = np.zeros(
+                    (1, tile_estimation.shape[1], height, width), dtype=np.float32
+                )
+
+            row_weights = get_blending_weights(rows.start, rows.stop, height, overlap)
+            column_weights = get_blending_weights(cols.start, cols.stop, width, overlap)
+            tile_weights = np.outer(row_weights, column_weights)
+
+            estimation[:, :, rows, cols] += tile_estimation * tile_weights
+            weights[:, :, rows, cols] += tile_weights
+
+    assert estimation is not None
+    return estimation / weights
+
+
+def get_tiles(
+    length: int, tile_size: int, overlap: int, halo: int = 0
+) -> list[tuple[int, int]]:
+    # Lengths that fit in one tile and its halo are not split, their tiles' halo
+    # windows would each span the whole length and repeat the same inference.
+    if length <= tile_size + 2 * halo:
+        return [(0, length)]
+
+    stride = max(tile_size - overlap, 1)
+    starts = list(range(0, length - tile_size, stride)) + [length - tile_size]
+    return [(start, start + tile_size) for start in starts]
+
+
+def get_halo_window(start: int, end: int, length: int, halo: int) -> tuple[int, int]:
+    # Windows at the image border are shifted inwards instead of clipped, so every
+    # tile has the same input shape and can be batched without padding.
+    size = min(end - start + 2 * halo, length)
+    halo_start = min(max(start - halo, 0), length - size)
+    return halo_start, halo_start + size
+
+
+def get_blending_weights(start: int, end: int, length: int, overlap: int) -> np.ndarray:
+    weights = np.ones(end - start, dtype=np.float32)
+    if overlap <= 0:
+        return weights
+
+    ramp = np.arange(1, overlap + 1, dtype=np.float32) / (overlap + 1)
+    ramp = ramp[: end - start]
+    if start > 0:
+        weights[: len(ramp)] = np.minimum(weights[: len(ramp)], ramp)
+    if end < length:
+        weights[-len(ramp) :] = np.minimum(weights[-len(ramp) :], ramp[::-1])
+
+    return weights
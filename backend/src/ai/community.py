@@ -1,14 +1,21 @@
 import pickle
 
-with open("src/ai/models/text-embedder.pkl", "rb") as file:
-    text_embedder = pickle.load(file)
+from src.ai.registry import MODELS
 
-with open("src/ai/models/content-moderator.pkl", "rb") as file:
-    content_moderator = pickle.load(file)
+
+def load_pickle(path: str):
+    with open(path, "rb") as file:
+        return pickle.load(file)
+
+
+MODELS.register("text_embedder", lambda: load_pickle("src/ai/models/text-embedder.pkl"))
+MODELS.register(
+    "content_moderator", lambda: load_pickle("src/ai/models/content-moderator.pkl")
+)
 
 
 def moderate_content(content: str) -> bool:
-    embeddings = text_embedder.transform([content])
-    label = content_moderator.predict(embeddings)[0]
+    embeddings = MODELS.get("text_embedder").transform([content])
+    label = MODELS.get("content_moderator").predict(embeddings)[0]
     passed = label == 0
     return passed
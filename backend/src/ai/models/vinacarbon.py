@@ -120,3 +120,88 @@ class VinaCarbon(nn.Module):
         agbd = self.prediction(x + z)
 
         return x, z, agbd
+
+
+def fold_batch_norm(conv: nn.Conv2d, bn: nn.BatchNorm2d) -> nn.Conv2d:
+    scale = bn.weight / torch.sqrt(bn.running_var + bn.eps)
+    bias = conv.bias if conv.bias is not None else torch.zeros_like(bn.running_mean)
+
+    fused = nn.Conv2d(
+        conv.in_channels,
+        conv.out_channels,
+        conv.kernel_size,  # type: ignore
+        conv.stride,  # type: ignore
+        conv.padding,  # type: ignore
+        conv.dilation,  # type: ignore
+        conv.groups,
+        bias=True,
+    )
+    fused.weight.data = conv.weight * scale.view(-1, 1, 1, 1)
+    fused.bias.data = (bias - bn.running_mean) * scale + bn.bias
+    return fused
+
+
+def merge_pointwise_convs(first: nn.Conv2d, second: nn.Conv2d) -> nn.Conv2d:
+    merged = nn.Conv2d(
+        first.in_channels, second.out_channels, 1, bias=second.bias is not None
+    )
+    merged.weight.data = (second.weight.flatten(1) @ first.weight.flatten(1)).view(
+        second.out_channels, first.in_channels, 1, 1
+    )
+    if second.bias is not None:
+        merged.bias.data = second.bias.clone()  # type: ignore
+    return merged
+
+
+class InferenceFeatureBlock(nn.Module):
+    def __init__(self, block: FeatureBlock):
+        super(InferenceFeatureBlock, self).__init__()
+        layers = []
+        for separable in block.layers:
+            depthwise, pointwise, bn, _ = separable.layers
+            layers.extend(
+                [depthwise, fold_batch_norm(pointwise, bn), nn.ReLU(inplace=True)]
+            )
+
+        self.layers = nn.Sequential(*layers)
+
+    def forward(self, x):
+        residual = self.layers(x)
+        out = x + residual
+
+        return out
+
+
+class InferenceVinaCarbon(nn.Module):
+    # Inference-only VinaCarbon: BatchNorms are folded into the preceding convs and
+    # `prediction(x_conv(x) + z_conv(z))` is rewritten as two 728->2 convs, which
+    # drops both 728x728 projections. Only the AGBD prediction is returned.
+    def __init__(self, model: VinaCarbon):
+        super(InferenceVinaCarbon, self).__init__()
+        projection = []
+        layers = list(model.projection.layers)
+        for i in range(0, len(layers), 3):
+            conv, bn, _ = layers[i : i + 3]
+            projection.extend([fold_batch_norm(conv, bn), nn.ReLU(inplace=True)])
+
+        self.projection = nn.Sequential(*projection)
+        self.feature_extraction = nn.Sequential(
+            *[InferenceFeatureBlock(block) for block in model.feature_extraction]
+        )
+        self.spatial_attention = model.spatial_attention
+
+        self.x_prediction = merge_pointwise_convs(model.x_conv, model.prediction.conv)
+        self.z_prediction = merge_pointwise_convs(model.z_conv, model.prediction.conv)
+        self.z_prediction.bias = None
+
+    def forward(self, coords, sen1, sen2_10m, sen2_20m, sen2_60m):
+        x = torch.cat([coords, sen1, sen2_10m, sen2_20m, sen2_60m], dim=1)
+
+        x = self.projection(x)
+        z = self.feature_extraction(x)
+        att = self.spatial_attention(z)
+        z = z * att
+
+        agbd = self.x_prediction(x) + self.z_prediction(z)
+
+        return agbd
@@ -0,0 +1,79 @@
+import copy
+import hashlib
+import os
+from typing import Callable
+
+import torch
+import torch.nn as nn
+
+from src.ai.models.vinacarbon import InferenceVinaCarbon, VinaCarbon
+from src.settings import SETTINGS
+
+
+def get_artifact_path(name: str, checkpoint_path: str, device: str) -> str:
+    stat = os.stat(checkpoint_path)
+    key = f"{os.path.abspath(checkpoint_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    digest = hashlib.sha256(f"{key}:{torch.__version__}:{device}".encode())
+    return os.path.join(
+        SETTINGS.model_cache_dir, f"{name}-{digest.hexdigest()[:16]}.pth"
+    )
+
+
+def optimize_vinacarbon(
+    load_model: Callable[[], VinaCarbon], checkpoint_path: str, device: str
+) -> nn.Module:
+    # The folded weights are cached as a plain state dict rather than a frozen
+    # TorchScript archive so they can be memory-mapped and shared between workers.
+    # The eager model is only loaded when the artifact has to be (re)built. Its
+    # equivalence with the optimized model is checked by tests/test_optimization.py.
+    artifact_path = get_artifact_path("vinacarbon", checkpoint_path, device)
+    if os.path.exists(artifact_path):
+        state_dict = torch.load(
+            artifact_path,
+            map_location=device,
+            mmap=SETTINGS.model_mmap and device == "cpu",
+            weights_only=True,
+        )
+        with torch.device("meta"):
+            optimized = InferenceVinaCarbon(VinaCarbon())
+        optimized.load_state_dict(state_dict, assign=True)
+        return torch.jit.script(optimized.eval())
+
+    model = load_model()
+    optimized = torch.jit.script(InferenceVinaCarbon(model).eval())
+
+    os.makedirs(SETTINGS.model_cache_dir, exist_ok=True)
+    torch.save(optimized.state_dict(), artifact_path + ".tmp")
+    os.replace(artifact_path + ".tmp", artifact_path)
+
+    return optimized
+
+
+def quantize_vinacarbon(
+    model: VinaCarbon, calibration_inputs: list[list[torch.Tensor]]
+) -> nn.Module:
+    # Static INT8 post-training quantization. Activation ranges are observed on
+    # the calibration inputs, which must already be preprocessed and refined by
+    # DSen2 exactly as in `estimate_biomass`.
+    #
+    # Quantization is imported here because importing it re-registers the
+    # `quantized_decomposed` operators. TorchScript keeps the replaced ones in its
+    # builtin table by `id`, so a later module attribute can reuse an `id` of them
+    # and fail to script as a "builtin", as in `optimize_vinacarbon`.
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    torch.backends.quantized.engine = "x86"
+    float_model = InferenceVinaCarbon(copy.deepcopy(model)).eval()
+    prepared = prepare_fx(
+        float_model,
+        get_default_qconfig_mapping("x86"),
+        example_inputs=tuple(calibration_inputs[0]),
+    )
+
+    with torch.no_grad():
+        for inputs in calibration_inputs:
+            prepared(*inputs)
+
+    quantized = convert_fx(prepared)
+    return quantized
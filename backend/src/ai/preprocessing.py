@@ -0,0 +1,171 @@
+from functools import lru_cache
+
+import numpy as np
+
+from src.models import CollectionID
+from src.settings import SETTINGS
+
+COLLECTION_IDS: list[CollectionID] = [
+    "coords",
+    "sen1",
+    "sen2_10m",
+    "sen2_20m",
+    "sen2_60m",
+]
+
+SCALE_FACTOR = 2_000
+
+# Target grids from this many pixels up are resized by torch when it serves the
+# models anyway. Its vectorised kernels overtake the numpy resize around 256 x 256.
+TORCH_RESIZE_MIN_PIXELS = 256 * 256
+
+DIVISORS: dict[CollectionID, float] = {
+    "coords": 10_000,
+    "sen1": 1,
+    "sen2_10m": SCALE_FACTOR,
+    "sen2_20m": SCALE_FACTOR,
+    "sen2_60m": SCALE_FACTOR,
+}
+
+
+class PreprocessingPlan:
+    def __init__(self, height: int, width: int, shapes: tuple[tuple[int, ...], ...]):
+        self.height = height
+        self.width = width
+
+        self.slices: list[slice] = []
+        offset = 0
+        for shape in shapes:
+            self.slices.append(slice(offset, offset + shape[0]))
+            offset += shape[0]
+        self.channels = offset
+
+        self.divisors = np.ones((1, self.channels, 1, 1), dtype=np.float32)
+        for collection_id, channels in zip(COLLECTION_IDS, self.slices):
+            self.divisors[:, channels] = DIVISORS[collection_id]
+
+        # Groups sharing a source grid are resized together, groups already on the
+        # target grid are copied straight into the buffer.
+        self.resize_groups: dict[tuple[int, int], list[int]] = {}
+        for i, (_, source_height, source_width) in enumerate(shapes):
+            if (source_height, source_width) != (height, width):
+                self.resize_groups.setdefault((source_height, source_width), []).append(
+                    i
+                )
+
+
+@lru_cache(maxsize=128)
+def get_resize_weights(
+    source_size: int, target_size: int
+) -> tuple[np.ndarray, np.ndarray]:
+    # Weights of bilinear resizing with antialiasing, as in torch's
+    # `interpolate(mode="bilinear", antialias=True, align_corners=False)`: a
+    # triangle filter widened by the scale when downsampling, normalised over the
+    # pixels inside the image. Each target pixel only reads the few source pixels
+    # under the filter, so the weights are kept banded, as (target_size, taps)
+    # source indices and weights, rather than as a dense matrix.
+    scale = source_size / target_size
+    support = max(scale, 1.0)
+    inverse_scale = 1 / scale if scale > 1 else 1.0
+
+    centers = scale * (np.arange(target_size) + 0.5)
+    starts = np.maximum((centers - support + 0.5).astype(int), 0)
+    stops = np.minimum((centers + support + 0.5).astype(int), source_size)
+    indices = starts[:, None] + np.arange((stops - starts).max())
+
+    distances = (indices - centers[:, None] + 0.5) * inverse_scale
+    weights = np.maximum(1 - np.abs(distances), 0)
+    weights[indices >= stops[:, None]] = 0
+    totals = weights.sum(axis=1, keepdims=True)
+    np.divide(weights, totals, out=weights, where=totals > 0)
+
+    # Taps past the edge have no weight, they are clamped to stay in bounds.
+    return np.minimum(indices, source_size - 1), weights.astype(np.float32)
+
+
+def resize(sources: np.ndarray, height: int, width: int) -> np.ndarray:
+    # Separable resize of channel-first `sources` to `height` x `width`. Small
+    # grids, and every grid with the ONNX backend, are resized in numpy so that
+    # preprocessing does not need torch.
+    serving_torch = SETTINGS.inference_backend == "torch"
+    if serving_torch and height * width >= TORCH_RESIZE_MIN_PIXELS:
+        import torch
+        import torch.nn.functional as F
+
+        return F.interpolate(
+            torch.from_numpy(sources).unsqueeze(0),
+            size=(height, width),
+            mode="bilinear",
+            antialias=True,
+            align_corners=False,
+        )[0].numpy()
+
+    # Both passes gather whole rows, which numpy copies far faster than single
+    # elements, so the second one runs on the transposed rows and the result is
+    # returned as a transposed view.
+    rows = resize_rows(sources, height)
+    return resize_rows(np.ascontiguousarray(rows.transpose(0, 2, 1)), width).transpose(
+        0, 2, 1
+    )
+
+
+def resize_rows(sources: np.ndarray, size: int) -> np.ndarray:
+    indices, weights = get_resize_weights(sources.shape[1], size)
+    targets = np.take(sources, indices[:, 0], axis=1)
+    targets *= weights[:, 0, None]
+    taps = np.empty_like(targets)
+    for tap in range(1, indices.shape[1]):
+        np.take(sources, indices[:, tap], axis=1, out=taps)
+        taps *= weights[:, tap, None]
+        targets += taps
+
+    return targets
+
+
+@lru_cache(maxsize=128)
+def get_plan(
+    height: int, width: int, shapes: tuple[tuple[int, ...], ...]
+) -> PreprocessingPlan:
+    return PreprocessingPlan(height, width, shapes)
+
+
+def preprocess(
+    coords: np.ndarray,
+    sen1: np.ndarray,
+    sen2_10m: np.ndarray,
+    sen2_20m: np.ndarray,
+    sen2_60m: np.ndarray,
+) -> list[np.ndarray]:
+    height, width, _ = sen1.shape
+
+    # Coordinates arrive channel-first, Sentinel bands channel-last.
+    groups = [
+        coords,
+        sen1.transpose(2, 0, 1),
+        sen2_10m.transpose(2, 0, 1),
+        sen2_20m.transpose(2, 0, 1),
+        sen2_60m.transpose(2, 0, 1),
+    ]
+    plan = get_plan(height, width, tuple(group.shape for group in groups))
+
+    buffer = np.empty((1, plan.channels, height, width), dtype=np.float32)
+    resized = {i for indices in plan.resize_groups.values() for i in indices}
+    for i, group in enumerate(groups):
+        if i not in resized:
+            buffer[0, plan.slices[i]] = group
+
+    for indices in plan.resize_groups.values():
+        sources = np.concatenate(
+            [groups[i].astype(np.float32, copy=False) for i in indices], axis=0
+        )
+        targets = resize(sources, height, width)
+
+        offset = 0
+        for i in indices:
+            channels = plan.slices[i].stop - plan.slices[i].start
+            buffer[0, plan.slices[i]] = targets[offset : offset + channels]
+            offset += channels
+
+    np.divide(buffer, plan.divisors, out=buffer)
+
+    return [buffer[:, channels] for channels in plan.slices]
@@ -0,0 +1,106 @@
+import os
+import threading
+import time
+from typing import Any, Callable
+
+from src.settings import LOGGER
+
+
+def get_memory_usage() -> tuple[int, int]:
+    # Resident and file-backed (shareable) bytes of the current process.
+    try:
+        with open("/proc/self/statm") as file:
+            _, resident, shared, *_ = map(int, file.read().split())
+    except OSError:
+        return 0, 0
+
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    return resident * page_size, shared * page_size
+
+
+class ModelEntry:
+    def __init__(self, name: str, loader: Callable[[], Any]):
+        self.name = name
+        self.loader = loader
+        self.model: Any = None
+        self.loaded = False
+        self.lock = threading.Lock()
+
+        self.load_time = 0.0
+        self.resident_size = 0
+        self.shared_size = 0
+
+
+class ModelRegistry:
+    def __init__(self):
+        self.entries: dict[str, ModelEntry] = {}
+        self.local = threading.local()
+
+    def register(self, name: str, loader: Callable[[], Any]) -> None:
+        self.entries[name] = ModelEntry(name, loader)
+
+    def get(self, name: str) -> Any:
+        entry = self.entries[name]
+        if entry.loaded:
+            return entry.model
+
+        with entry.lock:
+            if not entry.loaded:
+                self._load(entry)
+
+        return entry.model
+
+    def warm_up(self, names: list[str] | None = None) -> None:
+        for name in list(self.entries) if names is None else names:
+            if name not in self.entries:
+                LOGGER.warning(f"Cannot warm up unknown model: {name}")
+                continue
+
+            self.get(name)
+
+    def metrics(self) -> dict[str, dict[str, Any]]:
+        return {
+            name: {
+                "loaded": entry.loaded,
+                "load_time_ms": entry.load_time * 1_000,
+                "resident_mb": entry.resident_size / 2**20,
+                "shared_mb": entry.shared_size / 2**20,
+            }
+            for name, entry in self.entries.items()
+        }
+
+    def _load(self, entry: ModelEntry) -> None:
+        # Models that load other registered models only account for their own
+        # memory, nested loads are subtracted from the parent's measurement.
+        stack: list[list[float]] = self.local.__dict__.setdefault("stack", [])
+        stack.append([0, 0, 0.0])
+
+        resident_before, shared_before = get_memory_usage()
+        started_at = time.perf_counter()
+        try:
+            entry.model = entry.loader()
+        finally:
+            nested_resident, nested_shared, nested_time = stack.pop()
+
+        load_time = time.perf_counter() - started_at
+        resident_after, shared_after = get_memory_usage()
+        resident_size = resident_after - resident_before
+        shared_size = shared_after - shared_before
+
+        entry.load_time = load_time - nested_time
+        entry.resident_size = max(resident_size - nested_resident, 0)
+        entry.shared_size = max(shared_size - nested_shared, 0)
+        entry.loaded = True
+
+        if stack:
+            stack[-1][0] += resident_size
+            stack[-1][1] += shared_size
+            stack[-1][2] += load_time
+
+        LOGGER.info(
+            f"Loaded model {entry.name} in {entry.load_time:.2f}s "
+            f"({entry.resident_size / 2**20:.1f} MB resident)"
+        )
+
+
+MODELS = ModelRegistry()
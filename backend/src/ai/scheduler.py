@@ -0,0 +1,146 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable
+
+import numpy as np
+
+
+class InferenceQueueFullError(Exception):
+    def __init__(self):
+        super().__init__("Inference queue is full")
+
+
+class InferenceRequest:
+    def __init__(self, inputs: list[np.ndarray]):
+        self.inputs = inputs
+        self.future: Future[np.ndarray] = Future()
+        self.submitted_at = time.perf_counter()
+
+        _, _, self.height, self.width = inputs[0].shape
+
+
+class InferenceScheduler:
+    def __init__(
+        self,
+        predict: Callable[[list[np.ndarray]], np.ndarray],
+        max_batch_size: int,
+        max_wait_ms: float,
+        max_queue_size: int,
+    ):
+        self.predict = predict
+        self.max_batch_size = max(max_batch_size, 1)
+        self.max_wait = max_wait_ms / 1_000
+        self.queue: queue.Queue[InferenceRequest] = queue.Queue(max_queue_size)
+
+        self.lock = threading.Lock()
+        self.worker: threading.Thread | None = None
+
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.batches = 0
+        self.total_wait = 0.0
+        self.max_observed_wait = 0.0
+
+    def submit(self, inputs: list[np.ndarray]) -> Future[np.ndarray]:
+        self._ensure_worker()
+        request = InferenceRequest(inputs)
+        # Fails fast when the worker cannot keep up, so callers can shed load
+        # rather than block an estimation thread.
+        try:
+            self.queue.put_nowait(request)
+        except queue.Full:
+            with self.lock:
+                self.rejected += 1
+            raise InferenceQueueFullError()
+
+        with self.lock:
+            self.submitted += 1
+
+        return request.future
+
+    def metrics(self) -> dict[str, float]:
+        with self.lock:
+            finished = self.completed + self.failed
+            return {
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+                "completed": self.completed,
+                "failed": self.failed,
+                "batches": self.batches,
+                "queue_depth": self.queue.qsize(),
+                "mean_batch_size": finished / self.batches if self.batches else 0.0,
+                "mean_wait_ms": self.total_wait / finished * 1_000 if finished else 0.0,
+                "max_wait_ms": self.max_observed_wait * 1_000,
+            }
+
+    def _ensure_worker(self):
+        with self.lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(
+                    target=self._run, name="inference-scheduler", daemon=True
+                )
+                self.worker.start()
+
+    def _run(self):
+        while True:
+            requests = self._collect()
+
+            # Only identically shaped requests share a batch, so a request's
+            # output never depends on the others batched with it.
+            buckets: dict[tuple[int, int], list[InferenceRequest]] = {}
+            for request in requests:
+                buckets.setdefault((request.height, request.width), []).append(request)
+
+            for bucket_requests in buckets.values():
+                self._run_batch(bucket_requests)
+
+    def _collect(self) -> list[InferenceRequest]:
+        requests = [self.queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(requests) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                requests.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+
+        return requests
+
+    def _run_batch(self, requests: list[InferenceRequest]) -> None:
+        started_at = time.perf_counter()
+
+        try:
+            inputs = [
+                np.concatenate([request.inputs[i] for request in requests], axis=0)
+                for i in range(len(requests[0].inputs))
+            ]
+
+            outputs = self.predict(inputs)
+
+            for i, request in enumerate(requests):
+                request.future.set_result(outputs[i : i + 1])
+
+            succeeded = True
+        except Exception as e:
+            for request in requests:
+                request.future.set_exception(e)
+
+            succeeded = False
+
+        with self.lock:
+            self.batches += 1
+            if succeeded:
+                self.completed += len(requests)
+            else:
+                self.failed += len(requests)
+
+            for request in requests:
+                wait = started_at - request.submitted_at
+                self.total_wait += wait
+                self.max_observed_wait = max(self.max_observed_wait, wait)
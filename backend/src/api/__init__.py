@@ -2,6 +2,14 @@ from .assistant import router as assistant_api
 from .biomass import router as biomass_api
 from .posts import router as posts_api
 from .documents import router as search_api
+from .metrics import router as metrics_api
 from .users import router as users_api
 
-__all__ = ["biomass_api", "posts_api", "search_api", "users_api", "assistant_api"]
+__all__ = [
+    "biomass_api",
+    "posts_api",
+    "search_api",
+    "users_api",
+    "assistant_api",
+    "metrics_api",
+]
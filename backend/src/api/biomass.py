@@ -1,33 +1,140 @@
 import json
+from typing import Any, Callable, TypeVar
 
 import numpy as np
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
 from src.dependencies import (
     get_biomass_preliminary_estimation_service,
     get_biomass_runtime_estimation_service,
+    get_biomass_tile_service,
+    get_estimation_executor,
     verify_token,
 )
 from src.models import BiomassEstimationGeoTIFF, FeatureCollection, User
 from src.services import (
+    BiomassEstimationService,
     BiomassPreliminaryEstimationService,
     BiomassRuntimeEstimationService,
+    BiomassTileService,
+    EstimationExecutor,
+    EstimationQueueFullError,
 )
+from src.services.tiles import MEDIA_TYPES, TileFormat
 from src.settings import LOGGER, SETTINGS
 
 router = APIRouter(prefix="/api/biomass")
 
+T = TypeVar("T")
+
 
 @router.post("/preliminary")
-def get_preliminary_estimation(
+async def get_preliminary_estimation(
+    feature_collection: FeatureCollection,
+    level_of_detail: bool = False,
+    per_feature: bool = False,
+    biomass_service: BiomassPreliminaryEstimationService = Depends(
+        get_biomass_preliminary_estimation_service
+    ),
+    estimation_executor: EstimationExecutor = Depends(get_estimation_executor),
+):
+    # In level-of-detail mode, large areas are estimated on a coarser grid that
+    # fits the pixel budget instead of being rejected.
+    max_pixels = SETTINGS.estimation_lod_max_pixels if level_of_detail else None
+    check_feature_statistics_header(feature_collection, per_feature)
+    return await run_estimation(
+        estimation_executor,
+        lambda: stream_estimation(
+            biomass_service.get_estimation(feature_collection, max_pixels),
+            per_feature,
+        ),
+    )
+
+
+@router.post("/runtime")
+async def get_runtime_estimation(
+    feature_collection: FeatureCollection,
+    per_feature: bool = False,
+    _: User = Depends(verify_token),
+    biomass_service: BiomassRuntimeEstimationService = Depends(
+        get_biomass_runtime_estimation_service
+    ),
+    estimation_executor: EstimationExecutor = Depends(get_estimation_executor),
+):
+    check_feature_statistics_header(feature_collection, per_feature)
+    return await run_estimation(
+        estimation_executor,
+        lambda: stream_estimation(
+            biomass_service.get_estimation(feature_collection), per_feature
+        ),
+    )
+
+
+@router.post("/preliminary/statistics")
+async def get_preliminary_statistics(
     feature_collection: FeatureCollection,
+    level_of_detail: bool = False,
+    per_feature: bool = False,
     biomass_service: BiomassPreliminaryEstimationService = Depends(
         get_biomass_preliminary_estimation_service
     ),
+    estimation_executor: EstimationExecutor = Depends(get_estimation_executor),
+):
+    # The statistics of /preliminary as JSON, without the raster.
+    max_pixels = SETTINGS.estimation_lod_max_pixels if level_of_detail else None
+    return await run_estimation(
+        estimation_executor,
+        lambda: get_statistics(
+            biomass_service, feature_collection, max_pixels, per_feature
+        ),
+    )
+
+
+@router.post("/runtime/statistics")
+async def get_runtime_statistics(
+    feature_collection: FeatureCollection,
+    per_feature: bool = False,
+    _: User = Depends(verify_token),
+    biomass_service: BiomassRuntimeEstimationService = Depends(
+        get_biomass_runtime_estimation_service
+    ),
+    estimation_executor: EstimationExecutor = Depends(get_estimation_executor),
+):
+    # The statistics of /runtime as JSON, without the raster.
+    return await run_estimation(
+        estimation_executor,
+        lambda: get_statistics(biomass_service, feature_collection, None, per_feature),
+    )
+
+
+@router.get("/tiles/{z}/{x}/{y}.{format}")
+async def get_tile(
+    z: int,
+    x: int,
+    y: int,
+    format: TileFormat,
+    request: Request,
+    tile_service: BiomassTileService = Depends(get_biomass_tile_service),
 ):
+    # Tiles only change with the raster list, so clients revalidate with the
+    # ETag and get a 304 without the tile being read from any cache. Invalid
+    # coordinates have no ETag, they are rejected before any 304.
     try:
-        estimation = biomass_service.get_estimation(feature_collection)
-        return stream_estimation(estimation)
+        etag = tile_service.get_etag(z, x, y, format)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={SETTINGS.tile_max_age}",
+    }
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    try:
+        tile = await run_in_threadpool(tile_service.get_tile, z, x, y, format)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
@@ -36,18 +143,22 @@ def get_preliminary_estimation(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         )
 
+    return Response(content=tile, media_type=MEDIA_TYPES[format], headers=headers)
 
-@router.post("/runtime")
-def get_runtime_estimation(
-    feature_collection: FeatureCollection,
-    _: User = Depends(verify_token),
-    biomass_service: BiomassRuntimeEstimationService = Depends(
-        get_biomass_runtime_estimation_service
-    ),
-):
+
+async def run_estimation(
+    estimation_executor: EstimationExecutor, function: Callable[[], T]
+) -> T:
+    # Errors of the estimation endpoints: a full queue asks the client to retry,
+    # invalid areas are the client's fault, anything else is logged and hidden.
     try:
-        estimation = biomass_service.get_estimation(feature_collection)
-        return stream_estimation(estimation)
+        return await estimation_executor.run(function)
+    except EstimationQueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
@@ -57,49 +168,60 @@ def get_runtime_estimation(
         )
 
 
-def stream_estimation(estimation: BiomassEstimationGeoTIFF) -> StreamingResponse:
-    raw_estimation = np.abs(estimation.data)
-    valid = ~np.isnan(raw_estimation)
-
-    area = float(np.count_nonzero(valid) / 100)
-    min_biomass_density = float(raw_estimation[valid].min())
-    max_biomass_density = float(raw_estimation[valid].max())
-    mean_biomass_density = float(raw_estimation[valid].mean())
-    total_biomass = float((raw_estimation / 100)[valid].sum())
-    total_carbon_stock = float(total_biomass * SETTINGS.carbon_stock_to_biomass_ratio)
-
-    statistics = [
-        {"name": "Diện tích", "value": area, "unit": "ha"},
-        {
-            "name": "Mật độ sinh khối (min)",
-            "value": min_biomass_density,
-            "unit": "Mg/ha",
-        },
-        {
-            "name": "Mật độ sinh khối (max)",
-            "value": max_biomass_density,
-            "unit": "Mg/ha",
-        },
-        {"name": "Diện tích", "value": mean_biomass_density, "unit": "Mg/ha"},
-        {"name": "Mật độ sinh khối", "value": total_biomass, "unit": "Mg"},
-        {
-            "name": "Trữ lượng Carbon",
-            "value": total_carbon_stock,
-            "unit": "Mg",
-        },
-    ]
-
-    raw_estimation[valid] = (raw_estimation[valid] - min_biomass_density) / (
-        max_biomass_density - min_biomass_density
+def get_statistics(
+    biomass_service: BiomassEstimationService,
+    feature_collection: FeatureCollection,
+    max_pixels: int | None,
+    per_feature: bool,
+) -> list[dict[str, Any]] | dict[str, Any]:
+    # With `per_feature`, the statistics of each feature follow those of all
+    # features, in feature order.
+    if not per_feature:
+        return biomass_service.get_statistics(feature_collection, max_pixels)
+
+    statistics, feature_statistics = biomass_service.get_feature_statistics(
+        feature_collection, max_pixels
     )
+    return {"statistics": statistics, "features": feature_statistics}
+
 
-    estimation.data = raw_estimation
+def check_feature_statistics_header(
+    feature_collection: FeatureCollection, per_feature: bool
+) -> None:
+    # Per-feature statistics of the raster endpoints travel in a header, about
+    # 1 kB per feature, and proxies reject responses with headers past 8-16 kB.
+    # Larger collections get them in the body of the /statistics endpoints.
+    max_features = SETTINGS.feature_statistics_header_max_features
+    if per_feature and len(feature_collection.features) > max_features:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Per-feature statistics of more than {max_features} features "
+            "are only available from the statistics endpoints",
+        )
+
+
+def stream_estimation(
+    estimation: BiomassEstimationGeoTIFF, per_feature: bool = False
+) -> StreamingResponse:
+    # Estimations may be cached, so the normalised raster is a single copy of
+    # `estimation`, normalised in place.
+    raw_estimation = np.abs(estimation.data)
+    min_biomass_density = np.nanmin(raw_estimation)
+    max_biomass_density = np.nanmax(raw_estimation)
+    raw_estimation -= min_biomass_density
+    raw_estimation /= max_biomass_density - min_biomass_density
+
+    normalized_estimation = BiomassEstimationGeoTIFF(
+        data=raw_estimation, profile=estimation.profile
+    )
 
     headers = {
-        "X-Statistics": json.dumps(statistics),
+        "X-Statistics": json.dumps(estimation.statistics),
         "Content-Disposition": 'attachment; filename="image.tif"',
     }
+    if per_feature:
+        headers["X-Feature-Statistics"] = json.dumps(estimation.feature_statistics)
 
     return StreamingResponse(
-        estimation.stream(), media_type="image/tiff", headers=headers
+        normalized_estimation.stream(), media_type="image/tiff", headers=headers
     )
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends
+from src.ai.biomass import scheduler
+from src.ai.registry import MODELS
+from src.dependencies import (
+    get_biomass_preliminary_estimation_service,
+    get_biomass_runtime_estimation_service,
+    get_biomass_tile_service,
+    get_estimation_executor,
+    verify_token,
+)
+from src.models import User
+from src.services import (
+    BiomassPreliminaryEstimationService,
+    BiomassRuntimeEstimationService,
+    BiomassTileService,
+    EstimationExecutor,
+)
+
+router = APIRouter(prefix="/api/metrics")
+
+
+@router.get("")
+def get_metrics(
+    _: User = Depends(verify_token),
+    estimation_executor: EstimationExecutor = Depends(get_estimation_executor),
+    biomass_service: BiomassRuntimeEstimationService = Depends(
+        get_biomass_runtime_estimation_service
+    ),
+    preliminary_biomass_service: BiomassPreliminaryEstimationService = Depends(
+        get_biomass_preliminary_estimation_service
+    ),
+    tile_service: BiomassTileService = Depends(get_biomass_tile_service),
+):
+    return {
+        "estimation_cache": biomass_service.results.metrics(),
+        "estimation_executor": estimation_executor.metrics(),
+        "imagery": biomass_service.imagery_provider.metrics(),
+        "inference_scheduler": scheduler.metrics(),
+        "models": MODELS.metrics(),
+        "preliminary_block_statistics": (
+            preliminary_biomass_service.block_statistics_metrics()
+        ),
+        "preliminary_datasets": preliminary_biomass_service.datasets.metrics(),
+        "tiles": tile_service.metrics(),
+    }
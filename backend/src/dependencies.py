@@ -78,5 +78,13 @@ def get_biomass_runtime_estimation_service(
     return request.app.state.biomass_runtime_estimation_service
 
 
+def get_estimation_executor(request: Request) -> EstimationExecutor:
+    return request.app.state.estimation_executor
+
+
 def get_foundry_project_client(request: Request) -> AIProjectClient:
     return request.app.state.foundry_project_client
+
+
+def get_biomass_tile_service(request: Request) -> BiomassTileService:
+    return request.app.state.biomass_tile_service
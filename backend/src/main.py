@@ -11,11 +11,15 @@ from cachetools import TTLCache
 from ee._helpers import ServiceAccountCredentials
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from src.ai.registry import MODELS
 from src.api import *
 from src.services import (
     BiomassPreliminaryEstimationService,
     BiomassRuntimeEstimationService,
+    BiomassTileService,
+    EstimationExecutor,
 )
+from src.services.manifest import load_preliminary_estimations
 from src.settings import SETTINGS
 
 
@@ -51,6 +55,9 @@ async def lifespan(app: FastAPI):
                 SETTINGS.gee_private_key_path,
             )
         )
+        ee.data.setDeadline(SETTINGS.gee_timeout * 1_000)
+
+        MODELS.warm_up(SETTINGS.model_warmup)
 
         cache = TTLCache(maxsize=SETTINGS.cache_maxsize, ttl=SETTINGS.cache_ttl)
 
@@ -62,14 +69,29 @@ async def lifespan(app: FastAPI):
         app.state.openai_client = openai_client
         app.state.cache = cache
 
+        preliminary_estimations = load_preliminary_estimations()
         app.state.biomass_preliminary_estimation_service = (
-            BiomassPreliminaryEstimationService()
+            BiomassPreliminaryEstimationService(preliminary_estimations)
+        )
+        app.state.biomass_runtime_estimation_service = BiomassRuntimeEstimationService(
+            preliminary_estimations
+        )
+        app.state.biomass_tile_service = BiomassTileService(
+            app.state.biomass_preliminary_estimation_service
+        )
+        app.state.estimation_executor = EstimationExecutor(
+            max_workers=SETTINGS.estimation_workers,
+            max_queue_size=SETTINGS.estimation_queue_size,
+            retry_after=SETTINGS.estimation_retry_after,
         )
-        app.state.biomass_runtime_estimation_service = BiomassRuntimeEstimationService()
-
-        yield
 
-        app.state.cache.clear()
+        try:
+            yield
+        finally:
+            app.state.cache.clear()
+            app.state.estimation_executor.shutdown()
+            app.state.biomass_preliminary_estimation_service.close()
+            app.state.biomass_runtime_estimation_service.close()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -80,7 +102,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["X-Statistics"],
+    expose_headers=["X-Statistics", "X-Feature-Statistics"],
 )
 
 app.include_router(users_api)
@@ -88,3 +110,4 @@ app.include_router(search_api)
 app.include_router(assistant_api)
 app.include_router(posts_api)
 app.include_router(biomass_api)
+app.include_router(metrics_api)
@@ -1,5 +1,5 @@
 from io import BytesIO
-from typing import Literal
+from typing import Any, Literal
 
 import numpy as np
 import rasterio.io
@@ -12,9 +12,21 @@ CollectionID = Literal["coords", "sen1", "sen2_10m", "sen2_20m", "sen2_60m"]
 
 
 class BiomassEstimationGeoTIFF:
-    def __init__(self, data: str | np.ndarray, profile: rasterio.profiles.Profile):
+    def __init__(
+        self,
+        data: str | np.ndarray,
+        profile: rasterio.profiles.Profile,
+        statistics: list[dict[str, Any]] | None = None,
+        feature_statistics: list[list[dict[str, Any]] | None] | None = None,
+        pixel_area: float | None = None,
+    ):
         self.data = data
         self.profile = profile
+        self.statistics = statistics
+        # Statistics of each feature, None for features without estimation, and
+        # the area of a pixel in m2.
+        self.feature_statistics = feature_statistics
+        self.pixel_area = pixel_area
 
         bounds = rasterio.transform.array_bounds(
             profile["height"], profile["width"], profile["transform"]
@@ -1,11 +1,21 @@
 from .biomass import *
 from .documents import *
+from .executor import *
+from .imagery import *
 from .posts import *
+from .tiles import *
 from .users import *
 
 __all__ = [
+    "BiomassEstimationService",
     "BiomassPreliminaryEstimationService",
     "BiomassRuntimeEstimationService",
+    "BiomassTileService",
+    "EstimationExecutor",
+    "EstimationQueueFullError",
+    "ImageryProvider",
+    "GEEImageryProvider",
+    "LocalImageryProvider",
     "SearchService",
     "UserService",
     "PostService",
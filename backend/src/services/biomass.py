@@ -1,81 +1,502 @@
+import hashlib
+import math
+import threading
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Hashable
 
-import ee.filter
-import ee.geometry
-import ee.image
-import ee.imagecollection
 import numpy as np
 import rasterio
+import rasterio.crs
+import rasterio.errors
 import rasterio.features
+import rasterio.io
 import rasterio.transform
 import rasterio.windows
+import shapely
 import shapely.geometry
+from affine import Affine
+from cachetools import LRUCache
 from pyproj import Geod
+from src.ai.backends import get_model_version
 from src.ai.biomass import estimate_biomass
-from src.models import BiomassEstimationGeoTIFF, CollectionID, FeatureCollection
+from src.models import BiomassEstimationGeoTIFF, FeatureCollection
+from src.services.caching import VersionedCache
+from src.services.datasets import (
+    DatasetPool,
+    get_block_window,
+    get_covering_window,
+    get_overview_level,
+    read_window,
+)
+from src.services.imagery import ImageryProvider, get_imagery_provider
+from src.services.manifest import load_preliminary_estimations
+from src.services.statistics import RasterStatistics, iter_array_blocks, read_block
 from src.settings import SETTINGS
 
-BANDS: dict[CollectionID, list[str]] = {
-    "sen1": ["VV", "VH"],
-    "sen2_10m": ["B2", "B3", "B4", "B8"],
-    "sen2_20m": ["B5", "B6", "B7", "B8A", "B11", "B12"],
-    "sen2_60m": ["B1", "B9"],
-}
+
+def get_geometry_hash(geometry: shapely.geometry.base.BaseGeometry) -> str:
+    # Equal geometries hash equally regardless of feature order, ring orientation,
+    # starting vertex and sub-millimetre coordinate noise.
+    geometry = shapely.normalize(shapely.set_precision(geometry, 1e-8))
+    return hashlib.sha256(shapely.to_wkb(geometry)).hexdigest()
+
+
+def get_pixel_area(
+    geod: Geod, crs: Any, resolution: tuple[float, float], point: shapely.geometry.Point
+) -> float:
+    # Area in m2 of a pixel of `resolution` centred on `point`. Pixels of rasters
+    # in geographic coordinates have a fixed size in degrees, so their area
+    # depends on the latitude.
+    x_size, y_size = abs(resolution[0]), abs(resolution[1])
+    if crs is not None and not rasterio.crs.CRS.from_user_input(crs).is_geographic:
+        return x_size * y_size
+
+    area, _ = geod.geometry_area_perimeter(
+        shapely.geometry.box(
+            point.x - x_size / 2,
+            point.y - y_size / 2,
+            point.x + x_size / 2,
+            point.y + y_size / 2,
+        )
+    )
+    return abs(area)
+
+
+def get_absolute_statistics(data: np.ndarray) -> RasterStatistics:
+    statistics = RasterStatistics()
+    for _, block in iter_array_blocks(data):
+        statistics.update(np.abs(block))
+
+    return statistics
+
+
+def get_polygon_statistics(
+    data: np.ndarray, transform: Affine, polygon: shapely.geometry.Polygon
+) -> RasterStatistics:
+    # Statistics of the pixels of `data` under `polygon`, reading only the window
+    # around it.
+    height, width = data.shape
+    window = (
+        rasterio.windows.from_bounds(*polygon.bounds, transform=transform)
+        .round_offsets()
+        .round_lengths()
+    )
+    try:
+        window = window.intersection(rasterio.windows.Window(0, 0, width, height))
+    except rasterio.errors.WindowError:
+        return RasterStatistics()
+
+    mask = rasterio.features.geometry_mask(
+        [polygon],
+        out_shape=(int(window.height), int(window.width)),
+        transform=rasterio.windows.transform(window, transform),
+        invert=True,
+    )
+    return get_absolute_statistics(np.where(mask, data[window.toslices()], np.nan))
+
+
+def merge_estimations(
+    estimations: list[BiomassEstimationGeoTIFF],
+    clusters: list[list[int]],
+    feature_count: int,
+) -> BiomassEstimationGeoTIFF:
+    # Cluster estimations pasted onto one grid over all of them, at the
+    # resolution of the first or coarser to fit `estimation_merged_max_pixels`.
+    # Statistics are merged from the cluster rasters, so they do not depend on
+    # the resolution of the merged raster.
+    statistics = RasterStatistics()
+    weighted_pixel_area = 0.0
+    for estimation in estimations:
+        assert isinstance(estimation.data, np.ndarray)
+        assert estimation.pixel_area is not None
+        cluster_statistics = get_absolute_statistics(estimation.data)
+        statistics.merge(cluster_statistics)
+        weighted_pixel_area += cluster_statistics.count * estimation.pixel_area
+
+    pixel_area = weighted_pixel_area / statistics.count if statistics.count else 0
+    merged_statistics = format_statistics(statistics, pixel_area)
+
+    feature_statistics: list[list[dict[str, Any]] | None] = [None] * feature_count
+    for estimation, cluster in zip(estimations, clusters):
+        assert estimation.feature_statistics is not None
+        for index, item in zip(cluster, estimation.feature_statistics):
+            feature_statistics[index] = item
+
+    minx, miny, maxx, maxy = shapely.union_all(
+        [estimation.bounding_box for estimation in estimations]
+    ).bounds
+    resolution = estimations[0].profile["transform"]
+    width = max(round((maxx - minx) / abs(resolution.a)), 1)
+    height = max(round((maxy - miny) / abs(resolution.e)), 1)
+    if height * width > SETTINGS.estimation_merged_max_pixels:
+        factor = math.sqrt(height * width / SETTINGS.estimation_merged_max_pixels)
+        height = max(int(height / factor), 1)
+        width = max(int(width / factor), 1)
+
+    transform = rasterio.transform.from_bounds(minx, miny, maxx, maxy, width, height)
+    data = np.full((height, width), np.nan, dtype=estimations[0].data.dtype)
+    for estimation in estimations:
+        paste_estimation(data, transform, estimation)
+
+    profile = estimations[0].profile.copy()
+    profile.update({"height": height, "width": width, "transform": transform})
+
+    data.flags.writeable = False
+    return BiomassEstimationGeoTIFF(
+        data=data,
+        profile=profile,
+        statistics=merged_statistics,
+        feature_statistics=feature_statistics,
+        pixel_area=pixel_area,
+    )
+
+
+def paste_estimation(
+    data: np.ndarray, transform: Affine, estimation: BiomassEstimationGeoTIFF
+) -> None:
+    # Nearest-neighbour copy of the valid pixels of `estimation` onto the grid
+    # `transform` of `data`.
+    assert isinstance(estimation.data, np.ndarray)
+    height, width = data.shape
+    try:
+        window = get_covering_window(
+            estimation.bounding_box.bounds, transform, height, width
+        )
+    except rasterio.errors.WindowError:
+        return
+
+    source_transform = estimation.profile["transform"]
+    source_height, source_width = estimation.data.shape
+    rows = np.arange(window.row_off, window.row_off + window.height) + 0.5
+    cols = np.arange(window.col_off, window.col_off + window.width) + 0.5
+    source_rows = np.floor(
+        (transform.f + rows * transform.e - source_transform.f) / source_transform.e
+    ).astype(int)
+    source_cols = np.floor(
+        (transform.c + cols * transform.a - source_transform.c) / source_transform.a
+    ).astype(int)
+
+    # Pixels whose centre falls outside the estimation are left untouched.
+    valid_rows = (source_rows >= 0) & (source_rows < source_height)
+    valid_cols = (source_cols >= 0) & (source_cols < source_width)
+    block = estimation.data[np.ix_(source_rows[valid_rows], source_cols[valid_cols])]
+    region = data[window.toslices()]
+    target = np.ix_(np.flatnonzero(valid_rows), np.flatnonzero(valid_cols))
+    region[target] = np.where(np.isnan(block), region[target], block)
+
+
+def format_statistics(
+    statistics: RasterStatistics, pixel_area: float
+) -> list[dict[str, Any]]:
+    # Densities are in Mg/ha and every pixel covers `pixel_area` m2, so totals
+    # stay the same on coarser grids.
+    if statistics.count == 0:
+        raise ValueError("No estimation within the area")
+
+    pixel_hectares = pixel_area / 10_000
+
+    area = statistics.count * pixel_hectares
+    total_biomass = statistics.sum * pixel_hectares
+    total_carbon_stock = total_biomass * SETTINGS.carbon_stock_to_biomass_ratio
+
+    return [
+        {"name": "Diện tích", "value": area, "unit": "ha"},
+        {
+            "name": "Mật độ sinh khối (min)",
+            "value": statistics.min,
+            "unit": "Mg/ha",
+        },
+        {
+            "name": "Mật độ sinh khối (max)",
+            "value": statistics.max,
+            "unit": "Mg/ha",
+        },
+        {"name": "Diện tích", "value": statistics.mean, "unit": "Mg/ha"},
+        {"name": "Mật độ sinh khối", "value": total_biomass, "unit": "Mg"},
+        {
+            "name": "Trữ lượng Carbon",
+            "value": total_carbon_stock,
+            "unit": "Mg",
+        },
+        {"name": "Độ phân giải", "value": math.sqrt(pixel_area), "unit": "m"},
+        {
+            "name": "Mật độ sinh khối (độ lệch chuẩn)",
+            "value": statistics.std,
+            "unit": "Mg/ha",
+        },
+        {
+            "name": "Mật độ sinh khối (trung vị)",
+            "value": statistics.percentile(50),
+            "unit": "Mg/ha",
+        },
+        {
+            "name": "Mật độ sinh khối (P10)",
+            "value": statistics.percentile(10),
+            "unit": "Mg/ha",
+        },
+        {
+            "name": "Mật độ sinh khối (P90)",
+            "value": statistics.percentile(90),
+            "unit": "Mg/ha",
+        },
+    ]
 
 
 class BiomassEstimationService(ABC):
-    def __init__(self):
-        with open(SETTINGS.preliminary_estimation_list_path) as file:
-            preliminary_estimation_urls = file.readlines()
-            preliminary_estimations: list[BiomassEstimationGeoTIFF] = []
-            for url in preliminary_estimation_urls:
-                with rasterio.open(url) as src:
-                    preliminary_estimations.append(
-                        BiomassEstimationGeoTIFF(data=url, profile=src.profile)
-                    )
+    def __init__(
+        self, preliminary_estimations: list[BiomassEstimationGeoTIFF] | None = None
+    ):
+        if preliminary_estimations is None:
+            preliminary_estimations = load_preliminary_estimations()
         self.geod = Geod(ellps="WGS84")
+        self.set_preliminary_estimations(preliminary_estimations)
+        self.results: VersionedCache[BiomassEstimationGeoTIFF] | None = None
+        self.cluster_executor = ThreadPoolExecutor(
+            max_workers=SETTINGS.estimation_cluster_concurrency,
+            thread_name_prefix="cluster",
+        )
+
+    def close(self) -> None:
+        self.cluster_executor.shutdown(cancel_futures=True)
+
+    def set_preliminary_estimations(
+        self, preliminary_estimations: list[BiomassEstimationGeoTIFF]
+    ) -> None:
+        # Footprints are indexed in an STR-packed R-tree. Queries return indexes
+        # into the list, which are sorted so that earlier rasters keep priority.
         self.preliminary_estimations = preliminary_estimations
+        self.preliminary_index = shapely.STRtree(
+            [estimation.bounding_box for estimation in preliminary_estimations]
+        )
 
     def get_preliminary_estimation(
         self, bbox: shapely.geometry.Polygon
     ) -> BiomassEstimationGeoTIFF | None:
-        for estimation in self.preliminary_estimations:
-            if estimation.bounding_box.contains(bbox):
-                return estimation
+        indexes = self.preliminary_index.query(bbox, predicate="within")
+        if len(indexes) == 0:
+            return None
+
+        return self.preliminary_estimations[indexes.min()]
+
+    def get_intersecting_preliminary_estimations(
+        self, bbox: shapely.geometry.Polygon
+    ) -> list[BiomassEstimationGeoTIFF]:
+        indexes = self.preliminary_index.query(bbox, predicate="intersects")
+        return [self.preliminary_estimations[index] for index in np.sort(indexes)]
+
+    def get_covering_preliminary_estimations(
+        self, bbox: shapely.geometry.Polygon
+    ) -> list[BiomassEstimationGeoTIFF]:
+        # A single raster containing the bbox if there is one, otherwise every
+        # raster intersecting it as long as together they cover it. Adjacent
+        # footprints leave floating-point slivers between them, which do not
+        # count as gaps.
+        estimation = self.get_preliminary_estimation(bbox)
+        if estimation is not None:
+            return [estimation]
+
+        estimations = self.get_intersecting_preliminary_estimations(bbox)
+        footprint = shapely.union_all(
+            [estimation.bounding_box for estimation in estimations]
+        )
+        if bbox.difference(footprint).area > 1e-9 * bbox.area:
+            return []
 
+        return estimations
+
+    def _get_cache_key(
+        self,
+        multipolygon: shapely.geometry.MultiPolygon,
+        bbox: shapely.geometry.Polygon,
+        preliminary_estimations: list[BiomassEstimationGeoTIFF],
+    ) -> tuple[Hashable, str] | None:
+        # Key and version of the estimation in `self.results`, if it is cached.
         return None
 
     @abstractmethod
     def _get_raw_estimation(
         self,
         bbox: shapely.geometry.Polygon,
-        preliminary_estimation: BiomassEstimationGeoTIFF,
+        preliminary_estimations: list[BiomassEstimationGeoTIFF],
+        max_pixels: int | None,
     ) -> np.ndarray:
+        # Returns the estimation over `bbox`. With `max_pixels`, the estimation is
+        # made on a grid coarse enough to have at most that many pixels.
         pass
 
+    def _check_area(
+        self, multipolygon: shapely.geometry.MultiPolygon, max_pixels: int | None
+    ) -> None:
+        # The limit applies to the area of the polygons themselves, overlaps
+        # counted once, not to their bbox.
+        if multipolygon.is_empty:
+            raise ValueError("No polygon to estimate")
+
+        area_limit = (
+            SETTINGS.estimation_area_limit
+            if max_pixels is None
+            else SETTINGS.estimation_lod_area_limit
+        )
+        area, _ = self.geod.geometry_area_perimeter(
+            shapely.union_all(shapely.make_valid(list(multipolygon.geoms)))
+        )
+        area = abs(area)
+        if area > area_limit:
+            raise ValueError(f"Area too large (max={area_limit / 10_000:g}ha) : {area}")
+
+        # Full-resolution windows span the bbox of each cluster, which can be much
+        # larger than the polygons (a thin ring, or parcels chained by distance).
+        # Coarser grids fit `max_pixels` whatever their bbox.
+        if max_pixels is not None:
+            return
+
+        polygons = list(multipolygon.geoms)
+        window_limit = SETTINGS.estimation_window_area_limit
+        for cluster in self.get_clusters(multipolygon):
+            bounds = shapely.geometry.MultiPolygon(
+                [polygons[index] for index in cluster]
+            ).bounds
+            window_area, _ = self.geod.geometry_area_perimeter(
+                shapely.geometry.box(*bounds)
+            )
+            window_area = abs(window_area)
+            if window_area > window_limit:
+                raise ValueError(
+                    f"Polygons span too large a window "
+                    f"(max={window_limit / 10_000:g}ha) : {window_area}"
+                )
+
+    def get_clusters(
+        self, multipolygon: shapely.geometry.MultiPolygon
+    ) -> list[list[int]]:
+        # Indexes of the polygons estimated together in one window. Polygons whose
+        # bboxes are within `estimation_cluster_distance` degrees of each other,
+        # directly or through other polygons, share a window. Distant parcels get
+        # their own window instead of one bbox spanning all of them.
+        boxes = [
+            shapely.geometry.box(*polygon.bounds) for polygon in multipolygon.geoms
+        ]
+        left, right = shapely.STRtree(boxes).query(
+            boxes, predicate="dwithin", distance=SETTINGS.estimation_cluster_distance
+        )
+
+        parents = list(range(len(boxes)))
+
+        def find(index: int) -> int:
+            while parents[index] != index:
+                parents[index] = parents[parents[index]]
+                index = parents[index]
+            return index
+
+        for i, j in zip(left, right):
+            parents[find(i)] = find(j)
+
+        clusters: dict[int, list[int]] = {}
+        for index in range(len(boxes)):
+            clusters.setdefault(find(index), []).append(index)
+
+        return list(clusters.values())
+
+    def get_statistics(
+        self, feature_collection: FeatureCollection, max_pixels: int | None = None
+    ) -> list[dict[str, Any]]:
+        # Statistics only, for clients that do not need the raster.
+        estimation = self.get_estimation(feature_collection, max_pixels)
+        assert estimation.statistics is not None
+        return estimation.statistics
+
+    def get_feature_statistics(
+        self, feature_collection: FeatureCollection, max_pixels: int | None = None
+    ) -> tuple[list[dict[str, Any]], list[list[dict[str, Any]] | None]]:
+        # Statistics of all features together and of each feature.
+        estimation = self.get_estimation(feature_collection, max_pixels)
+        assert estimation.statistics is not None
+        assert estimation.feature_statistics is not None
+        return estimation.statistics, estimation.feature_statistics
+
     def get_estimation(
-        self, feature_collection: FeatureCollection
+        self, feature_collection: FeatureCollection, max_pixels: int | None = None
     ) -> BiomassEstimationGeoTIFF:
+        # The cluster estimations merged into one raster over all features.
         multipolygon = feature_collection.get_multipolygon()
+        clusters = self.get_clusters(multipolygon)
+        estimations = self.get_estimations(feature_collection, max_pixels)
+        if len(estimations) == 1 and estimations[0].statistics is not None:
+            return estimations[0]
+
+        return merge_estimations(estimations, clusters, len(multipolygon.geoms))
+
+    def get_estimations(
+        self, feature_collection: FeatureCollection, max_pixels: int | None = None
+    ) -> list[BiomassEstimationGeoTIFF]:
+        # One estimation per cluster of polygons, in the order of `get_clusters`,
+        # made concurrently. With `max_pixels`, the budget is shared between
+        # clusters in proportion to their bbox so they all get the same grid.
+        multipolygon = feature_collection.get_multipolygon()
+        self._check_area(multipolygon, max_pixels)
+
+        polygons = list(multipolygon.geoms)
+        clusters = [
+            shapely.geometry.MultiPolygon([polygons[index] for index in cluster])
+            for cluster in self.get_clusters(multipolygon)
+        ]
+
+        cluster_max_pixels: list[int | None] = [None] * len(clusters)
+        if max_pixels is not None:
+            areas = [shapely.box(*cluster.bounds).area for cluster in clusters]
+            total_area = sum(areas)
+            cluster_max_pixels = [
+                (
+                    max(int(max_pixels * area / total_area), 1)
+                    if total_area
+                    else max_pixels
+                )
+                for area in areas
+            ]
+
+        futures = [
+            self.cluster_executor.submit(
+                self._get_cluster_estimation, cluster, cluster_max_pixels[index]
+            )
+            for index, cluster in enumerate(clusters)
+        ]
+        return [future.result() for future in futures]
+
+    def _get_cluster_estimation(
+        self, multipolygon: shapely.geometry.MultiPolygon, max_pixels: int | None
+    ) -> BiomassEstimationGeoTIFF:
         minx, miny, maxx, maxy = multipolygon.bounds
 
         bbox = shapely.geometry.box(minx, miny, maxx, maxy)
 
-        area, _ = self.geod.geometry_area_perimeter(bbox)
-        if area > SETTINGS.estimation_area_limit:
-            raise ValueError(f"Area too large (max=200ha) : {area}")
-
-        preliminary_estimation = self.get_preliminary_estimation(bbox)
-        if preliminary_estimation is None:
+        preliminary_estimations = self.get_covering_preliminary_estimations(bbox)
+        if not preliminary_estimations:
             raise ValueError(f"Unsupported area: {bbox}")
 
-        raw_estimation = self._get_raw_estimation(bbox, preliminary_estimation)
+        cache_key = None
+        if self.results is not None:
+            cache_key = self._get_cache_key(multipolygon, bbox, preliminary_estimations)
+            if cache_key is not None:
+                cached_estimation = self.results.get(*cache_key)
+                if cached_estimation is not None:
+                    return cached_estimation
+
+        raw_estimation = self._get_raw_estimation(
+            bbox, preliminary_estimations, max_pixels
+        )
         height = raw_estimation.shape[0]
         width = raw_estimation.shape[1]
 
         transform = rasterio.transform.from_bounds(
             minx, miny, maxx, maxy, width, height
         )
+        pixel_area = get_pixel_area(
+            self.geod,
+            preliminary_estimations[0].profile.get("crs"),
+            (transform.a, transform.e),
+            bbox.centroid,
+        )
 
         mask = rasterio.features.geometry_mask(
             multipolygon.geoms,
@@ -85,7 +506,7 @@ class BiomassEstimationService(ABC):
         )
         raw_estimation = np.where(mask, raw_estimation, np.nan)
 
-        profile = preliminary_estimation.profile.copy()
+        profile = preliminary_estimations[0].profile.copy()
         profile.update(
             {
                 "count": 1,
@@ -95,112 +516,408 @@ class BiomassEstimationService(ABC):
             }
         )
 
-        estimation = BiomassEstimationGeoTIFF(data=raw_estimation, profile=profile)
+        statistics = get_absolute_statistics(raw_estimation)
+        if len(multipolygon.geoms) == 1:
+            feature_statistics = [statistics]
+        else:
+            feature_statistics = [
+                get_polygon_statistics(raw_estimation, transform, polygon)
+                for polygon in multipolygon.geoms
+            ]
+
+        # Cached estimations are shared between requests, so they are read-only.
+        raw_estimation.flags.writeable = False
+        estimation = BiomassEstimationGeoTIFF(
+            data=raw_estimation,
+            profile=profile,
+            statistics=(
+                format_statistics(statistics, pixel_area) if statistics.count else None
+            ),
+            feature_statistics=[
+                format_statistics(item, pixel_area) if item.count else None
+                for item in feature_statistics
+            ],
+            pixel_area=pixel_area,
+        )
+        if cache_key is not None:
+            assert self.results is not None
+            self.results.set(*cache_key, estimation)
+
         return estimation
 
 
 class BiomassPreliminaryEstimationService(BiomassEstimationService):
-    def __init__(self):
-        super().__init__()
+    def __init__(
+        self, preliminary_estimations: list[BiomassEstimationGeoTIFF] | None = None
+    ):
+        super().__init__(preliminary_estimations)
+        self.executor = ThreadPoolExecutor(
+            max_workers=SETTINGS.preliminary_read_concurrency,
+            thread_name_prefix="preliminary",
+        )
+        self.datasets = DatasetPool(SETTINGS.dataset_idle_timeout)
 
-    def _get_raw_estimation(
+        # Statistics of internal blocks, keyed by URL, overview level and block
+        # offset. Rasters never change under a URL, so entries stay valid.
+        self.block_statistics: LRUCache[Hashable, RasterStatistics] = LRUCache(
+            maxsize=SETTINGS.preliminary_block_statistics_max_bytes,
+            getsizeof=lambda statistics: statistics.histogram.nbytes,
+        )
+        self.block_statistics_lock = threading.Lock()
+        self.block_statistics_hits = 0
+        self.block_statistics_misses = 0
+
+    def close(self) -> None:
+        # Reads are drained before their datasets are closed under them.
+        super().close()
+        self.executor.shutdown(cancel_futures=True)
+        self.datasets.close()
+
+    def get_statistics(
+        self, feature_collection: FeatureCollection, max_pixels: int | None = None
+    ) -> list[dict[str, Any]]:
+        # Statistics read straight from the raster blocks under the polygons, at
+        # the raster resolution (or the overview fitting `max_pixels`), without
+        # building or encoding the estimation grid.
+        multipolygon = feature_collection.get_multipolygon()
+        self._check_area(multipolygon, max_pixels)
+        factor = self._get_statistics_factor(multipolygon, max_pixels)
+        return format_statistics(*self._get_region_statistics(multipolygon, factor))
+
+    def get_feature_statistics(
+        self, feature_collection: FeatureCollection, max_pixels: int | None = None
+    ) -> tuple[list[dict[str, Any]], list[list[dict[str, Any]] | None]]:
+        multipolygon = feature_collection.get_multipolygon()
+        self._check_area(multipolygon, max_pixels)
+        factor = self._get_statistics_factor(multipolygon, max_pixels)
+
+        feature_statistics: list[list[dict[str, Any]] | None] = []
+        for polygon in multipolygon.geoms:
+            statistics, pixel_area = self._get_region_statistics(
+                shapely.geometry.MultiPolygon([polygon]), factor
+            )
+            feature_statistics.append(
+                format_statistics(statistics, pixel_area) if statistics.count else None
+            )
+
+        return (
+            format_statistics(*self._get_region_statistics(multipolygon, factor)),
+            feature_statistics,
+        )
+
+    def _get_statistics_factor(
+        self, multipolygon: shapely.geometry.MultiPolygon, max_pixels: int | None
+    ) -> float:
+        # How much coarser than the rasters statistics are read for the cluster
+        # windows to fit `max_pixels`, as in `get_estimations`.
+        if max_pixels is None:
+            return 1.0
+
+        polygons = list(multipolygon.geoms)
+        area = sum(
+            shapely.geometry.box(
+                *shapely.geometry.MultiPolygon(
+                    [polygons[index] for index in cluster]
+                ).bounds
+            ).area
+            for cluster in self.get_clusters(multipolygon)
+        )
+        transform = self.preliminary_estimations[0].profile["transform"]
+        pixels = area / abs(transform.a * transform.e)
+        return max(math.sqrt(pixels / max_pixels), 1.0)
+
+    def _get_region_statistics(
+        self, multipolygon: shapely.geometry.MultiPolygon, factor: float
+    ) -> tuple[RasterStatistics, float]:
+        # Statistics of the pixels under the polygons and their mean pixel area.
+        # Each cluster is covered by its own rasters, and each raster covers the
+        # part of the cluster not covered by earlier rasters.
+        polygons = list(multipolygon.geoms)
+        futures = []
+        for cluster in self.get_clusters(multipolygon):
+            remaining: shapely.geometry.base.BaseGeometry = (
+                shapely.geometry.MultiPolygon([polygons[index] for index in cluster])
+            )
+            bbox = shapely.geometry.box(*remaining.bounds)
+            preliminary_estimations = self.get_covering_preliminary_estimations(bbox)
+            if not preliminary_estimations:
+                raise ValueError(f"Unsupported area: {bbox}")
+
+            for estimation in preliminary_estimations:
+                region = shapely.geometry.MultiPolygon(
+                    [
+                        polygon
+                        for polygon in shapely.get_parts(
+                            remaining.intersection(estimation.bounding_box)
+                        )
+                        if isinstance(polygon, shapely.geometry.Polygon)
+                        and polygon.area
+                    ]
+                )
+                remaining = remaining.difference(estimation.bounding_box)
+                if not region.is_empty:
+                    futures.append(
+                        self.executor.submit(
+                            self._read_statistics, estimation, region, factor
+                        )
+                    )
+
+        statistics = RasterStatistics()
+        weighted_pixel_area = 0.0
+        for future in futures:
+            raster_statistics, pixel_area = future.result()
+            statistics.merge(raster_statistics)
+            weighted_pixel_area += raster_statistics.count * pixel_area
+
+        if statistics.count == 0:
+            return statistics, 0.0
+
+        return statistics, weighted_pixel_area / statistics.count
+
+    def _read_statistics(
         self,
-        bbox: shapely.geometry.Polygon,
         preliminary_estimation: BiomassEstimationGeoTIFF,
-    ) -> np.ndarray:
+        region: shapely.geometry.MultiPolygon,
+        factor: float,
+    ) -> tuple[RasterStatistics, float]:
         if not isinstance(preliminary_estimation.data, str):
             raise TypeError(
                 f"Preliminary estimation's GeoTIFF must be a URL (string), but found: {type(preliminary_estimation.data)}"
             )
 
-        with rasterio.open(preliminary_estimation.data) as src:
-            minx, miny, maxx, maxy = bbox.bounds
-            window = rasterio.windows.from_bounds(
-                minx, miny, maxx, maxy, transform=src.transform
-            )
-            raw_estimation: np.ndarray = src.read(1, window=window)
-            return raw_estimation
+        url = preliminary_estimation.data
+        with self.datasets.open(url) as src:
+            overview_level = get_overview_level(src, factor)
 
+        statistics = RasterStatistics()
+        shapely.prepare(region)
+        with self.datasets.open(url, overview_level) as src:
+            pixel_area = get_pixel_area(self.geod, src.crs, src.res, region.centroid)
+            # Only blocks around each polygon are visited, so distant polygons on
+            # the same raster do not cost the blocks between them.
+            block_height, block_width = src.block_shapes[0]
+            blocks: set[tuple[int, int]] = set()
+            for polygon in region.geoms:
+                window = get_block_window(
+                    src,
+                    rasterio.windows.from_bounds(
+                        *polygon.bounds, transform=src.transform
+                    )
+                    .intersection(rasterio.windows.Window(0, 0, src.width, src.height))
+                    .round_offsets()
+                    .round_lengths(),
+                )
+                blocks.update(
+                    (row, col)
+                    for row in range(
+                        int(window.row_off),
+                        int(window.row_off + window.height),
+                        block_height,
+                    )
+                    for col in range(
+                        int(window.col_off),
+                        int(window.col_off + window.width),
+                        block_width,
+                    )
+                )
 
-class BiomassRuntimeEstimationService(BiomassEstimationService):
-    def __init__(self):
-        super().__init__()
-        self.collections: dict[CollectionID, ee.imagecollection.ImageCollection] = {
-            "sen1": ee.imagecollection.ImageCollection("COPERNICUS/S1_GRD")
-            .filter(
-                ee.filter.Filter.listContains("transmitterReceiverPolarisation", "VV")
-            )
-            .select(BANDS["sen1"]),
-            "sen2_10m": ee.imagecollection.ImageCollection(
-                "COPERNICUS/S2_SR_HARMONIZED"
-            ).select(BANDS["sen2_10m"]),
-            "sen2_20m": ee.imagecollection.ImageCollection(
-                "COPERNICUS/S2_SR_HARMONIZED"
-            ).select(BANDS["sen2_20m"]),
-            "sen2_60m": ee.imagecollection.ImageCollection(
-                "COPERNICUS/S2_SR_HARMONIZED"
-            ).select(BANDS["sen2_60m"]),
-        }
+            # Blocks inside the polygons are summarised once and reused, blocks on
+            # their boundary are read and masked.
+            for row, col in sorted(blocks):
+                block_window = rasterio.windows.Window(
+                    col,
+                    row,
+                    min(block_width, src.width - col),
+                    min(block_height, src.height - row),
+                )
+                block_box = shapely.geometry.box(*src.window_bounds(block_window))
+                if region.contains(block_box):
+                    statistics.merge(
+                        self._get_block_statistics(
+                            src, url, overview_level, block_window
+                        )
+                    )
+                elif region.intersects(block_box):
+                    mask = rasterio.features.geometry_mask(
+                        region.geoms,
+                        out_shape=(
+                            int(block_window.height),
+                            int(block_window.width),
+                        ),
+                        transform=src.window_transform(block_window),
+                        invert=True,
+                    )
+                    data = read_block(src, block_window)
+                    statistics.update(np.abs(np.where(mask, data, np.nan)))
+
+        return statistics, pixel_area
+
+    def _get_block_statistics(
+        self,
+        src: rasterio.io.DatasetReader,
+        url: str,
+        overview_level: int | None,
+        block_window: rasterio.windows.Window,
+    ) -> RasterStatistics:
+        key = (url, overview_level, block_window.row_off, block_window.col_off)
+        with self.block_statistics_lock:
+            statistics = self.block_statistics.get(key)
+            if statistics is not None:
+                self.block_statistics_hits += 1
+                return statistics
+            self.block_statistics_misses += 1
+
+        statistics = RasterStatistics().update(np.abs(read_block(src, block_window)))
+        with self.block_statistics_lock:
+            try:
+                self.block_statistics[key] = statistics
+            except ValueError:
+                pass
+
+        return statistics
+
+    def block_statistics_metrics(self) -> dict[str, Any]:
+        with self.block_statistics_lock:
+            lookups = self.block_statistics_hits + self.block_statistics_misses
+            return {
+                "entries": len(self.block_statistics),
+                "size_mb": self.block_statistics.currsize / 2**20,
+                "max_size_mb": self.block_statistics.maxsize / 2**20,
+                "hits": self.block_statistics_hits,
+                "misses": self.block_statistics_misses,
+                "hit_rate": (self.block_statistics_hits / lookups if lookups else 0.0),
+            }
 
     def _get_raw_estimation(
         self,
         bbox: shapely.geometry.Polygon,
-        preliminary_estimation: BiomassEstimationGeoTIFF,
+        preliminary_estimations: list[BiomassEstimationGeoTIFF],
+        max_pixels: int | None,
     ) -> np.ndarray:
-        coords, sen1, sen2_10m, sen2_20m, sen2_60m = self._load_data(bbox)
-        raw_estimation = estimate_biomass(coords, sen1, sen2_10m, sen2_20m, sen2_60m)
-        raw_estimation = raw_estimation[0]
+        # The output grid spans the bbox at the resolution of the first raster,
+        # or coarser to fit `max_pixels`. Only the part of each raster
+        # overlapping the bbox is read, resampled onto the output grid if its
+        # resolution differs. Where rasters overlap, earlier rasters take
+        # priority.
+        minx, miny, maxx, maxy = bbox.bounds
+        window = rasterio.windows.from_bounds(
+            minx,
+            miny,
+            maxx,
+            maxy,
+            transform=preliminary_estimations[0].profile["transform"],
+        )
+        height = max(round(window.height), 1)
+        width = max(round(window.width), 1)
+        if max_pixels is not None and height * width > max_pixels:
+            factor = math.sqrt(height * width / max_pixels)
+            height = max(int(height / factor), 1)
+            width = max(int(width / factor), 1)
+
+        transform = rasterio.transform.from_bounds(
+            minx, miny, maxx, maxy, width, height
+        )
+
+        futures = [
+            self.executor.submit(
+                self._read_window, estimation, bbox, transform, height, width
+            )
+            for estimation in preliminary_estimations
+        ]
+
+        raw_estimation: np.ndarray | None = None
+        for future in futures:
+            result = future.result()
+            if result is None:
+                continue
+
+            window, data = result
+            if raw_estimation is None:
+                raw_estimation = np.full((height, width), np.nan, data.dtype)
+
+            region = raw_estimation[window.toslices()]
+            region[:] = np.where(np.isnan(region), data, region)
+
+        if raw_estimation is None:
+            raise ValueError(f"Unsupported area: {bbox}")
+
         return raw_estimation
 
-    def _get_coordinates(
+    def _read_window(
         self,
-        collection_id: CollectionID,
-        bbox: ee.geometry.Geometry,
-    ) -> np.ndarray:
-        img: ee.image.Image = (
-            self.collections[collection_id]
-            .filterBounds(bbox)
-            .sort("system:time_start", False)
-            .first()
-        )
-        proj = img.projection()
-        sample = ee.image.Image.pixelCoordinates(proj).sampleRectangle(bbox)
-        x = sample.getArray("x").getInfo()
-        y = sample.getArray("y").getInfo()
+        preliminary_estimation: BiomassEstimationGeoTIFF,
+        bbox: shapely.geometry.Polygon,
+        transform: Affine,
+        height: int,
+        width: int,
+    ) -> tuple[rasterio.windows.Window, np.ndarray] | None:
+        if not isinstance(preliminary_estimation.data, str):
+            raise TypeError(
+                f"Preliminary estimation's GeoTIFF must be a URL (string), but found: {type(preliminary_estimation.data)}"
+            )
 
-        coords = np.stack([x, y], axis=0)  # type: ignore
-        return coords
+        overlap = bbox.intersection(preliminary_estimation.bounding_box)
+        if overlap.is_empty:
+            return None
 
-    def _sample_data(
+        try:
+            window = get_covering_window(overlap.bounds, transform, height, width)
+        except rasterio.errors.WindowError:
+            return None
+        if window.width == 0 or window.height == 0:
+            return None
+
+        # Coarse grids are read from the finest overview that is still at least as
+        # detailed as the grid, so that large areas cost about as much as small ones.
+        url = preliminary_estimation.data
+        with self.datasets.open(url) as src:
+            overview_level = get_overview_level(src, abs(transform.a / src.transform.a))
+
+        with self.datasets.open(url, overview_level) as src:
+            data = read_window(src, transform, window)
+            dtype = np.promote_types(data.dtype, np.float32)
+            return window, data.astype(dtype).filled(np.nan)
+
+
+class BiomassRuntimeEstimationService(BiomassEstimationService):
+    def __init__(
         self,
-        collection_id: CollectionID,
-        bbox: ee.geometry.Geometry,
-    ) -> np.ndarray:
-        img: ee.image.Image = (
-            self.collections[collection_id]
-            .filterBounds(bbox)
-            .sort("system:time_start", False)
-            .first()
+        preliminary_estimations: list[BiomassEstimationGeoTIFF] | None = None,
+        imagery_provider: ImageryProvider | None = None,
+    ):
+        super().__init__(preliminary_estimations)
+        self.imagery_provider = imagery_provider or get_imagery_provider()
+        self.results = VersionedCache(
+            SETTINGS.estimation_cache_max_bytes,
+            SETTINGS.estimation_cache_ttl,
+            getsizeof=lambda estimation: estimation.data.nbytes,
         )
-        sample = img.sampleRectangle(bbox)
-        bands = []
-        for band_name in BANDS[collection_id]:
-            band = sample.getArray(band_name).getInfo()
-            bands.append(band)
 
-        data = np.stack(bands, axis=-1)
-        return data
+    def _get_cache_key(
+        self,
+        multipolygon: shapely.geometry.MultiPolygon,
+        bbox: shapely.geometry.Polygon,
+        preliminary_estimations: list[BiomassEstimationGeoTIFF],
+    ) -> tuple[Hashable, str] | None:
+        # Estimations are reused as long as the same scenes are served and the
+        # model checkpoints are unchanged.
+        scene_ids = self.imagery_provider.get_scene_ids(bbox)
+        key = (get_geometry_hash(multipolygon), tuple(sorted(scene_ids.items())))
+        return key, get_model_version()
 
-    def _load_data(self, bbox: shapely.geometry.Polygon):
-        minx, miny, maxx, maxy = bbox.bounds
-        gee_bbox = ee.geometry.Geometry.Polygon(
-            [[[minx, miny], [maxx, miny], [maxx, maxy], [minx, maxy], [minx, miny]]]
-        )
+    def _get_raw_estimation(
+        self,
+        bbox: shapely.geometry.Polygon,
+        preliminary_estimations: list[BiomassEstimationGeoTIFF],
+        max_pixels: int | None,
+    ) -> np.ndarray:
+        if max_pixels is not None:
+            raise ValueError("Runtime estimations are only made at full resolution")
 
-        coords = self._get_coordinates("sen1", gee_bbox)
-        sen1 = self._sample_data("sen1", gee_bbox)
-        sen2_10m = self._sample_data("sen2_10m", gee_bbox)
-        sen2_20m = self._sample_data("sen2_20m", gee_bbox)
-        sen2_60m = self._sample_data("sen2_60m", gee_bbox)
+        coords, sen1, sen2_10m, sen2_20m, sen2_60m = self._load_data(bbox)
+        raw_estimation = estimate_biomass(coords, sen1, sen2_10m, sen2_20m, sen2_60m)
+        raw_estimation = raw_estimation[0]
+        return raw_estimation
 
-        return coords, sen1, sen2_10m, sen2_20m, sen2_60m
+    def _load_data(self, bbox: shapely.geometry.Polygon):
+        return self.imagery_provider.load(bbox)
@@ -0,0 +1,173 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Hashable, TypeVar
+
+from cachetools import TTLCache
+from src.settings import LOGGER
+
+V = TypeVar("V")
+
+
+class DiskLRUCache:
+    # Byte-bounded cache of opaque values, one file per entry. Recency survives
+    # restarts through file mtimes. Workers sharing a directory each track their
+    # own view of it, so the budget is enforced per process and entries evicted
+    # by another worker are treated as misses.
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+
+        self.entries: OrderedDict[str, int] = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(directory, exist_ok=True)
+        files = []
+        for name in os.listdir(directory):
+            if name.endswith(".tmp"):
+                continue
+
+            stat = os.stat(os.path.join(directory, name))
+            files.append((stat.st_mtime, name, stat.st_size))
+
+        for _, name, size in sorted(files):
+            self.entries[name] = size
+            self.size += size
+
+        with self.lock:
+            self._evict()
+
+    def _get_name(self, key: str) -> str:
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key: str) -> bytes | None:
+        name = self._get_name(key)
+        path = os.path.join(self.directory, name)
+        try:
+            with open(path, "rb") as file:
+                value = file.read()
+            os.utime(path)
+        except FileNotFoundError:
+            with self.lock:
+                self.misses += 1
+                if name in self.entries:
+                    self.size -= self.entries.pop(name)
+            return None
+
+        with self.lock:
+            self.hits += 1
+            if name not in self.entries:
+                self.size += len(value)
+            self.entries[name] = len(value)
+            self.entries.move_to_end(name)
+
+        return value
+
+    def set(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+
+        name = self._get_name(key)
+        path = os.path.join(self.directory, name)
+        temporary_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temporary_path, "wb") as file:
+            file.write(value)
+        os.replace(temporary_path, path)
+
+        with self.lock:
+            self.size += len(value) - self.entries.pop(name, 0)
+            self.entries[name] = len(value)
+            self._evict()
+
+    def _evict(self) -> None:
+        while self.size > self.max_bytes and self.entries:
+            name, size = self.entries.popitem(last=False)
+            self.size -= size
+            self.evictions += 1
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                LOGGER.warning(f"Cannot evict cache entry {name}: {e}")
+
+    def metrics(self) -> dict[str, float]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "size_mb": self.size / 2**20,
+                "max_size_mb": self.max_bytes / 2**20,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+class VersionedCache(Generic[V]):
+    # In-memory cache bounded by the total size of its values (as measured by
+    # `getsizeof`) with a TTL. Entries belong to one version, when a lookup or an
+    # insert comes with a different version, every entry is dropped. This is the
+    # only invalidation: callers derive the version from whatever the values
+    # depend on (e.g. `get_model_version`), so replacing it is seen on next use.
+    def __init__(self, max_bytes: int, ttl: float, getsizeof: Callable[[V], int]):
+        self.entries: TTLCache[Hashable, V] = TTLCache(
+            maxsize=max_bytes, ttl=ttl, getsizeof=getsizeof
+        )
+        self.lock = threading.Lock()
+        self.version: str | None = None
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, version: str) -> V | None:
+        with self.lock:
+            self._check_version(version)
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+            return value
+
+    def set(self, key: Hashable, version: str, value: V) -> None:
+        with self.lock:
+            self._check_version(version)
+            try:
+                self.entries[key] = value
+            except ValueError:
+                # Larger than the whole cache.
+                pass
+
+    def _check_version(self, version: str) -> None:
+        if version == self.version:
+            return
+
+        if self.version is not None:
+            LOGGER.info(f"Cache version changed to {version}, dropping entries")
+            self.entries.clear()
+            self.invalidations += 1
+
+        self.version = version
+
+    def metrics(self) -> dict[str, Any]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "size_mb": self.entries.currsize / 2**20,
+                "max_size_mb": self.entries.maxsize / 2**20,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "version": self.version,
+            }
@@ -0,0 +1,218 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+import numpy as np
+import rasterio
+import rasterio.io
+import rasterio.windows
+from affine import Affine
+from src.settings import LOGGER, SETTINGS
+
+
+def get_gdal_options() -> dict[str, Any]:
+    # Remote rasters are read through /vsicurl/. Headers and blocks fetched once
+    # stay in the VSI cache, decoded blocks in the block cache, and concurrent
+    # range requests share HTTP/2 connections.
+    return {
+        "GDAL_CACHEMAX": SETTINGS.gdal_cache_max_mb,
+        "VSI_CACHE": True,
+        "VSI_CACHE_SIZE": SETTINGS.gdal_vsi_cache_size,
+        "CPL_VSIL_CURL_CACHE_SIZE": SETTINGS.gdal_vsi_cache_size,
+        "GDAL_HTTP_MULTIPLEX": SETTINGS.gdal_http_multiplex,
+        "GDAL_HTTP_VERSION": 2,
+        "GDAL_HTTP_MERGE_CONSECUTIVE_RANGES": True,
+        "GDAL_DISABLE_READDIR_ON_OPEN": "EMPTY_DIR",
+    }
+
+
+def get_block_window(
+    src: rasterio.io.DatasetReader, window: rasterio.windows.Window
+) -> rasterio.windows.Window:
+    # Smallest window made of whole internal blocks (COG tiles) covering `window`.
+    block_height, block_width = src.block_shapes[0]
+    row_start = int(window.row_off) // block_height * block_height
+    col_start = int(window.col_off) // block_width * block_width
+    row_stop = min(
+        -(-int(window.row_off + window.height) // block_height) * block_height,
+        src.height,
+    )
+    col_stop = min(
+        -(-int(window.col_off + window.width) // block_width) * block_width,
+        src.width,
+    )
+    return rasterio.windows.Window.from_slices(
+        (row_start, row_stop), (col_start, col_stop)
+    )
+
+
+def get_covering_window(
+    bounds: tuple[float, float, float, float],
+    transform: Affine,
+    height: int,
+    width: int,
+) -> rasterio.windows.Window:
+    # Whole pixels of the `height` x `width` grid `transform` touching `bounds`.
+    window = rasterio.windows.from_bounds(*bounds, transform=transform)
+    return rasterio.windows.Window.from_slices(
+        (math.floor(window.row_off), math.ceil(window.row_off + window.height)),
+        (math.floor(window.col_off), math.ceil(window.col_off + window.width)),
+    ).intersection(rasterio.windows.Window(0, 0, width, height))
+
+
+def get_overview_level(src: rasterio.io.DatasetReader, factor: float) -> int | None:
+    # Finest overview still at least as detailed as a grid `factor` times coarser
+    # than the full resolution, None for the full resolution itself.
+    overview_level = None
+    for level, overview_factor in enumerate(src.overviews(1)):
+        if overview_factor <= factor:
+            overview_level = level
+
+    return overview_level
+
+
+def read_window(
+    src: rasterio.io.DatasetReader,
+    transform: Affine,
+    window: rasterio.windows.Window,
+) -> np.ma.MaskedArray:
+    # Nearest-neighbour read of `window` of a north-up output grid `transform`.
+    # Each output pixel centre is mapped to the source pixel containing it, and
+    # the source is read in whole internal blocks, so requests for neighbouring
+    # areas hit the same cached blocks.
+    rows = np.arange(window.row_off, window.row_off + window.height) + 0.5
+    cols = np.arange(window.col_off, window.col_off + window.width) + 0.5
+    ys = transform.f + rows * transform.e
+    xs = transform.c + cols * transform.a
+
+    source_rows = np.floor((ys - src.transform.f) / src.transform.e).astype(int)
+    source_cols = np.floor((xs - src.transform.c) / src.transform.a).astype(int)
+
+    # Output pixels whose centre falls outside the raster have no value.
+    valid_rows = (source_rows >= 0) & (source_rows < src.height)
+    valid_cols = (source_cols >= 0) & (source_cols < src.width)
+    outside = ~np.logical_and.outer(valid_rows, valid_cols)
+    if outside.all():
+        data = np.ma.masked_all((len(source_rows), len(source_cols)), src.dtypes[0])
+        data.fill_value = src.nodata
+        return data
+
+    block_window = get_block_window(
+        src,
+        rasterio.windows.Window.from_slices(
+            (source_rows[valid_rows].min(), source_rows[valid_rows].max() + 1),
+            (source_cols[valid_cols].min(), source_cols[valid_cols].max() + 1),
+        ),
+    )
+    block_rows = np.clip(
+        source_rows - int(block_window.row_off), 0, int(block_window.height) - 1
+    )
+    block_cols = np.clip(
+        source_cols - int(block_window.col_off), 0, int(block_window.width) - 1
+    )
+
+    blocks = src.read(1, window=block_window, masked=True)
+    data = blocks[np.ix_(block_rows, block_cols)]
+    data[outside] = np.ma.masked
+    return data
+
+
+class DatasetHandle:
+    def __init__(self, dataset: rasterio.io.DatasetReader):
+        self.dataset = dataset
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+
+
+class DatasetPool:
+    # Open rasterio datasets, one per thread and URL since GDAL handles must not
+    # be shared between threads. Handles idle for longer than `idle_timeout` are
+    # closed by whichever thread opens a dataset next.
+    def __init__(self, idle_timeout: float):
+        self.idle_timeout = idle_timeout
+        self.handles: dict[tuple[int, str, int | None], DatasetHandle] = {}
+        self.lock = threading.Lock()
+
+        self.opens = 0
+        self.reuses = 0
+        self.evictions = 0
+
+    @contextmanager
+    def open(
+        self, url: str, overview_level: int | None = None
+    ) -> Iterator[rasterio.io.DatasetReader]:
+        self._evict_idle()
+
+        key = (threading.get_ident(), url, overview_level)
+        with rasterio.Env(**get_gdal_options()):
+            with self.lock:
+                handle = self.handles.get(key)
+                if handle is not None:
+                    handle.last_used = time.monotonic()
+                    self.reuses += 1
+
+            if handle is None:
+                # Passing `overview_level=None` would hide the overviews.
+                options = (
+                    {} if overview_level is None else {"overview_level": overview_level}
+                )
+                handle = DatasetHandle(rasterio.open(url, **options))
+                with self.lock:
+                    self.handles[key] = handle
+                    self.opens += 1
+
+            with handle.lock:
+                try:
+                    yield handle.dataset
+                finally:
+                    handle.last_used = time.monotonic()
+
+    def _evict_idle(self) -> None:
+        now = time.monotonic()
+        with self.lock:
+            idle = [
+                (key, handle)
+                for key, handle in self.handles.items()
+                if now - handle.last_used > self.idle_timeout
+            ]
+
+        for key, handle in idle:
+            # Handles in use are skipped, they are not idle anymore.
+            if not handle.lock.acquire(blocking=False):
+                continue
+
+            try:
+                # Checked again in case the handle was just taken from the pool.
+                with self.lock:
+                    if self.handles.get(key) is not handle or (
+                        time.monotonic() - handle.last_used <= self.idle_timeout
+                    ):
+                        continue
+                    del self.handles[key]
+                    self.evictions += 1
+
+                handle.dataset.close()
+            except Exception as e:
+                LOGGER.warning(f"Cannot close dataset {key[1]}: {e}")
+            finally:
+                handle.lock.release()
+
+    def close(self) -> None:
+        with self.lock:
+            handles = list(self.handles.values())
+            self.handles.clear()
+
+        for handle in handles:
+            with handle.lock:
+                handle.dataset.close()
+
+    def metrics(self) -> dict[str, int]:
+        with self.lock:
+            return {
+                "handles": len(self.handles),
+                "opens": self.opens,
+                "reuses": self.reuses,
+                "evictions": self.evictions,
+            }
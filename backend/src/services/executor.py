@@ -0,0 +1,91 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from src.ai.scheduler import InferenceQueueFullError
+
+T = TypeVar("T")
+
+
+class EstimationQueueFullError(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("Estimation queue is full")
+        self.retry_after = retry_after
+
+
+class EstimationExecutor:
+    def __init__(self, max_workers: int, max_queue_size: int, retry_after: int):
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="estimation"
+        )
+        self.max_workers = max_workers
+        self.capacity = max_workers + max_queue_size
+        self.retry_after = retry_after
+
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_observed_wait = 0.0
+
+    async def run(self, function: Callable[..., T], *args) -> T:
+        with self.lock:
+            if self.pending + self.running >= self.capacity:
+                self.rejected += 1
+                raise EstimationQueueFullError(self.retry_after)
+            self.pending += 1
+
+        submitted_at = time.perf_counter()
+
+        def task() -> T:
+            wait = time.perf_counter() - submitted_at
+            with self.lock:
+                self.pending -= 1
+                self.running += 1
+                self.total_wait += wait
+                self.max_observed_wait = max(self.max_observed_wait, wait)
+            try:
+                return function(*args)
+            finally:
+                with self.lock:
+                    self.running -= 1
+                    self.completed += 1
+
+        def release(future: Future) -> None:
+            # Futures are only cancelled before `task` starts (the awaiting request
+            # was cancelled, or on shutdown), so their queue slot is still held.
+            if future.cancelled():
+                with self.lock:
+                    self.pending -= 1
+
+        future = self.executor.submit(task)
+        future.add_done_callback(release)
+
+        try:
+            return await asyncio.wrap_future(future)
+        except InferenceQueueFullError:
+            # The inference scheduler is saturated, which is the same backpressure
+            # as this queue being full.
+            with self.lock:
+                self.rejected += 1
+            raise EstimationQueueFullError(self.retry_after)
+
+    def metrics(self) -> dict[str, float]:
+        with self.lock:
+            started = self.completed + self.running
+            return {
+                "workers": self.max_workers,
+                "running": self.running,
+                "queue_depth": self.pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "mean_wait_ms": self.total_wait / started * 1_000 if started else 0.0,
+                "max_wait_ms": self.max_observed_wait * 1_000,
+            }
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,555 @@
+import glob
+import io
+import math
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+import ee.data
+import ee.ee_exception
+import ee.ee_list
+import ee.filter
+import ee.geometry
+import ee.image
+import ee.imagecollection
+import googleapiclient.errors
+import numpy as np
+import rasterio
+import rasterio.transform
+import rasterio.warp
+import rasterio.windows
+import shapely.geometry
+from affine import Affine
+from cachetools import LRUCache, TTLCache
+from numpy.lib.recfunctions import structured_to_unstructured
+from src.models import CollectionID
+from src.services.caching import DiskLRUCache
+from src.settings import LOGGER, SETTINGS
+
+BANDS: dict[CollectionID, list[str]] = {
+    "sen1": ["VV", "VH"],
+    "sen2_10m": ["B2", "B3", "B4", "B8"],
+    "sen2_20m": ["B5", "B6", "B7", "B8A", "B11", "B12"],
+    "sen2_60m": ["B1", "B9"],
+}
+
+T = TypeVar("T")
+
+Imagery = tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+# Earth Engine reports computations over the request deadline and rate limiting
+# only through the message of the exception.
+TRANSIENT_MESSAGES = ("timed out", "deadline exceeded", "too many", "rate limit")
+
+
+def is_transient_error(error: Exception) -> bool:
+    # Timeouts, connection errors, rate limiting (429) and server errors (5xx).
+    # Invalid requests, missing assets and permission errors fail the same way
+    # when retried.
+    if isinstance(error, OSError):
+        return True
+    if not isinstance(error, ee.ee_exception.EEException):
+        return False
+
+    # Earth Engine raises its exception while handling the HTTP error of the
+    # API client, which keeps the status code.
+    cause = error.__cause__ or error.__context__
+    if isinstance(cause, googleapiclient.errors.HttpError):
+        return cause.status_code in (408, 429) or cause.status_code >= 500
+
+    message = str(error).lower()
+    return any(pattern in message for pattern in TRANSIENT_MESSAGES)
+
+
+def get_cell(
+    bbox: shapely.geometry.Polygon, cell_size: float
+) -> shapely.geometry.Polygon:
+    minx, miny, maxx, maxy = bbox.bounds
+    return shapely.geometry.box(
+        round(math.floor(minx / cell_size) * cell_size, 6),
+        round(math.floor(miny / cell_size) * cell_size, 6),
+        round(math.ceil(maxx / cell_size) * cell_size, 6),
+        round(math.ceil(maxy / cell_size) * cell_size, 6),
+    )
+
+
+def get_footprint(geometry: dict) -> shapely.geometry.Polygon:
+    # Earth Engine returns scene footprints as GeoJSON linear rings.
+    if geometry["type"] == "LinearRing":
+        return shapely.geometry.Polygon(geometry["coordinates"])
+
+    return shapely.geometry.shape(geometry)
+
+
+def get_pixel_window(
+    bounds: tuple[float, float, float, float], transform: Affine
+) -> rasterio.windows.Window:
+    # Widened to whole pixels so that, like Earth Engine, every pixel touching the
+    # bounds is included.
+    window = rasterio.windows.from_bounds(*bounds, transform=transform)
+    col_off = math.floor(window.col_off)
+    row_off = math.floor(window.row_off)
+    return rasterio.windows.Window(
+        col_off,
+        row_off,
+        math.ceil(window.col_off + window.width) - col_off,
+        math.ceil(window.row_off + window.height) - row_off,
+    )
+
+
+def get_tile_indexes(
+    window: rasterio.windows.Window, tile_size: int
+) -> list[tuple[int, int]]:
+    return [
+        (tile_row, tile_col)
+        for tile_row in range(
+            window.row_off // tile_size,
+            -(-(window.row_off + window.height) // tile_size),
+        )
+        for tile_col in range(
+            window.col_off // tile_size,
+            -(-(window.col_off + window.width) // tile_size),
+        )
+    ]
+
+
+def get_pixel_coordinates(transform: Affine, height: int, width: int) -> np.ndarray:
+    columns, rows = np.meshgrid(np.arange(width) + 0.5, np.arange(height) + 0.5)
+    x, y = transform * (columns, rows)
+    return np.stack([x, y], axis=0)
+
+
+class ImageryProvider(ABC):
+    # Returns coordinates (channel-first) and Sentinel bands (channel-last) of the
+    # scenes covering `bbox`, as expected by `estimate_biomass`.
+    @abstractmethod
+    def get_scene_ids(self, bbox: shapely.geometry.Polygon) -> dict[str, str]:
+        # Identifies the scenes `load` would read for `bbox`.
+        pass
+
+    @abstractmethod
+    def load(self, bbox: shapely.geometry.Polygon) -> Imagery:
+        pass
+
+    def metrics(self) -> dict[str, Any]:
+        return {}
+
+
+# Band groups are sampled from one scene per dataset, so the three Sentinel-2
+# groups always come from the same acquisition.
+DATASETS: dict[CollectionID, str] = {
+    "sen1": "sen1",
+    "sen2_10m": "sen2",
+    "sen2_20m": "sen2",
+    "sen2_60m": "sen2",
+}
+
+
+class GEEImageryProvider(ImageryProvider):
+    def __init__(self):
+        self.datasets: dict[str, ee.imagecollection.ImageCollection] = {
+            "sen1": ee.imagecollection.ImageCollection("COPERNICUS/S1_GRD").filter(
+                ee.filter.Filter.listContains("transmitterReceiverPolarisation", "VV")
+            ),
+            "sen2": ee.imagecollection.ImageCollection("COPERNICUS/S2_SR_HARMONIZED"),
+        }
+        self.gee_executor = ThreadPoolExecutor(
+            max_workers=SETTINGS.gee_max_concurrency, thread_name_prefix="gee"
+        )
+
+        # Latest scenes and footprints per dataset and grid cell, newest first.
+        self.scenes: TTLCache[tuple, list[tuple[str, shapely.geometry.Polygon]]] = (
+            TTLCache(
+                maxsize=SETTINGS.gee_scene_cache_maxsize,
+                ttl=SETTINGS.gee_scene_cache_ttl,
+            )
+        )
+        self.scenes_lock = threading.Lock()
+
+        # Projections of pinned scenes never change.
+        self.projections: LRUCache[tuple, tuple[str, Affine]] = LRUCache(
+            maxsize=SETTINGS.gee_scene_cache_maxsize * len(DATASETS)
+        )
+        self.projections_lock = threading.Lock()
+
+        self.tile_size = SETTINGS.imagery_tile_size
+        self.tiles = DiskLRUCache(
+            SETTINGS.imagery_cache_dir, SETTINGS.imagery_cache_max_bytes
+        )
+
+    def get_scene_ids(self, bbox: shapely.geometry.Polygon) -> dict[str, str]:
+        # The latest scene of each dataset intersecting the AOI is used. The latest
+        # scenes intersecting the AOI's grid cell are cached with their footprints,
+        # so nearby requests resolve their scenes without a lookup.
+        cell = get_cell(bbox, SETTINGS.gee_scene_cell_size)
+        futures = {
+            dataset: self.gee_executor.submit(self._find_scene, dataset, cell, bbox)
+            for dataset in dict.fromkeys(DATASETS.values())
+        }
+
+        scene_ids: dict[str, str] = {}
+        for dataset, future in futures.items():
+            scene_id = future.result()
+            if scene_id is None:
+                raise ValueError(f"No {dataset} scene for area: {bbox}")
+
+            scene_ids[dataset] = scene_id
+
+        return scene_ids
+
+    def _find_scene(
+        self,
+        dataset: str,
+        cell: shapely.geometry.Polygon,
+        bbox: shapely.geometry.Polygon,
+    ) -> str | None:
+        key = (dataset, cell.bounds)
+        with self.scenes_lock:
+            scenes = self.scenes.get(key)
+
+        if scenes is None:
+            scenes = self._call(
+                self._get_latest_scenes, dataset, cell, SETTINGS.gee_scene_candidates
+            )
+            with self.scenes_lock:
+                self.scenes[key] = scenes
+
+        # Scenes are sorted newest first and any scene intersecting the cell but
+        # missing from the list is older than all of them, so the first footprint
+        # intersecting the AOI is its latest scene.
+        for scene_id, footprint in scenes:
+            if footprint.intersects(bbox):
+                return scene_id
+
+        if len(scenes) < SETTINGS.gee_scene_candidates:
+            return None
+
+        return self._call(self._get_latest_scene, dataset, bbox)
+
+    def _get_latest_scenes(
+        self, dataset: str, region: shapely.geometry.Polygon, limit: int
+    ) -> list[tuple[str, shapely.geometry.Polygon]]:
+        collection = (
+            self.datasets[dataset]
+            .filterBounds(self._get_region(region))
+            .limit(limit, "system:time_start", False)
+        )
+        scene_ids, footprints = ee.ee_list.List(
+            [
+                collection.aggregate_array("system:id"),
+                collection.aggregate_array("system:footprint"),
+            ]
+        ).getInfo()
+        return [
+            (scene_id, get_footprint(footprint))
+            for scene_id, footprint in zip(scene_ids, footprints)
+        ]
+
+    def _get_latest_scene(
+        self, dataset: str, region: shapely.geometry.Polygon
+    ) -> str | None:
+        scene_ids = self._get_latest_scenes(dataset, region, 1)
+        return scene_ids[0][0] if scene_ids else None
+
+    def _get_image(self, scene_id: str, collection_id: CollectionID) -> ee.image.Image:
+        return ee.image.Image(scene_id).select(BANDS[collection_id])
+
+    def get_projection(
+        self, scene_id: str, collection_id: CollectionID
+    ) -> tuple[str, Affine]:
+        key = (scene_id, collection_id)
+        with self.projections_lock:
+            projection = self.projections.get(key)
+
+        if projection is None:
+            projection = self._call(self._get_projection, scene_id, collection_id)
+            with self.projections_lock:
+                self.projections[key] = projection
+
+        return projection
+
+    def _get_projection(
+        self, scene_id: str, collection_id: CollectionID
+    ) -> tuple[str, Affine]:
+        projection = self._get_image(scene_id, collection_id).projection().getInfo()
+        crs = projection.get("crs") or projection["wkt"]
+        return crs, Affine(*projection["transform"])
+
+    def _get_tile(
+        self,
+        scene_id: str,
+        collection_id: CollectionID,
+        projection: tuple[str, Affine],
+        tile_row: int,
+        tile_col: int,
+    ) -> np.ndarray:
+        key = f"{scene_id}/{collection_id}/{self.tile_size}/{tile_row}/{tile_col}"
+        value = self.tiles.get(key)
+        if value is not None:
+            return np.load(io.BytesIO(value))["pixels"]
+
+        crs, transform = projection
+        tile_transform = transform * Affine.translation(
+            tile_col * self.tile_size, tile_row * self.tile_size
+        )
+        grid = {
+            "dimensions": {"width": self.tile_size, "height": self.tile_size},
+            "affineTransform": {
+                "scaleX": tile_transform.a,
+                "shearX": tile_transform.b,
+                "translateX": tile_transform.c,
+                "shearY": tile_transform.d,
+                "scaleY": tile_transform.e,
+                "translateY": tile_transform.f,
+            },
+            "crsCode" if crs.startswith("EPSG:") else "crsWkt": crs,
+        }
+        pixels = self._call(
+            self._get_pixels, self._get_image(scene_id, collection_id), grid
+        )
+
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, pixels=pixels)
+        self.tiles.set(key, buffer.getvalue())
+
+        return pixels
+
+    def _assemble(
+        self,
+        window: rasterio.windows.Window,
+        tiles: dict[tuple[int, int], Future[np.ndarray]],
+    ) -> np.ndarray:
+        data: np.ndarray | None = None
+        for (tile_row, tile_col), future in tiles.items():
+            tile = future.result()
+            if data is None:
+                data = np.empty(
+                    (window.height, window.width, tile.shape[-1]), dtype=tile.dtype
+                )
+
+            top = tile_row * self.tile_size - window.row_off
+            left = tile_col * self.tile_size - window.col_off
+            rows = slice(max(top, 0), min(top + self.tile_size, window.height))
+            cols = slice(max(left, 0), min(left + self.tile_size, window.width))
+            data[rows, cols] = tile[
+                rows.start - top : rows.stop - top, cols.start - left : cols.stop - left
+            ]
+
+        assert data is not None
+        return data
+
+    def _call(self, function: Callable[..., T], *args: Any) -> T:
+        # Each attempt is bounded by the Earth Engine request deadline set at
+        # startup. Transient failures are retried with full jitter backoff.
+        for attempt in range(SETTINGS.gee_max_retries + 1):
+            try:
+                return function(*args)
+            except (ee.ee_exception.EEException, OSError) as e:
+                if attempt == SETTINGS.gee_max_retries or not is_transient_error(e):
+                    raise
+
+                delay = random.uniform(0, SETTINGS.gee_retry_backoff * 2**attempt)
+                LOGGER.warning(
+                    f"GEE request failed ({e}), retrying in {delay:.2f}s "
+                    f"({attempt + 1}/{SETTINGS.gee_max_retries})"
+                )
+                time.sleep(delay)
+
+    def _get_pixels(self, image: ee.image.Image, grid: dict) -> np.ndarray:
+        # All bands are downloaded at once as a binary NPY payload that decodes to
+        # one field per band.
+        pixels = ee.data.computePixels(
+            {"expression": image, "fileFormat": "NUMPY_NDARRAY", "grid": grid}
+        )
+        return structured_to_unstructured(pixels)
+
+    def _get_region(self, bbox: shapely.geometry.Polygon) -> ee.geometry.Geometry:
+        minx, miny, maxx, maxy = bbox.bounds
+        return ee.geometry.Geometry.Polygon(
+            [[[minx, miny], [maxx, miny], [maxx, maxy], [minx, maxy], [minx, miny]]]
+        )
+
+    def load(self, bbox: shapely.geometry.Polygon) -> Imagery:
+        started_at = time.perf_counter()
+        scene_ids = self.get_scene_ids(bbox)
+        scenes: dict[CollectionID, str] = {
+            collection_id: scene_ids[dataset]
+            for collection_id, dataset in DATASETS.items()
+        }
+        resolved_at = time.perf_counter()
+
+        # Projections of pinned scenes are cached, so they only cost a round trip
+        # the first time a scene is seen.
+        projections = {
+            collection_id: self.gee_executor.submit(
+                self.get_projection, scene_id, collection_id
+            )
+            for collection_id, scene_id in scenes.items()
+        }
+
+        # Every collection is assembled from fixed grid tiles cached on disk, and
+        # all missing tiles are fetched at once.
+        windows: dict[CollectionID, rasterio.windows.Window] = {}
+        tiles: dict[CollectionID, dict[tuple[int, int], Future[np.ndarray]]] = {}
+        for collection_id, scene_id in scenes.items():
+            projection = projections[collection_id].result()
+            crs, transform = projection
+            bounds = rasterio.warp.transform_bounds("EPSG:4326", crs, *bbox.bounds)
+            windows[collection_id] = window = get_pixel_window(bounds, transform)
+            tiles[collection_id] = {
+                (tile_row, tile_col): self.gee_executor.submit(
+                    self._get_tile,
+                    scene_id,
+                    collection_id,
+                    projection,
+                    tile_row,
+                    tile_col,
+                )
+                for tile_row, tile_col in get_tile_indexes(window, self.tile_size)
+            }
+        requested_at = time.perf_counter()
+
+        arrays: dict[CollectionID, np.ndarray] = {}
+        timings: dict[CollectionID, float] = {}
+        for collection_id in scenes:
+            arrays[collection_id] = self._assemble(
+                windows[collection_id], tiles[collection_id]
+            )
+            timings[collection_id] = time.perf_counter() - requested_at
+
+        # Coordinates are those of Sentinel-1 pixel centres, in the scene's CRS,
+        # which is what `ee.Image.pixelCoordinates` returns on the same grid.
+        _, sen1_transform = projections["sen1"].result()
+        sen1_window = windows["sen1"]
+        coords = get_pixel_coordinates(
+            sen1_transform
+            * Affine.translation(sen1_window.col_off, sen1_window.row_off),
+            sen1_window.height,
+            sen1_window.width,
+        )
+        sen1 = arrays["sen1"]
+        sen2_10m = arrays["sen2_10m"]
+        sen2_20m = arrays["sen2_20m"]
+        sen2_60m = arrays["sen2_60m"]
+
+        LOGGER.info(
+            f"Loaded GEE data in {time.perf_counter() - started_at:.2f}s "
+            f"(scenes={resolved_at - started_at:.2f}s, "
+            f"projections={requested_at - resolved_at:.2f}s, "
+            + ", ".join(f"{name}={elapsed:.2f}s" for name, elapsed in timings.items())
+            + ")"
+        )
+
+        return coords, sen1, sen2_10m, sen2_20m, sen2_60m
+
+    def metrics(self) -> dict[str, Any]:
+        return {"tile_cache": self.tiles.metrics()}
+
+
+class LocalScene:
+    def __init__(self, path: str, src: rasterio.DatasetReader):
+        self.path = path
+        self.crs = src.crs
+        self.bounding_box = shapely.geometry.box(*src.bounds)
+
+        # Bands are picked by description when the file has them, otherwise the
+        # file must hold exactly the bands of its group, in order.
+        self.band_indexes: dict[str, int] = {
+            description: i + 1
+            for i, description in enumerate(src.descriptions)
+            if description
+        }
+
+    def get_indexes(self, bands: list[str]) -> list[int]:
+        if all(band in self.band_indexes for band in bands):
+            return [self.band_indexes[band] for band in bands]
+
+        return list(range(1, len(bands) + 1))
+
+
+class LocalImageryProvider(ImageryProvider):
+    # Pre-staged scenes live under `<path>/<collection id>/`, one Cloud-Optimized
+    # GeoTIFF (`.tif`) or Zarr store (`.zarr`) per scene. File names must sort
+    # chronologically, the latest scene covering the AOI is used.
+    EXTENSIONS = (".tif", ".tiff", ".zarr")
+
+    def __init__(self, path: str):
+        self.scenes: dict[CollectionID, list[LocalScene]] = {}
+        for collection_id in BANDS:
+            paths = sorted(
+                (
+                    scene_path
+                    for scene_path in glob.glob(os.path.join(path, collection_id, "*"))
+                    if scene_path.lower().endswith(self.EXTENSIONS)
+                ),
+                reverse=True,
+            )
+            self.scenes[collection_id] = []
+            for scene_path in paths:
+                with rasterio.open(scene_path) as src:
+                    if src.crs is None:
+                        LOGGER.warning(f"Skipping scene without a CRS: {scene_path}")
+                        continue
+
+                    self.scenes[collection_id].append(LocalScene(scene_path, src))
+
+        self.executor = ThreadPoolExecutor(
+            max_workers=len(BANDS), thread_name_prefix="imagery"
+        )
+
+    def get_scene(
+        self, collection_id: CollectionID, bbox: shapely.geometry.Polygon
+    ) -> tuple[LocalScene, tuple[float, float, float, float]]:
+        for scene in self.scenes[collection_id]:
+            bounds = rasterio.warp.transform_bounds(
+                "EPSG:4326", scene.crs, *bbox.bounds
+            )
+            if scene.bounding_box.contains(shapely.geometry.box(*bounds)):
+                return scene, bounds
+
+        raise ValueError(f"No local {collection_id} imagery for area: {bbox}")
+
+    def get_scene_ids(self, bbox: shapely.geometry.Polygon) -> dict[str, str]:
+        return {
+            collection_id: self.get_scene(collection_id, bbox)[0].path
+            for collection_id in BANDS
+        }
+
+    def _read(
+        self, collection_id: CollectionID, bbox: shapely.geometry.Polygon
+    ) -> tuple[np.ndarray, Affine]:
+        scene, bounds = self.get_scene(collection_id, bbox)
+        with rasterio.open(scene.path) as src:
+            window = get_pixel_window(bounds, src.transform)
+
+            data = src.read(scene.get_indexes(BANDS[collection_id]), window=window)
+            return data.transpose(1, 2, 0), src.window_transform(window)
+
+    def load(self, bbox: shapely.geometry.Polygon) -> Imagery:
+        started_at = time.perf_counter()
+        futures = {
+            collection_id: self.executor.submit(self._read, collection_id, bbox)
+            for collection_id in BANDS
+        }
+        sen1, sen1_transform = futures["sen1"].result()
+        sen2_10m, _ = futures["sen2_10m"].result()
+        sen2_20m, _ = futures["sen2_20m"].result()
+        sen2_60m, _ = futures["sen2_60m"].result()
+
+        height, width, _ = sen1.shape
+        coords = get_pixel_coordinates(sen1_transform, height, width)
+
+        LOGGER.info(f"Loaded local imagery in {time.perf_counter() - started_at:.2f}s")
+
+        return coords, sen1, sen2_10m, sen2_20m, sen2_60m
+
+
+def get_imagery_provider() -> ImageryProvider:
+    if SETTINGS.imagery_provider == "local":
+        return LocalImageryProvider(SETTINGS.local_imagery_path)
+
+    return GEEImageryProvider()
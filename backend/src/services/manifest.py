@@ -0,0 +1,136 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import rasterio
+import rasterio.crs
+import rasterio.profiles
+from affine import Affine
+from src.models import BiomassEstimationGeoTIFF
+from src.services.datasets import get_gdal_options
+from src.settings import LOGGER, SETTINGS
+
+MANIFEST_VERSION = 1
+
+
+def get_preliminary_estimation_urls(path: str) -> list[str]:
+    with open(path) as file:
+        return [line.strip() for line in file.readlines() if line.strip()]
+
+
+def read_profile(url: str) -> rasterio.profiles.Profile:
+    with rasterio.Env(**get_gdal_options()):
+        with rasterio.open(url) as src:
+            return src.profile
+
+
+def read_preliminary_estimations(urls: list[str]) -> list[BiomassEstimationGeoTIFF]:
+    # Headers are fetched concurrently, cold start is then bounded by the slowest
+    # few rasters rather than their sum.
+    with ThreadPoolExecutor(
+        max_workers=SETTINGS.preliminary_read_concurrency,
+        thread_name_prefix="manifest",
+    ) as executor:
+        profiles = list(executor.map(read_profile, urls))
+
+    return [
+        BiomassEstimationGeoTIFF(data=url, profile=profile)
+        for url, profile in zip(urls, profiles)
+    ]
+
+
+def dump_profile(profile: rasterio.profiles.Profile) -> dict[str, Any]:
+    crs = profile.get("crs")
+    return {
+        **profile,
+        "crs": crs.to_wkt() if crs is not None else None,
+        "transform": list(profile["transform"])[:6],
+    }
+
+
+def parse_profile(data: dict[str, Any]) -> rasterio.profiles.Profile:
+    crs = data.get("crs")
+    return rasterio.profiles.Profile(
+        **{
+            **data,
+            "crs": rasterio.crs.CRS.from_wkt(crs) if crs is not None else None,
+            "transform": Affine(*data["transform"]),
+        }
+    )
+
+
+def save_manifest(path: str, estimations: list[BiomassEstimationGeoTIFF]) -> None:
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "estimations": [
+            {"url": estimation.data, "profile": dump_profile(estimation.profile)}
+            for estimation in estimations
+        ],
+    }
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path + ".tmp", "w") as file:
+        json.dump(manifest, file)
+    os.replace(path + ".tmp", path)
+
+
+def load_manifest(path: str, urls: list[str]) -> list[BiomassEstimationGeoTIFF] | None:
+    # Returns None when the manifest is missing or does not describe `urls`.
+    try:
+        with open(path) as file:
+            manifest = json.load(file)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        LOGGER.warning(f"Cannot read preliminary estimation manifest {path}: {e}")
+        return None
+
+    if (
+        manifest.get("version") != MANIFEST_VERSION
+        or [entry["url"] for entry in manifest["estimations"]] != urls
+    ):
+        LOGGER.warning(f"Preliminary estimation manifest {path} is out of date")
+        return None
+
+    return [
+        BiomassEstimationGeoTIFF(
+            data=entry["url"], profile=parse_profile(entry["profile"])
+        )
+        for entry in manifest["estimations"]
+    ]
+
+
+def load_preliminary_estimations() -> list[BiomassEstimationGeoTIFF]:
+    started_at = time.perf_counter()
+    urls = get_preliminary_estimation_urls(SETTINGS.preliminary_estimation_list_path)
+
+    estimations = load_manifest(SETTINGS.preliminary_manifest_path, urls)
+    source = "manifest"
+    if estimations is None:
+        estimations = read_preliminary_estimations(urls)
+        source = "raster headers"
+
+    LOGGER.info(
+        f"Loaded {len(estimations)} preliminary estimations from {source} "
+        f"in {time.perf_counter() - started_at:.2f}s"
+    )
+    return estimations
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Read the header of every preliminary estimation raster and "
+        "save their profiles as a manifest loaded at startup."
+    )
+    parser.add_argument("--list", default=SETTINGS.preliminary_estimation_list_path)
+    parser.add_argument("--output", default=SETTINGS.preliminary_manifest_path)
+    args = parser.parse_args()
+
+    urls = get_preliminary_estimation_urls(args.list)
+    save_manifest(args.output, read_preliminary_estimations(urls))
+    print(f"Saved the profiles of {len(urls)} rasters to {args.output}")
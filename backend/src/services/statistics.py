@@ -0,0 +1,169 @@
+from typing import Iterator
+
+import numpy as np
+import rasterio
+import rasterio.errors
+import rasterio.io
+import rasterio.windows
+from src.settings import SETTINGS
+
+
+class RasterStatistics:
+    # Running statistics of raster values, updated one block at a time so that
+    # memory is bounded by the block size rather than the raster size. NaN marks
+    # pixels without a value. Percentiles are interpolated in a fixed-width
+    # histogram over [0, `histogram_max`], values above it fall in the last bin.
+    def __init__(
+        self,
+        histogram_bins: int | None = None,
+        histogram_max: float | None = None,
+    ):
+        self.histogram_bins = histogram_bins or SETTINGS.statistics_histogram_bins
+        self.histogram_max = histogram_max or SETTINGS.statistics_histogram_max
+        self.histogram = np.zeros(self.histogram_bins, dtype=np.int64)
+
+        self.count = 0
+        self.sum = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def bin_width(self) -> float:
+        return self.histogram_max / self.histogram_bins
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / self.count if self.count else float("nan")
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.variance))
+
+    def update(self, block: np.ndarray) -> "RasterStatistics":
+        values = block[~np.isnan(block)]
+        if values.size == 0:
+            return self
+
+        statistics = RasterStatistics(self.histogram_bins, self.histogram_max)
+        statistics.count = int(values.size)
+        statistics.sum = float(values.sum(dtype=np.float64))
+        statistics.mean = statistics.sum / statistics.count
+        statistics.m2 = float(
+            np.square(values - statistics.mean, dtype=np.float64).sum()
+        )
+        statistics.min = float(values.min())
+        statistics.max = float(values.max())
+
+        indexes = np.clip(
+            (values / statistics.bin_width).astype(np.int64),
+            0,
+            self.histogram_bins - 1,
+        )
+        statistics.histogram = np.bincount(indexes, minlength=self.histogram_bins)
+
+        return self.merge(statistics)
+
+    def merge(self, other: "RasterStatistics") -> "RasterStatistics":
+        # Pairwise combination of means and sums of squared deviations (Chan et
+        # al.), exact regardless of how the pixels were split into blocks.
+        if (other.histogram_bins, other.histogram_max) != (
+            self.histogram_bins,
+            self.histogram_max,
+        ):
+            raise ValueError("Cannot merge statistics with different histograms")
+        if other.count == 0:
+            return self
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta**2 * self.count * other.count / count
+        self.count = count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.histogram += other.histogram
+
+        return self
+
+    def percentile(self, q: float) -> float:
+        if self.count == 0:
+            return float("nan")
+
+        # Linear interpolation inside the bin holding the q-th percentile,
+        # clamped to the exact extremes.
+        rank = q / 100 * self.count
+        cumulative = np.cumsum(self.histogram)
+        index = min(
+            int(np.searchsorted(cumulative, rank, side="left")), self.histogram_bins - 1
+        )
+        before = cumulative[index - 1] if index > 0 else 0
+        fraction = (
+            (rank - before) / self.histogram[index] if self.histogram[index] else 0
+        )
+        value = (index + fraction) * self.bin_width
+
+        return float(np.clip(value, self.min, self.max))
+
+
+def iter_array_blocks(
+    data: np.ndarray, block_pixels: int | None = None
+) -> Iterator[tuple[rasterio.windows.Window, np.ndarray]]:
+    # Views of consecutive row strips of about `block_pixels` pixels.
+    block_pixels = block_pixels or SETTINGS.statistics_block_pixels
+    height, width = data.shape[-2:]
+    rows = max(block_pixels // max(width, 1), 1)
+    for row in range(0, height, rows):
+        window = rasterio.windows.Window(0, row, width, min(rows, height - row))
+        yield window, data[..., row : row + rows, :]
+
+
+def iter_raster_blocks(
+    src: rasterio.io.DatasetReader,
+    window: rasterio.windows.Window | None = None,
+    band: int = 1,
+) -> Iterator[tuple[rasterio.windows.Window, np.ndarray]]:
+    # Internal blocks of `band` overlapping `window`, clipped to it, as floats with
+    # NaN where the raster has no data.
+    for _, block_window in src.block_windows(band):
+        if window is not None:
+            try:
+                block_window = block_window.intersection(window)
+            except rasterio.errors.WindowError:
+                continue
+            if block_window.width <= 0 or block_window.height <= 0:
+                continue
+
+        yield block_window, read_block(src, block_window, band)
+
+
+def read_block(
+    src: rasterio.io.DatasetReader, window: rasterio.windows.Window, band: int = 1
+) -> np.ndarray:
+    data = src.read(band, window=window, masked=True)
+    dtype = np.promote_types(data.dtype, np.float32)
+    return data.astype(dtype).filled(np.nan)
+
+
+def get_array_statistics(
+    data: np.ndarray, block_pixels: int | None = None
+) -> RasterStatistics:
+    statistics = RasterStatistics()
+    for _, block in iter_array_blocks(data, block_pixels):
+        statistics.update(block)
+
+    return statistics
+
+
+def get_raster_statistics(
+    src: rasterio.io.DatasetReader,
+    window: rasterio.windows.Window | None = None,
+    band: int = 1,
+) -> RasterStatistics:
+    statistics = RasterStatistics()
+    for _, block in iter_raster_blocks(src, window, band):
+        statistics.update(block)
+
+    return statistics
@@ -0,0 +1,211 @@
+import hashlib
+import math
+import threading
+import warnings
+from typing import Any, Literal
+
+import numpy as np
+import rasterio
+import rasterio.io
+import rasterio.transform
+import rasterio.warp
+import shapely.geometry
+from affine import Affine
+from cachetools import LRUCache
+from rasterio.enums import Resampling
+from rasterio.errors import NotGeoreferencedWarning
+from src.services.biomass import BiomassPreliminaryEstimationService
+from src.services.caching import DiskLRUCache
+from src.services.datasets import get_overview_level
+from src.settings import SETTINGS
+
+TileFormat = Literal["png", "tif"]
+
+TILE_SIZE = 256
+# Deepest zoom level served, far past the 10 m resolution of the rasters.
+MAX_ZOOM = 24
+WEB_MERCATOR_EXTENT = math.pi * 6_378_137
+
+MEDIA_TYPES: dict[TileFormat, str] = {"png": "image/png", "tif": "image/tiff"}
+
+# Biomass density colour ramp, from sparse (light yellow) to dense (dark green).
+COLORMAP_STOPS = [
+    (0.0, (255, 255, 204)),
+    (0.25, (194, 230, 153)),
+    (0.5, (120, 198, 121)),
+    (0.75, (49, 163, 84)),
+    (1.0, (0, 104, 55)),
+]
+
+
+def get_colormap() -> np.ndarray:
+    # 256 RGB entries interpolated between the stops.
+    positions = np.linspace(0, 1, 256)
+    stops = np.array([position for position, _ in COLORMAP_STOPS])
+    colors = np.array([color for _, color in COLORMAP_STOPS], dtype=np.float64)
+    return np.stack(
+        [np.interp(positions, stops, colors[:, channel]) for channel in range(3)],
+        axis=-1,
+    ).astype(np.uint8)
+
+
+def check_tile(z: int, x: int, y: int) -> None:
+    if not (0 <= z <= MAX_ZOOM and 0 <= x < 2**z and 0 <= y < 2**z):
+        raise ValueError(f"Invalid tile: {z}/{x}/{y}")
+
+
+def get_tile_bounds(z: int, x: int, y: int) -> tuple[float, float, float, float]:
+    size = 2 * WEB_MERCATOR_EXTENT / 2**z
+    minx = -WEB_MERCATOR_EXTENT + x * size
+    maxy = WEB_MERCATOR_EXTENT - y * size
+    return minx, maxy - size, minx + size, maxy
+
+
+class BiomassTileService:
+    # Renders Web Mercator tiles of the preliminary estimations, as colour-mapped
+    # PNGs or float32 GeoTIFFs. Tiles are cached in memory and on disk under a
+    # version derived from the raster list and rendering settings, which is also
+    # their ETag, so changing either invalidates every tile.
+    def __init__(self, preliminary_service: BiomassPreliminaryEstimationService):
+        self.preliminary_service = preliminary_service
+        self.colormap = get_colormap()
+
+        digest = hashlib.sha256()
+        for estimation in preliminary_service.preliminary_estimations:
+            digest.update(
+                f"{estimation.data}:{estimation.profile['transform']}".encode()
+            )
+        digest.update(f"{SETTINGS.tile_max_biomass_density}:{COLORMAP_STOPS}".encode())
+        self.version = digest.hexdigest()[:16]
+
+        self.memory: LRUCache[str, bytes] = LRUCache(
+            maxsize=SETTINGS.tile_memory_cache_max_bytes, getsizeof=len
+        )
+        self.memory_lock = threading.Lock()
+        self.disk = DiskLRUCache(SETTINGS.tile_cache_dir, SETTINGS.tile_cache_max_bytes)
+
+        self.memory_hits = 0
+        self.renders = 0
+
+    def get_etag(self, z: int, x: int, y: int, format: TileFormat) -> str:
+        check_tile(z, x, y)
+        return f'"{self.version}-{z}-{x}-{y}-{format}"'
+
+    def get_tile(self, z: int, x: int, y: int, format: TileFormat) -> bytes:
+        check_tile(z, x, y)
+
+        key = f"{self.version}/{z}/{x}/{y}.{format}"
+        with self.memory_lock:
+            tile = self.memory.get(key)
+            if tile is not None:
+                self.memory_hits += 1
+                return tile
+
+        tile = self.disk.get(key)
+        if tile is None:
+            tile = self._render(z, x, y, format)
+            self.disk.set(key, tile)
+
+        with self.memory_lock:
+            try:
+                self.memory[key] = tile
+            except ValueError:
+                pass
+
+        return tile
+
+    def _render(self, z: int, x: int, y: int, format: TileFormat) -> bytes:
+        bounds = get_tile_bounds(z, x, y)
+        transform = rasterio.transform.from_bounds(*bounds, TILE_SIZE, TILE_SIZE)
+        data = np.full((TILE_SIZE, TILE_SIZE), np.nan, dtype=np.float32)
+
+        # Tiles below the minimum zoom would touch too many rasters, they are
+        # rendered empty.
+        if z >= SETTINGS.tile_min_zoom:
+            self._read(bounds, transform, data)
+
+        with self.memory_lock:
+            self.renders += 1
+
+        if format == "tif":
+            return self._encode(
+                data[np.newaxis],
+                driver="GTiff",
+                dtype="float32",
+                nodata=np.nan,
+                crs="EPSG:3857",
+                transform=transform,
+            )
+
+        valid = ~np.isnan(data)
+        scaled = np.clip(data / SETTINGS.tile_max_biomass_density, 0, 1)
+        indexes = np.where(valid, scaled * 255, 0).astype(np.uint8)
+        rgba = np.empty((4, TILE_SIZE, TILE_SIZE), dtype=np.uint8)
+        rgba[:3] = self.colormap[indexes].transpose(2, 0, 1)
+        rgba[3] = np.where(valid, 255, 0)
+        return self._encode(rgba, driver="PNG", dtype="uint8")
+
+    def _read(
+        self,
+        bounds: tuple[float, float, float, float],
+        transform: Affine,
+        data: np.ndarray,
+    ) -> None:
+        # Intersecting rasters are warped onto the tile grid in priority order,
+        # each filling the pixels still empty, from the overview closest to the
+        # tile resolution.
+        service = self.preliminary_service
+        for estimation in service.get_intersecting_preliminary_estimations(
+            shapely.geometry.box(
+                *rasterio.warp.transform_bounds("EPSG:3857", "EPSG:4326", *bounds)
+            )
+        ):
+            assert isinstance(estimation.data, str)
+            with service.datasets.open(estimation.data) as src:
+                source_bounds = rasterio.warp.transform_bounds(
+                    "EPSG:3857", src.crs, *bounds
+                )
+                factor = (source_bounds[2] - source_bounds[0]) / (
+                    TILE_SIZE * abs(src.transform.a)
+                )
+                overview_level = get_overview_level(src, factor)
+
+            with service.datasets.open(estimation.data, overview_level) as src:
+                warped = np.full_like(data, np.nan)
+                rasterio.warp.reproject(
+                    source=rasterio.band(src, 1),
+                    destination=warped,
+                    src_nodata=src.nodata,
+                    dst_transform=transform,
+                    dst_crs="EPSG:3857",
+                    dst_nodata=np.nan,
+                    resampling=Resampling.nearest,
+                )
+
+            np.copyto(data, warped, where=np.isnan(data))
+            if not np.isnan(data).any():
+                break
+
+    def _encode(self, data: np.ndarray, **profile: Any) -> bytes:
+        count, height, width = data.shape
+        with warnings.catch_warnings(), rasterio.io.MemoryFile() as memfile:
+            # PNG tiles are positioned by their URL, not georeferenced.
+            warnings.simplefilter("ignore", NotGeoreferencedWarning)
+            with memfile.open(
+                count=count, height=height, width=width, **profile
+            ) as dst:
+                dst.write(data)
+
+            return memfile.read()
+
+    def metrics(self) -> dict[str, Any]:
+        with self.memory_lock:
+            memory = {
+                "entries": len(self.memory),
+                "size_mb": self.memory.currsize / 2**20,
+                "max_size_mb": self.memory.maxsize / 2**20,
+                "hits": self.memory_hits,
+            }
+            renders = self.renders
+
+        return {"memory": memory, "disk": self.disk.metrics(), "renders": renders}
@@ -1,4 +1,5 @@
 import logging
+from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -30,14 +31,87 @@ class Settings(BaseSettings):
     # GEE
     gee_service_account: str
     gee_private_key_path: str
+    gee_max_concurrency: int = 16
+    gee_timeout: float = 30
+    gee_max_retries: int = 3
+    gee_retry_backoff: float = 0.5
+    gee_scene_candidates: int = 10
+    gee_scene_cell_size: float = 0.1
+    gee_scene_cache_maxsize: int = 1_000
+    gee_scene_cache_ttl: int = 60 * 60 * 6
+
+    # Imagery
+    imagery_provider: Literal["gee", "local"] = "gee"
+    local_imagery_path: str = "data/imagery"
+    imagery_tile_size: int = 128
+    imagery_cache_dir: str = "data/cache/imagery"
+    imagery_cache_max_bytes: int = 2 * 2**30
 
     # Preliminary estimation
     preliminary_estimation_list_path: str
+    preliminary_manifest_path: str = "data/preliminary-manifest.json"
     estimation_area_limit: int = 2_000_000
+    estimation_window_area_limit: int = 10_000_000
+    estimation_lod_area_limit: int = 100_000 * 1_000_000
+    estimation_lod_max_pixels: int = 1_000_000
+    estimation_cluster_distance: float = 0.01
+    estimation_cluster_concurrency: int = 4
+    estimation_merged_max_pixels: int = 4_000_000
+    preliminary_read_concurrency: int = 8
+    dataset_idle_timeout: float = 60 * 5
+    preliminary_block_statistics_max_bytes: int = 64 * 2**20
+
+    # Tiles
+    tile_min_zoom: int = 8
+    tile_max_biomass_density: float = 300
+    tile_memory_cache_max_bytes: int = 64 * 2**20
+    tile_cache_dir: str = "data/cache/tiles"
+    tile_cache_max_bytes: int = 2**30
+    tile_max_age: int = 60 * 60 * 24
+
+    # Statistics
+    statistics_block_pixels: int = 2**20
+    statistics_histogram_bins: int = 1_000
+    statistics_histogram_max: float = 1_000
+    feature_statistics_header_max_features: int = 8
+
+    # GDAL
+    gdal_cache_max_mb: int = 256
+    gdal_vsi_cache_size: int = 64 * 2**20
+    gdal_http_multiplex: bool = True
+
+    # Models
+    model_mmap: bool = True
+    model_warmup: list[str] = []
+
+    # Inference
+    inference_backend: Literal["torch", "onnx"] = "torch"
+    onnx_model_path: str = "src/ai/models/biomass.onnx"
+    onnx_intra_op_threads: int = 0
+    onnx_inter_op_threads: int = 0
+    inference_optimize: bool = True
+    model_cache_dir: str = "src/ai/models/cache"
+    inference_precision: Literal["fp32", "int8"] = "fp32"
+    quantization_calibration_path: str | None = None
+    inference_tile_size: int = 256
+    inference_tile_halo: int = 64
+    inference_tile_overlap: int = 16
+    inference_batching: bool = True
+    inference_max_batch_size: int = 4
+    inference_max_batch_wait_ms: float = 5
+    inference_max_queue_size: int = 64
+
+    # Estimation executor
+    estimation_workers: int = 2
+    estimation_queue_size: int = 8
+    estimation_retry_after: int = 5
+    inference_threads: int = 0
 
     # Cache
     cache_maxsize: int = 1_000
     cache_ttl: int = 60 * 60 * 2
+    estimation_cache_max_bytes: int = 512 * 2**20
+    estimation_cache_ttl: int = 60 * 60 * 24
 
     # Security
     nextauth_secret: str
@@ -0,0 +1,4 @@
+from benchmarks.synthetic import configure_environment
+
+# Tests never reach Azure, GEE or the preliminary rasters.
+configure_environment()
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+from affine import Affine
+
+from benchmarks.coordinates import get_warped_coordinates
+from benchmarks.synthetic import ORIGIN_UTM, PIXEL_SIZE
+from src.services.imagery import get_pixel_coordinates
+
+
+@pytest.mark.parametrize("height, width", [(1, 1), (37, 141), (141, 37)])
+def test_pixel_coordinates_match_gdal_pixel_centres(height: int, width: int):
+    # A window whose origin is not on the metre grid, like the windows read from
+    # Sentinel-1 scenes. Agreement with `ee.Image.pixelCoordinates` itself is only
+    # checked by `python -m benchmarks.coordinates --gee`, with GEE credentials.
+    transform = Affine(
+        PIXEL_SIZE, 0, ORIGIN_UTM[0] + 3.3, 0, -PIXEL_SIZE, ORIGIN_UTM[1] - 1.7
+    )
+
+    np.testing.assert_allclose(
+        get_pixel_coordinates(transform, height, width),
+        get_warped_coordinates(transform, height, width),
+        rtol=0,
+        atol=1e-6,
+    )
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+
+from benchmarks.synthetic import save_random_models, use_random_models
+from src.ai.backends import load_torch_model, pytorch
+from src.ai.backends.onnx import OnnxBackend
+from src.ai.registry import ModelRegistry
+from src.settings import SETTINGS
+
+# The exported graph folds BatchNorm and runs on ONNX Runtime kernels.
+RTOL = 1e-3
+ATOL = 1e-4
+
+
+@pytest.fixture
+def torch_backend(monkeypatch: pytest.MonkeyPatch, tmp_path) -> pytorch.TorchBackend:
+    save_random_models(str(tmp_path))
+    use_random_models(str(tmp_path))
+    monkeypatch.setattr(SETTINGS, "model_cache_dir", str(tmp_path / "cache"))
+
+    # A registry of its own, so the random models never replace the real ones.
+    registry = ModelRegistry()
+    for name in ("dsen2_20m", "dsen2_60m", "vinacarbon"):
+        registry.register(name, lambda name=name: load_torch_model(name))
+    monkeypatch.setattr(pytorch, "MODELS", registry)
+
+    return pytorch.TorchBackend()
+
+
+def test_onnx_backend_matches_torch_backend(torch_backend, tmp_path):
+    path = str(tmp_path / "biomass.onnx")
+    torch_backend.export_onnx(path)
+    onnx_backend = OnnxBackend(path)
+
+    # A batch and a size other than the export example, to cover the dynamic axes.
+    rng = np.random.default_rng(0)
+    inputs = [
+        rng.random((2, channels, 48, 40), dtype=np.float32)
+        for channels in (2, 2, 4, 6, 2)
+    ]
+
+    np.testing.assert_allclose(
+        onnx_backend.predict(inputs),
+        torch_backend.predict(inputs),
+        rtol=RTOL,
+        atol=ATOL,
+    )
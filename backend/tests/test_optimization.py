@@ -0,0 +1,48 @@
+import pytest
+import torch
+import torch.nn as nn
+
+from src.ai.models.vinacarbon import InferenceVinaCarbon, VinaCarbon
+
+SIZE = 32
+# Folding reorders the float32 products of 8 residual blocks of 728 channels.
+RTOL = 1e-3
+ATOL = 1e-4
+
+
+@pytest.fixture
+def model() -> VinaCarbon:
+    # Randomised BatchNorm statistics, so that folding is not the identity it is on
+    # a freshly initialised model.
+    torch.manual_seed(0)
+    model = VinaCarbon()
+    for module in model.modules():
+        if isinstance(module, nn.BatchNorm2d):
+            module.running_mean.uniform_(-0.5, 0.5)
+            module.running_var.uniform_(0.5, 2)
+            nn.init.uniform_(module.weight, 0.5, 1.5)
+            nn.init.uniform_(module.bias, -0.5, 0.5)
+
+    return model.eval()
+
+
+def get_inputs() -> list[torch.Tensor]:
+    generator = torch.Generator().manual_seed(0)
+    return [
+        torch.rand((1, channels, SIZE, SIZE), generator=generator)
+        for channels in (2, 2, 4, 6, 2)
+    ]
+
+
+@pytest.mark.parametrize("script", [False, True])
+def test_inference_vinacarbon_matches_vinacarbon(model: VinaCarbon, script: bool):
+    optimized = InferenceVinaCarbon(model).eval()
+    if script:
+        optimized = torch.jit.script(optimized)
+
+    inputs = get_inputs()
+    with torch.no_grad():
+        _, _, expected = model(*inputs)
+        actual = optimized(*inputs)
+
+    torch.testing.assert_close(actual, expected, rtol=RTOL, atol=ATOL)
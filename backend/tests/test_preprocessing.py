@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+import torch
+import torch.nn.functional as F
+
+from src.ai import preprocessing
+from src.ai.preprocessing import resize
+
+
+@pytest.mark.parametrize(
+    "source_size, target_size",
+    [((71, 71), (141, 141)), ((24, 30), (141, 179)), ((300, 64), (100, 100))],
+)
+def test_numpy_resize_matches_torch(
+    monkeypatch: pytest.MonkeyPatch, source_size, target_size
+):
+    # The numpy resize serves every grid with the ONNX backend.
+    monkeypatch.setattr(preprocessing.SETTINGS, "inference_backend", "onnx")
+    sources = np.random.default_rng(0).uniform(0, 10_000, (3, *source_size))
+    sources = sources.astype(np.float32)
+
+    expected = F.interpolate(
+        torch.from_numpy(sources).unsqueeze(0),
+        size=target_size,
+        mode="bilinear",
+        antialias=True,
+        align_corners=False,
+    )[0].numpy()
+
+    # torch places the filters in float32, which shifts weights by up to 1e-5.
+    np.testing.assert_allclose(resize(sources, *target_size), expected, rtol=1e-3)
@@ -0,0 +1,130 @@
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+
+from src.ai import biomass
+from src.settings import SETTINGS
+
+TILE_SIZE = 256
+HALO = 64
+OVERLAP = 16
+
+
+def predict(inputs: list[np.ndarray]) -> np.ndarray:
+    # Pointwise, so tiled and whole-image predictions must agree exactly.
+    return np.concatenate([inputs[0] * 2, inputs[1] - 1], axis=1)
+
+
+@pytest.fixture
+def submissions(monkeypatch) -> list[tuple[int, ...]]:
+    monkeypatch.setattr(SETTINGS, "inference_tile_size", TILE_SIZE)
+    monkeypatch.setattr(SETTINGS, "inference_tile_halo", HALO)
+    monkeypatch.setattr(SETTINGS, "inference_tile_overlap", OVERLAP)
+
+    shapes = []
+
+    def submit(inputs: list[np.ndarray]) -> Future[np.ndarray]:
+        shapes.append(inputs[0].shape)
+        future: Future[np.ndarray] = Future()
+        future.set_result(predict(inputs))
+        return future
+
+    monkeypatch.setattr(biomass, "submit", submit)
+    return shapes
+
+
+@pytest.fixture
+def predictions(monkeypatch) -> list[tuple[int, ...]]:
+    # Whole images are predicted directly, without the scheduler.
+    shapes = []
+
+    def predict_directly(inputs: list[np.ndarray]) -> np.ndarray:
+        shapes.append(inputs[0].shape)
+        return predict(inputs)
+
+    monkeypatch.setattr(biomass, "predict", predict_directly)
+    return shapes
+
+
+def get_inputs(height: int, width: int) -> list[np.ndarray]:
+    rng = np.random.default_rng(0)
+    return [
+        rng.random((1, 1, height, width), dtype=np.float32),
+        rng.random((1, 1, height, width), dtype=np.float32),
+    ]
+
+
+def estimate(monkeypatch, inputs: list[np.ndarray]) -> np.ndarray:
+    monkeypatch.setattr(biomass, "preprocess", lambda *arrays: inputs)
+    _, _, height, width = inputs[0].shape
+    sen1 = np.zeros((height, width, 2), dtype=np.float32)
+    return biomass.estimate_biomass(None, sen1, None, None, None)
+
+
+@pytest.mark.parametrize("size", [TILE_SIZE + 1, 300, TILE_SIZE + 2 * HALO])
+def test_images_within_tile_and_halo_are_predicted_whole(
+    monkeypatch, submissions, predictions, size
+):
+    inputs = get_inputs(size, size)
+    estimation = estimate(monkeypatch, inputs)
+
+    assert submissions == []
+    assert predictions == [(1, 1, size, size)]
+    np.testing.assert_array_equal(estimation, predict(inputs)[0])
+
+
+def test_lengths_within_tile_and_halo_are_not_split(monkeypatch, submissions):
+    inputs = get_inputs(300, 1_000)
+    estimation = estimate(monkeypatch, inputs)
+
+    # One row of tiles, each as tall as the image and no wider than a tile and
+    # its halo, so no window is predicted twice.
+    columns = biomass.get_tiles(1_000, TILE_SIZE, OVERLAP, HALO)
+    assert len(submissions) == len(columns)
+    assert set(submissions) == {(1, 1, 300, TILE_SIZE + 2 * HALO)}
+    np.testing.assert_allclose(estimation, predict(inputs)[0], rtol=1e-6)
+
+
+def test_tiled_prediction_matches_whole_image(monkeypatch, submissions):
+    inputs = get_inputs(1_000, 700)
+    estimation = estimate(monkeypatch, inputs)
+
+    assert len(submissions) > 1
+    assert all(
+        height <= TILE_SIZE + 2 * HALO and width <= TILE_SIZE + 2 * HALO
+        for _, _, height, width in submissions
+    )
+    np.testing.assert_allclose(estimation, predict(inputs)[0], rtol=1e-6)
+
+
+def test_tiles_are_submitted_in_waves_of_one_batch(monkeypatch, submissions):
+    monkeypatch.setattr(SETTINGS, "inference_max_batch_size", 4)
+    pending: list[Future[np.ndarray]] = []
+    max_pending = 0
+
+    class LazyFuture(Future):
+        # Computed when collected, like a queued request of the scheduler.
+        def __init__(self, inputs: list[np.ndarray]):
+            super().__init__()
+            self.inputs = inputs
+
+        def result(self, timeout=None):
+            if not self.done():
+                pending.remove(self)
+                self.set_result(predict(self.inputs))
+            return super().result(timeout)
+
+    def submit(inputs: list[np.ndarray]) -> Future[np.ndarray]:
+        nonlocal max_pending
+        future = LazyFuture(inputs)
+        pending.append(future)
+        max_pending = max(max_pending, len(pending))
+        return future
+
+    monkeypatch.setattr(biomass, "submit", submit)
+    inputs = get_inputs(1_000, 1_000)
+    estimation = estimate(monkeypatch, inputs)
+
+    assert max_pending == 4
+    np.testing.assert_allclose(estimation, predict(inputs)[0], rtol=1e-6)